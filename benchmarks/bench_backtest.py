@@ -0,0 +1,83 @@
+"""
+Benchmark backtesting one strategy template over the whole stock universe
+
+Builds a synthetic panel with one random walk per stock of
+src/market_data/all_stocks.csv (limit-clipped daily moves, gapped opens,
+a few suspended days, a share of ChiNext / STAR names with 20% limits)
+and times run_backtest() for each template over every stock at once.
+
+Usage:
+    python benchmarks/bench_backtest.py [--days 250] [--stocks 0 (whole universe)]
+"""
+import argparse
+import csv
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from core.backtest import BarPanel, run_backtest, limit_pct
+from core.strategies import MACrossStrategy, GridStrategy, MACDDivergenceStrategy, StopLossTakeProfitStrategy
+
+BUDGET_S = 10.0  # Per template over the whole universe
+UNIVERSE_CSV = src_path / "market_data" / "all_stocks.csv"
+
+
+def universe_codes():
+    with open(UNIVERSE_CSV, encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        next(reader)
+        return [row[0].strip()[-6:] for row in reader if row]
+
+
+def synthetic_panel(codes, days, seed=0):
+    rng = np.random.default_rng(seed)
+    limits = np.array([limit_pct(code) for code in codes])[:, None]
+    moves = np.clip(rng.normal(0.0003, 0.025, (len(codes), days)), -limits, limits)
+    closes = np.round(10 * np.exp(np.cumsum(np.log1p(moves), axis=1)), 2)
+    previous = np.concatenate([closes[:, :1], closes[:, :-1]], axis=1)
+    opens = np.round(previous * (1 + np.clip(rng.normal(0, 0.01, closes.shape), -limits, limits)), 2)
+    highs = np.maximum(opens, closes) * (1 + rng.uniform(0, 0.01, closes.shape))
+    lows = np.minimum(opens, closes) * (1 - rng.uniform(0, 0.01, closes.shape))
+    suspended = rng.random(closes.shape) < 0.002
+    for array in (opens, highs, lows, closes):
+        array[suspended] = np.nan
+    dates = [f"d{i:04d}" for i in range(days)]
+    return BarPanel(list(codes), dates, opens, highs, lows, closes, limits[:, 0])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=250)
+    parser.add_argument("--stocks", type=int, default=0)
+    args = parser.parse_args()
+
+    codes = universe_codes()
+    if args.stocks:
+        codes = codes[:args.stocks]
+    panel = synthetic_panel(codes, args.days)
+    print(f"Universe: {len(panel)} stocks x {args.days} days")
+
+    worst = 0.0
+    for template in (MACrossStrategy("600000"), GridStrategy("600000"), MACDDivergenceStrategy("600000"),
+                     StopLossTakeProfitStrategy("600000")):
+        start = time.perf_counter()
+        result = run_backtest(template, panel)
+        elapsed = time.perf_counter() - start
+        worst = max(worst, elapsed)
+        summary = result.summary()
+        print(f"{template.label:<8} {elapsed:6.2f} s  trades {summary['trades']:7d}  "
+              f"mean return {summary['mean_return'] * 100:+6.2f}%  win rate {summary['win_rate'] * 100:5.1f}%  "
+              f"mean max drawdown {summary['mean_max_drawdown'] * 100:5.1f}%")
+    status = "OK" if worst < BUDGET_S else "OVER BUDGET"
+    print(f"Slowest template: {worst:.2f} s (budget {BUDGET_S:.0f} s) {status}")
+    return 0 if worst < BUDGET_S else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+Benchmark the LLM request path against the local stub provider
+
+Starts benchmarks/llm_stub_server.py in-process and measures, without
+any real provider or network access:
+  1. LLMService.chat_stream, sequentially and from concurrent threads
+     (time to first token and total time, p50/p95)
+  2. LLMWorker (Qt signals, stream buffering) on an offscreen QApplication
+  3. The batched auto-analysis pipeline over synthetic stocks
+
+The provider and prompt configs live in memory, and responses and
+spilled conversations go to a throwaway directory, so config/config.json,
+the response cache and the app's chat contexts are not touched.
+
+Usage:
+    python benchmarks/bench_llm.py [--ttft 0.3] [--tokens-per-sec 50] [--tokens 200]
+        [--error-rate 0.05] [--requests 20] [--concurrency 4] [--stocks 100]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add src to path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+sys.path.insert(0, str(Path(__file__).parent))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from llm_stub_server import StubLLMServer, StubSettings
+from services.llm_service import LLMService
+from services.response_cache import ResponseCache
+
+MODEL = "stub-model"
+PROMPT = "基准测试"
+QUESTION = "请分析贵州茅台(600519)近期走势。"
+
+
+class BenchConfigManager:
+    """In-memory providers and prompts pointing at the stub server"""
+
+    def __init__(self, base_url, concurrency):
+        self.providers = {"Stub": {"name": "Stub", "api_key": "sk-stub", "base_url": base_url,
+                                   "model_name": MODEL, "max_concurrency": concurrency}}
+        self.prompts = {PROMPT: {"name": PROMPT, "content": "你是一个股票分析助手。", "failover": False}}
+
+    def get_providers(self):
+        return self.providers
+
+    def get_prompts(self):
+        return self.prompts
+
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def timed_request(service):
+    """(ttft, total, ok) of one history-free request"""
+    start = time.perf_counter()
+    ttft = None
+    text = ""
+    for chunk in service.chat_stream(QUESTION, MODEL, PROMPT, use_cache=False, history=[]):
+        if ttft is None and chunk:
+            ttft = time.perf_counter() - start
+        text += chunk
+    ok = bool(text) and not text.startswith("Error")
+    return ttft, time.perf_counter() - start, ok
+
+
+def report(label, results, wall):
+    ok = [r for r in results if r[2]]
+    ttfts = [r[0] for r in ok]
+    totals = [r[1] for r in ok]
+    print(f"{label:<22} {len(results):4d} req  {len(results) - len(ok):3d} err  "
+          f"ttft p50 {percentile(ttfts, 0.5):6.3f}s p95 {percentile(ttfts, 0.95):6.3f}s  "
+          f"total p50 {percentile(totals, 0.5):6.3f}s p95 {percentile(totals, 0.95):6.3f}s  "
+          f"wall {wall:6.2f}s  {len(results) / wall:6.2f} req/s")
+
+
+def bench_service(service, requests, concurrency):
+    start = time.perf_counter()
+    report("service sequential", [timed_request(service) for _ in range(requests)],
+           time.perf_counter() - start)
+
+    results = []
+    lock = threading.Lock()
+
+    def run(count):
+        for _ in range(count):
+            result = timed_request(service)
+            with lock:
+                results.append(result)
+
+    threads = [threading.Thread(target=run, args=(requests // concurrency or 1,)) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report(f"service x{concurrency} threads", results, time.perf_counter() - start)
+
+
+def bench_worker(service, requests):
+    from PyQt6.QtCore import QEventLoop
+    from ui.utils.worker import LLMWorker
+
+    stats = []
+    for _ in range(requests):
+        loop = QEventLoop()
+        worker = LLMWorker(service, QUESTION, MODEL, PROMPT)
+        worker.stats_ready.connect(stats.append)
+        worker.finished.connect(lambda _: loop.quit())
+        worker.start()
+        loop.exec()
+        worker.wait()
+    answered = [s for s in stats if s["ttft"] is not None]
+    print(f"{'LLMWorker':<22} {len(stats):4d} req  "
+          f"ttft p50 {percentile([s['ttft'] for s in answered], 0.5):6.3f}s  "
+          f"{percentile([s['tokens_per_sec'] for s in answered], 0.5):6.1f} tok/s  "
+          f"{percentile([s['chunks'] for s in answered], 0.5):5.0f} chunks -> "
+          f"{percentile([s['emits'] for s in answered], 0.5):4.0f} UI updates")
+
+
+def bench_pipeline(service, stocks, concurrency):
+    from PyQt6.QtCore import QEventLoop
+    from services.batch_analysis import BATCH_SIZE, build_batch_prompt, parse_batch_response
+    from ui.utils.analysis_pipeline import AnalysisPipeline
+
+    universe = [{"code": f"{600000 + i:06d}", "name": f"股票{i}", "price": 10.0 + i % 7,
+                 "change": (i % 11) - 5.0, "rsi": 30.0 + i % 40} for i in range(stocks)]
+    pipeline = AnalysisPipeline(service, MODEL, PROMPT, build_batch_prompt, parse_batch_response,
+                                batch_size=BATCH_SIZE, concurrency=concurrency, retry_delay_ms=100)
+    loop = QEventLoop()
+    pipeline.finished.connect(loop.quit)
+    start = time.perf_counter()
+    pipeline.start(universe)
+    loop.exec()
+    wall = time.perf_counter() - start
+    for worker in pipeline.workers:
+        worker.wait()
+    print(f"{'auto-analysis':<22} {stocks:4d} stocks  {pipeline.requests:3d} requests  "
+          f"{pipeline.done:4d} done  {len(pipeline.failed):3d} failed  wall {wall:6.2f}s  "
+          f"{stocks / wall:6.1f} stocks/s (batch {BATCH_SIZE}, concurrency {concurrency})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    defaults = StubSettings()
+    parser.add_argument("--ttft", type=float, default=defaults.ttft)
+    parser.add_argument("--tokens-per-sec", type=float, default=defaults.tokens_per_sec)
+    parser.add_argument("--tokens", type=int, default=defaults.tokens)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--stocks", type=int, default=100)
+    args = parser.parse_args()
+
+    from PyQt6.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    settings = StubSettings(ttft=args.ttft, tokens_per_sec=args.tokens_per_sec, tokens=args.tokens,
+                            error_rate=args.error_rate)
+    with StubLLMServer(settings) as server, tempfile.TemporaryDirectory() as tmp:
+        print(f"Stub provider on {server.base_url}: {settings}")
+        service = LLMService(spill_dir=os.path.join(tmp, "contexts"))
+        service.config_manager = BenchConfigManager(server.base_url, args.concurrency)
+        service.response_cache = ResponseCache(os.path.join(tmp, "responses.sqlite3"))
+
+        bench_service(service, args.requests, args.concurrency)
+        bench_worker(service, min(args.requests, 10))
+        bench_pipeline(service, args.stocks, args.concurrency)
+        print(f"Stub served {server.requests} requests ({server.errors} injected errors)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Benchmark StockSearchIndex on the full stock universe
+
+Usage:
+    python benchmarks/bench_search.py
+"""
+import sys
+import time
+from pathlib import Path
+
+# Add src to path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+import pandas as pd
+from pypinyin import lazy_pinyin
+
+from services.stock_search import StockSearchIndex
+
+QUERIES = [
+    "6", "60", "600519", "z", "zghd", "核电", "银行",
+    "zhongguo", "zhonggou", "yinhnag", "maotia", "zhonguopingan",
+]
+BUDGET_MS = 5.0
+REPEAT = 50
+
+
+def load_universe():
+    csv_path = src_path / "market_data" / "all_stocks.csv"
+    df = pd.read_csv(csv_path, dtype={"code": str})
+    stocks = []
+    for code, name in zip(df["code"], df["name"]):
+        pinyin_list = lazy_pinyin(name)
+        stocks.append({
+            "code": code.zfill(6),
+            "name": name,
+            "pinyin_full": "".join(pinyin_list),
+            "pinyin_initials": "".join(p[0] for p in pinyin_list),
+        })
+    return stocks
+
+
+def main():
+    stocks = load_universe()
+
+    start = time.perf_counter()
+    index = StockSearchIndex(stocks)
+    print(f"Index built over {len(index)} stocks in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    worst = 0.0
+    for query in QUERIES:
+        start = time.perf_counter()
+        for _ in range(REPEAT):
+            results = index.search(query)
+        elapsed_ms = (time.perf_counter() - start) * 1000 / REPEAT
+        worst = max(worst, elapsed_ms)
+        top = ", ".join(stock["name"] for stock in results[:3])
+        print(f"{query:<16} {elapsed_ms:6.2f} ms  {len(results):2d} hits  {top}")
+
+    status = "OK" if worst < BUDGET_MS else "OVER BUDGET"
+    print(f"Worst query: {worst:.2f} ms (budget {BUDGET_MS:.0f} ms) {status}")
+    return 0 if worst < BUDGET_MS else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
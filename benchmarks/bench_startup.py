@@ -0,0 +1,105 @@
+"""
+Benchmark application cold start
+
+Runs two fresh interpreters:
+  1. `python -X importtime` on the main window module, reporting the
+     slowest imports and any deferred dependency that is loaded anyway
+  2. The main window on an offscreen platform until the first tab is
+     ready, printing the startup trace
+
+Usage:
+    python benchmarks/bench_startup.py [--top 20]
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+src_path = Path(__file__).parent.parent / "src"
+
+# Must not be imported before the window is shown (see utils.warmup)
+DEFERRED_MODULES = ("langchain_openai", "langchain_core", "akshare", "markdown",
+                    "pypinyin", "pandas", "pyqtgraph")
+IMPORT_BUDGET_MS = 500.0
+
+FIRST_TAB_SCRIPT = """
+import time
+from utils.startup_trace import startup_trace
+with startup_trace.phase("imports"):
+    from PyQt6.QtWidgets import QApplication
+    from ui.main_window import MainWindow
+startup_trace.reported = True  # Print once below instead of from the window
+with startup_trace.phase("qapplication"):
+    app = QApplication([])
+with startup_trace.phase("main window"):
+    window = MainWindow()
+window.show()
+deadline = time.time() + 30
+while window.tabs.currentWidget() is not window.tab_trading and time.time() < deadline:
+    app.processEvents()
+    time.sleep(0.001)
+print(startup_trace.summary())
+window.close()
+"""
+
+
+def run_python(args):
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    return subprocess.run([sys.executable] + args, cwd=src_path, env=env,
+                          capture_output=True, text=True)
+
+
+def parse_importtime(stderr):
+    """Yield (module, self_us, cumulative_us, depth) from -X importtime output."""
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        yield name.strip(), int(self_us), int(cumulative_us), depth
+
+
+def report_imports(top):
+    result = run_python(["-X", "importtime", "-c", "import ui.main_window"])
+    if result.returncode != 0:
+        print(result.stderr)
+        raise SystemExit("Importing ui.main_window failed")
+
+    records = list(parse_importtime(result.stderr))
+    total_ms = sum(self_us for _, self_us, _, _ in records) / 1000
+    print(f"Import of ui.main_window: {total_ms:.1f} ms "
+          f"(budget {IMPORT_BUDGET_MS:.0f} ms, {'OK' if total_ms <= IMPORT_BUDGET_MS else 'OVER BUDGET'})")
+
+    print("\nSlowest imports, two levels deep (cumulative):")
+    top_level = sorted((r for r in records if r[3] <= 1), key=lambda r: -r[2])[:top]
+    for name, _, cumulative_us, _ in top_level:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    loaded = sorted({name.split(".")[0] for name, _, _, _ in records} & set(DEFERRED_MODULES))
+    if loaded:
+        print(f"\nDeferred modules imported at startup: {', '.join(loaded)}")
+    else:
+        print("\nNo deferred module is imported at startup")
+    return total_ms <= IMPORT_BUDGET_MS and not loaded
+
+
+def report_first_tab():
+    result = run_python(["-c", FIRST_TAB_SCRIPT])
+    print("\nStartup trace:")
+    print("\n".join(line for line in result.stdout.splitlines() if line.startswith("  ")))
+    return result.returncode == 0 and "OVER BUDGET" not in result.stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--top", type=int, default=20, help="number of imports to list")
+    args = parser.parse_args()
+
+    ok = report_imports(args.top)
+    ok = report_first_tab() and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
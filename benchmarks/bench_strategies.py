@@ -0,0 +1,97 @@
+"""
+Benchmark tick-to-signal latency of the monitor strategy engine
+
+Runs 500 strategies (MA cross, grid, MACD divergence, stop-loss /
+take-profit in turn), seeded with synthetic daily bars, against random
+walk quotes delivered one batch per refresh round (as the price poller
+does), and reports per-batch latency as measured by the engine:
+  1. spread over 100 stocks
+  2. all on a single stock
+  3. one per stock over 500 stocks
+With kernels shared by every strategy of a kind, the three should cost
+about the same.
+
+Usage:
+    python benchmarks/bench_strategies.py [--strategies 500] [--stocks 100] [--rounds 200]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path
+src_path = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from core.strategies import MACrossStrategy, GridStrategy, MACDDivergenceStrategy, StopLossTakeProfitStrategy
+from core.strategy_engine import StrategyEngine
+
+BUDGET_MS = 50.0
+HISTORY_DAYS = 120
+TODAY = "2026-03-02"
+
+
+def make_strategy(i, code):
+    kind = i % 4
+    if kind == 0:
+        return MACrossStrategy(code, fast=5 + i % 3, slow=20 + i % 10)
+    if kind == 1:
+        return GridStrategy(code, step_pct=0.5 + (i % 4) * 0.25)
+    if kind == 2:
+        return MACDDivergenceStrategy(code, lookback=10 + i % 20)
+    return StopLossTakeProfitStrategy(code, stop_loss_pct=2 + i % 5, take_profit_pct=5 + i % 5)
+
+
+def build_engine(strategies, stocks, rng):
+    engine = StrategyEngine(latency_window=1_000_000)
+    codes = [f"{600000 + i:06d}" for i in range(stocks)]
+    for code in codes:
+        closes = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, HISTORY_DAYS)))
+        engine.seed(code, [{"date": f"2025-{1 + d // 28:02d}-{1 + d % 28:02d}", "close": float(c)}
+                           for d, c in enumerate(closes)], today=TODAY)
+    for i in range(strategies):
+        engine.start(engine.add(make_strategy(i, codes[i % stocks])))
+    return engine, codes
+
+
+def run(label, strategies, stocks, rounds, seed=0):
+    rng = np.random.default_rng(seed)
+    engine, codes = build_engine(strategies, stocks, rng)
+    prices = {code: 10.0 for code in codes}
+    signals = 0
+    start = time.perf_counter()
+    for r in range(rounds):
+        stamp = f"{TODAY}T10:{r // 60 % 60:02d}:{r % 60:02d}"
+        quotes = {}
+        for code in codes:
+            prices[code] *= float(np.exp(rng.normal(0, 0.01)))
+            quotes[code] = {"current": prices[code], "timestamp": stamp}
+        signals += len(engine.on_prices(quotes))
+    wall = time.perf_counter() - start
+    stats = engine.latency_stats()
+    print(f"{label:<28} {stats['count']:6d} batches  {signals:5d} signals  "
+          f"p50 {stats['p50']:7.3f} ms  p99 {stats['p99']:7.3f} ms  max {stats['max']:7.3f} ms  "
+          f"round {wall * 1000 / rounds:7.2f} ms")
+    return stats["max"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--strategies", type=int, default=500)
+    parser.add_argument("--stocks", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    worst = max(run(f"{args.strategies} over {args.stocks} stocks", args.strategies, args.stocks, args.rounds),
+                run(f"{args.strategies} on one stock", args.strategies, 1, args.rounds),
+                run(f"{args.strategies} over {args.strategies} stocks", args.strategies, args.strategies,
+                    args.rounds))
+    status = "OK" if worst < BUDGET_MS else "OVER BUDGET"
+    print(f"Worst quote-to-signal latency: {worst:.3f} ms (budget {BUDGET_MS:.0f} ms) {status}")
+    return 0 if worst < BUDGET_MS else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""
+Local stand-in for an OpenAI-compatible chat-completions provider
+
+Speaks enough of the API for LLMService (langchain_openai): POST
+/v1/chat/completions, streamed as server-sent events or as one JSON body,
+and GET /v1/models. Latency, token rate and failures are configurable,
+so LLMService, LLMWorker and the auto-analysis pipeline can be measured
+on an offline machine. Any API key and model name are accepted.
+
+Answers are deterministic filler text, except that a batch-analysis
+prompt (see services.batch_analysis) is answered with a valid JSON array
+scoring every stock code in its table.
+
+Usage:
+    python benchmarks/llm_stub_server.py [--port 8765] [--ttft 0.3] [--tokens-per-sec 50]
+        [--tokens 200] [--error-rate 0.05] [--stall-rate 0.0]
+
+Then point a provider's Base URL at http://127.0.0.1:8765/v1.
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FILLER = "根据最新行情数据，该股短期走势偏强，成交量温和放大，均线呈多头排列，但需关注上方压力位。"
+STOCK_ROW = re.compile(r"^(\d{6}),", re.MULTILINE)
+
+
+@dataclass
+class StubSettings:
+    ttft: float = 0.3  # Seconds before the first token
+    jitter: float = 0.1  # Random extra seconds added to ttft, uniform in [0, jitter]
+    tokens_per_sec: float = 50.0  # 0 streams without delay
+    tokens: int = 200  # Tokens in a filler answer
+    error_rate: float = 0.0  # Share of requests answered with HTTP 500
+    stall_rate: float = 0.0  # Share of requests that send nothing for stall_seconds
+    stall_seconds: float = 30.0
+    seed: int = 0
+
+
+def stub_answer(messages, tokens):
+    """Answer text for the request's messages, as a list of streamed tokens."""
+    prompt = messages[-1].get("content", "") if messages else ""
+    if isinstance(prompt, list):  # Content parts
+        prompt = "".join(part.get("text", "") for part in prompt if isinstance(part, dict))
+    codes = STOCK_ROW.findall(prompt)
+    if codes and "JSON" in prompt:
+        items = [{"code": code, "score": int(code) % 101, "reason": "模拟评分"} for code in codes]
+        text = json.dumps(items, ensure_ascii=False)
+        return [text[i:i + 4] for i in range(0, len(text), 4)]
+    return [FILLER[i % len(FILLER)] for i in range(tokens)]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like a real provider
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "stub", "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"message": "invalid JSON"}})
+            return
+
+        server = self.server
+        settings = server.settings
+        with server.lock:
+            server.requests += 1
+            roll = server.random.random()
+            delay = settings.ttft + server.random.uniform(0, settings.jitter)
+
+        if roll < settings.error_rate:
+            with server.lock:
+                server.errors += 1
+            self._send_json(500, {"error": {"message": "stub: injected error", "type": "server_error"}})
+            return
+        if roll < settings.error_rate + settings.stall_rate:
+            delay = settings.stall_seconds
+
+        model = request.get("model", "stub")
+        tokens = stub_answer(request.get("messages", []), settings.tokens)
+        created = int(time.time())
+        completion_id = f"chatcmpl-stub-{server.requests}"
+        time.sleep(delay)
+
+        if not request.get("stream"):
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "".join(tokens)}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def event(delta, finish_reason=None):
+            body = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                    "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+            self._write_chunk(f"data: {json.dumps(body, ensure_ascii=False)}\n\n")
+
+        interval = 1.0 / settings.tokens_per_sec if settings.tokens_per_sec > 0 else 0.0
+        try:
+            event({"role": "assistant", "content": ""})
+            for token in tokens:
+                event({"content": token})
+                if interval:
+                    time.sleep(interval)
+            event({}, "stop")
+            self._write_chunk("data: [DONE]\n\n")
+            self._write_chunk("")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client abandoned the stream (e.g. a hedged request lost the race)
+
+    def _write_chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+class StubLLMServer(ThreadingHTTPServer):
+    """
+    Stub provider serving on its own thread.
+
+    Use as a context manager, or call start() and stop(). Port 0 picks a
+    free port; base_url gives the address to configure.
+    """
+    daemon_threads = True
+
+    def __init__(self, settings: StubSettings = None, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), StubHandler)
+        self.settings = settings or StubSettings()
+        self.random = random.Random(self.settings.seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def handle_error(self, request, client_address):
+        # Clients closing idle keep-alive connections is routine
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    defaults = StubSettings()
+    parser.add_argument("--ttft", type=float, default=defaults.ttft)
+    parser.add_argument("--jitter", type=float, default=defaults.jitter)
+    parser.add_argument("--tokens-per-sec", type=float, default=defaults.tokens_per_sec)
+    parser.add_argument("--tokens", type=int, default=defaults.tokens)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--stall-rate", type=float, default=defaults.stall_rate)
+    parser.add_argument("--stall-seconds", type=float, default=defaults.stall_seconds)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args()
+
+    settings = StubSettings(args.ttft, args.jitter, args.tokens_per_sec, args.tokens, args.error_rate,
+                            args.stall_rate, args.stall_seconds, args.seed)
+    server = StubLLMServer(settings, args.host, args.port)
+    print(f"Stub LLM provider on {server.base_url} ({settings})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""
+Vectorized backtests of the monitor strategy templates on daily bars
+
+A BarPanel holds the daily bars of many stocks as (stocks x days) arrays.
+target_positions() turns a strategy template into the position each stock
+should hold after every close, computed with array operations over the
+whole panel; run_backtest() then trades every stock's independent account
+towards those targets, one trading day at a time for all stocks at once,
+under A-share rules:
+
+- Orders decided on a close fill at the next session's open, at most one
+  fill per stock and day, so shares bought today are sold at the next
+  session's open at the earliest (T+1).
+- No buys at an open at the limit-up price, no sells at the limit-down
+  price (10% main board, 5% ST, 20% ChiNext / STAR, 30% Beijing); the
+  order is retried on the following sessions. Suspended days (no bar) do
+  not trade.
+- Quantities are whole lots of 100 shares; commission (with a minimum per
+  fill) on both sides and stamp tax on sells.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    from core.strategies import (Strategy, MACrossStrategy, GridStrategy, MACDDivergenceStrategy,
+                                 StopLossTakeProfitStrategy)
+except ImportError:
+    # Fallback for relative imports if run as package
+    from .strategies import (Strategy, MACrossStrategy, GridStrategy, MACDDivergenceStrategy,
+                             StopLossTakeProfitStrategy)
+
+LOT_SIZE = 100
+DEFAULT_CASH = 100_000.0
+COMMISSION = 0.00025
+MIN_COMMISSION = 5.0
+STAMP_TAX = 0.0005  # Sells only
+TRADING_DAYS = 244  # Per year, for annualized returns
+
+
+def limit_pct(code: str, name: str = "") -> float:
+    """Daily price limit of a stock as a fraction of the previous close."""
+    if code.startswith(("300", "301", "688", "689")):
+        return 0.2
+    if code.startswith(("4", "8", "92")):
+        return 0.3
+    if "ST" in name.upper():
+        return 0.05
+    return 0.1
+
+
+def _ffill(values: np.ndarray) -> np.ndarray:
+    """Forward-fill NaN along the day axis (leading NaN stay)."""
+    index = np.where(np.isnan(values), 0, np.arange(values.shape[1]))
+    np.maximum.accumulate(index, axis=1, out=index)
+    return np.take_along_axis(values, index, axis=1)
+
+
+def _shift(values: np.ndarray, days: int, fill=np.nan) -> np.ndarray:
+    """values lagged by days along the day axis."""
+    shifted = np.full_like(values, fill)
+    if days < values.shape[1]:
+        shifted[:, days:] = values[:, :values.shape[1] - days]
+    return shifted
+
+
+@dataclass
+class BarPanel:
+    """Daily bars of several stocks aligned on common dates; NaN where a stock has no bar"""
+    codes: List[str]
+    dates: List[str]
+    open: np.ndarray  # (stocks, days)
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    limits: np.ndarray  # (stocks,) price limit fractions
+
+    @classmethod
+    def from_klines(cls, klines: Dict[str, List[Dict]], names: Optional[Dict[str, str]] = None) -> "BarPanel":
+        """
+        Panel from fetch_kline_data() results.
+
+        Args:
+            klines: Bars (keys date, open, high, low, close) by stock code
+            names: Stock names by code, to recognize ST stocks
+        """
+        names = names or {}
+        codes = list(klines)
+        dates = sorted({str(bar["date"])[:10] for bars in klines.values() for bar in bars or []})
+        column = {day: i for i, day in enumerate(dates)}
+        arrays = {key: np.full((len(codes), len(dates)), np.nan) for key in ("open", "high", "low", "close")}
+        for row, code in enumerate(codes):
+            bars = klines[code] or []
+            columns = [column[str(bar["date"])[:10]] for bar in bars]
+            for key, array in arrays.items():
+                array[row, columns] = [float(bar[key]) for bar in bars]
+        limits = np.array([limit_pct(code, names.get(code, "")) for code in codes])
+        return cls(codes, dates, limits=limits, **arrays)
+
+    def __len__(self):
+        return len(self.codes)
+
+
+# --- Targets: fraction of the account each stock should hold after each close ---
+def _rolling_mean(closes: np.ndarray, window: int) -> np.ndarray:
+    valid = ~np.isnan(closes)
+    sums = np.cumsum(np.where(valid, closes, 0.0), axis=1)
+    counts = np.cumsum(valid, axis=1)
+    means = (sums - _shift(sums, window, 0.0)) / window
+    return np.where(counts >= window, means, np.nan)
+
+
+def _hold_between(buy: np.ndarray, sell: np.ndarray) -> np.ndarray:
+    """1 from each buy until the next sell, else 0."""
+    event = buy | sell
+    last = np.where(event, np.arange(buy.shape[1]), -1)
+    np.maximum.accumulate(last, axis=1, out=last)
+    held = np.take_along_axis(buy, np.maximum(last, 0), axis=1) & (last >= 0)
+    return held.astype(float)
+
+
+def _anchor(price: float, template: Strategy, panel: BarPanel, closes: np.ndarray) -> np.ndarray:
+    """
+    Per-stock reference price: the template's price for its own stock,
+    each stock's first close otherwise (or when the template price is 0).
+    """
+    first = np.take_along_axis(closes, np.argmax(~np.isnan(closes), axis=1)[:, None], axis=1)[:, 0]
+    if price > 0:
+        first = np.where(np.array(panel.codes) == template.code, price, first)
+    return first
+
+
+def _ma_cross_targets(template: MACrossStrategy, panel: BarPanel, closes: np.ndarray) -> np.ndarray:
+    fast = _rolling_mean(closes, template.fast)
+    slow = _rolling_mean(closes, template.slow)
+    above = fast > slow
+    below = fast < slow
+    return _hold_between(above & _shift(below, 1, False), below & _shift(above, 1, False))
+
+
+def _grid_targets(template: GridStrategy, panel: BarPanel, closes: np.ndarray) -> np.ndarray:
+    # Flat at or above the base, one more unit per grid line below it
+    base = _anchor(template.base_price, template, panel, closes)[:, None]
+    level = np.floor((closes / base - 1) * 100 / template.step_pct + 1e-9)
+    units = np.clip(-np.nan_to_num(level), 0, template.levels)
+    return units / max(template.levels, 1)
+
+
+def _macd_divergence_targets(template: MACDDivergenceStrategy, panel: BarPanel,
+                             closes: np.ndarray) -> np.ndarray:
+    dif = np.full_like(closes, np.nan)
+    ema_fast = ema_slow = np.full(len(closes), np.nan)
+    alpha_fast, alpha_slow = 2.0 / (template.fast + 1), 2.0 / (template.slow + 1)
+    for day in range(closes.shape[1]):  # Recursive in time; every stock at once
+        close = closes[:, day]
+        ema_fast = np.where(np.isnan(ema_fast), close, ema_fast + alpha_fast * (close - ema_fast))
+        ema_slow = np.where(np.isnan(ema_slow), close, ema_slow + alpha_slow * (close - ema_slow))
+        dif[:, day] = ema_fast - ema_slow
+
+    # Lowest / highest close of the previous lookback days and the DIF there
+    low, low_dif = np.full_like(closes, np.inf), np.full_like(closes, np.nan)
+    high, high_dif = np.full_like(closes, -np.inf), np.full_like(closes, np.nan)
+    for lag in range(1, template.lookback + 1):
+        past, past_dif = _shift(closes, lag), _shift(dif, lag)
+        lower, higher = past <= low, past >= high  # Ties keep the older extreme
+        low, low_dif = np.where(lower, past, low), np.where(lower, past_dif, low_dif)
+        high, high_dif = np.where(higher, past, high), np.where(higher, past_dif, high_dif)
+
+    ready = np.cumsum(~np.isnan(closes), axis=1) > template.history_days
+    buy = ready & (closes < low) & (dif > low_dif)
+    sell = ready & ~buy & (closes > high) & (dif < high_dif)
+    return _hold_between(buy, sell)
+
+
+def _stop_loss_take_profit_targets(template: StopLossTakeProfitStrategy, panel: BarPanel,
+                                   closes: np.ndarray) -> np.ndarray:
+    # Held from the first close until the first close beyond either threshold
+    entry = _anchor(template.entry_price, template, panel, closes)[:, None]
+    change = (closes / entry - 1) * 100
+    hit = (change <= -template.stop_loss_pct) | (change >= template.take_profit_pct)
+    exited = np.logical_or.accumulate(hit, axis=1)
+    return (~np.isnan(closes) & ~exited).astype(float)
+
+
+TARGETS = {
+    MACrossStrategy.kind: _ma_cross_targets,
+    GridStrategy.kind: _grid_targets,
+    MACDDivergenceStrategy.kind: _macd_divergence_targets,
+    StopLossTakeProfitStrategy.kind: _stop_loss_take_profit_targets,
+}
+
+
+def target_positions(template: Strategy, panel: BarPanel) -> np.ndarray:
+    """(stocks, days) fraction of each account to hold after each close, for template's parameters."""
+    return TARGETS[template.kind](template, panel, _ffill(panel.close))
+
+
+# --- Execution ---
+@dataclass
+class BacktestResult:
+    """Equity curves and per-stock trade statistics of one template over a panel"""
+    template: Strategy
+    codes: List[str]
+    dates: List[str]
+    equity: np.ndarray  # (stocks, days) account value after each close
+    positions: np.ndarray  # (stocks, days) shares held after each close
+    buys: np.ndarray  # (stocks,) fills
+    sells: np.ndarray
+    wins: np.ndarray  # Sells that realized a profit after costs
+    fees: np.ndarray
+    exposure: np.ndarray  # Fraction of days ending with shares held
+    cash: float = DEFAULT_CASH
+    metrics: Dict[str, np.ndarray] = field(init=False)
+
+    def __post_init__(self):
+        final = self.equity[:, -1] if self.equity.size else np.full(len(self.codes), self.cash)
+        total = final / self.cash - 1
+        years = max(self.equity.shape[1], 1) / TRADING_DAYS
+        peaks = np.maximum.accumulate(self.equity, axis=1) if self.equity.size else self.equity
+        drawdown = (1 - self.equity / peaks).max(axis=1) if self.equity.size else np.zeros(len(self.codes))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            win_rate = np.where(self.sells > 0, self.wins / self.sells, 0.0)
+        self.metrics = {"total_return": total, "annual_return": (1 + total) ** (1 / years) - 1,
+                        "max_drawdown": drawdown, "trades": self.sells, "win_rate": win_rate}
+
+    def stats(self, code: str) -> Dict:
+        """Statistics of one stock's account."""
+        row = self.codes.index(code)
+        return {"code": code, "final_equity": float(self.equity[row, -1]) if self.equity.size else self.cash,
+                "total_return": float(self.metrics["total_return"][row]),
+                "annual_return": float(self.metrics["annual_return"][row]),
+                "max_drawdown": float(self.metrics["max_drawdown"][row]),
+                "buys": int(self.buys[row]), "trades": int(self.sells[row]),
+                "win_rate": float(self.metrics["win_rate"][row]),
+                "fees": float(self.fees[row]), "exposure": float(self.exposure[row])}
+
+    def summary(self) -> Dict:
+        """Statistics across all stocks."""
+        total = self.metrics["total_return"]
+        traded = self.sells > 0
+        return {"stocks": len(self.codes), "days": len(self.dates),
+                "mean_return": float(total.mean()) if len(total) else 0.0,
+                "median_return": float(np.median(total)) if len(total) else 0.0,
+                "positive_share": float((total > 0).mean()) if len(total) else 0.0,
+                "mean_max_drawdown": float(self.metrics["max_drawdown"].mean()) if len(total) else 0.0,
+                "trades": int(self.sells.sum()),
+                "win_rate": float(self.wins[traded].sum() / self.sells[traded].sum()) if traded.any() else 0.0}
+
+
+def run_backtest(template: Strategy, panel: BarPanel, cash: float = DEFAULT_CASH,
+                 commission: float = COMMISSION, min_commission: float = MIN_COMMISSION,
+                 stamp_tax: float = STAMP_TAX) -> BacktestResult:
+    """
+    Backtest template's parameters on every stock of panel.
+
+    Each stock trades its own account of `cash`. Prices in the template
+    (grid base, entry) apply to the template's own stock; the others use
+    their first close.
+    """
+    targets = target_positions(template, panel)
+    closes = _ffill(panel.close)
+    previous = _shift(closes, 1)
+    with np.errstate(invalid="ignore"):
+        limit_up = np.round(previous * (1 + panel.limits[:, None]), 2)
+        limit_down = np.round(previous * (1 - panel.limits[:, None]), 2)
+
+    stocks, days = closes.shape
+    balance = np.full(stocks, float(cash))
+    shares = np.zeros(stocks)
+    cost = np.zeros(stocks)  # Cost basis of the shares held, fees included
+    held_target = np.zeros(stocks)  # Target of the last completed order
+    equity = np.empty((stocks, days))
+    positions = np.zeros((stocks, days))
+    buys, sells, wins = (np.zeros(stocks, dtype=int) for _ in range(3))
+    fees = np.zeros(stocks)
+    held_days = np.zeros(stocks, dtype=int)
+    if days:
+        equity[:, 0] = balance
+
+    for day in range(1, days):
+        price = panel.open[:, day]
+        tradable = ~np.isnan(price) & ~np.isnan(previous[:, day])
+        pending = tradable & (targets[:, day - 1] != held_target)
+        px = np.where(tradable, price, 1.0)
+        with np.errstate(invalid="ignore"):
+            wanted = np.floor(targets[:, day - 1] * (balance + shares * px) / (px * LOT_SIZE)) * LOT_SIZE
+            can_buy = price < limit_up[:, day] - 1e-6
+            can_sell = price > limit_down[:, day] + 1e-6
+        delta = np.where(pending, wanted - shares, 0.0)
+
+        # Buys, within the cash left after fees
+        affordable = np.floor(np.maximum(balance - min_commission, 0) / (px * (1 + commission) * LOT_SIZE)) * LOT_SIZE
+        bought = np.where((delta > 0) & can_buy, np.minimum(delta, affordable), 0.0)
+        amount = bought * px
+        fee = np.where(bought > 0, np.maximum(amount * commission, min_commission), 0.0)
+        balance -= amount + fee
+        shares += bought
+        cost += amount + fee
+
+        # Sells (never of shares bought this session: one fill per day)
+        sold = np.where((delta < 0) & can_sell, -delta, 0.0)
+        proceeds = sold * px
+        fee_sold = np.where(sold > 0, np.maximum(proceeds * commission, min_commission) + proceeds * stamp_tax, 0.0)
+        released = np.where(sold > 0, cost * sold / np.maximum(shares, 1), 0.0)
+        balance += proceeds - fee_sold
+        cost -= released
+        shares -= sold
+
+        done = pending & ((delta == 0) | (bought > 0) | (sold > 0) | ((delta > 0) & can_buy & (affordable == 0)))
+        held_target = np.where(done, targets[:, day - 1], held_target)
+        buys += bought > 0
+        sells += sold > 0
+        wins += (sold > 0) & (proceeds - fee_sold > released)
+        fees += fee + fee_sold
+        held_days += shares > 0
+        positions[:, day] = shares
+        equity[:, day] = balance + shares * np.nan_to_num(closes[:, day])
+
+    return BacktestResult(template, list(panel.codes), list(panel.dates), equity, positions, buys, sells, wins,
+                          fees, held_days / max(days, 1), cash)
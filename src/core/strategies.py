@@ -0,0 +1,116 @@
+"""
+Declarative trading strategies for the monitor panel
+
+A strategy is a plain dataclass describing what to watch for one stock;
+it holds no market state. StrategyEngine (core.strategy_engine) keeps
+the state and evaluates running strategies on every price update.
+strategy_from_dict() and Strategy.to_dict() round-trip them through
+JSON, keyed by the strategy's `kind`.
+"""
+from dataclasses import asdict, dataclass, fields
+from typing import ClassVar, Dict, Type
+
+BUY = "buy"
+SELL = "sell"
+ACTION_NAMES = {BUY: "买入", SELL: "卖出"}
+
+
+@dataclass
+class Strategy:
+    """Base of all strategies: the stock it watches"""
+    code: str
+    name: str = ""
+
+    kind: ClassVar[str] = ""
+    label: ClassVar[str] = ""
+    # Completed daily closes needed before the strategy can signal
+    history_days: ClassVar[int] = 0
+
+    def describe(self) -> str:
+        """Multi-line summary for the strategy preview panel."""
+        return f"策略名称: {self.label}"
+
+    def to_dict(self) -> Dict:
+        return {"kind": self.kind, **asdict(self)}
+
+
+@dataclass
+class MACrossStrategy(Strategy):
+    """Buy when the fast MA crosses above the slow MA, sell when it crosses below"""
+    fast: int = 5
+    slow: int = 20
+
+    kind: ClassVar[str] = "ma_cross"
+    label: ClassVar[str] = "均线交叉"
+
+    @property
+    def history_days(self) -> int:
+        return self.slow - 1
+
+    def describe(self) -> str:
+        return (f"策略名称: {self.label}\n监控周期: 日线 (实时价作为当日收盘)\n"
+                f"买入条件: MA{self.fast}上穿MA{self.slow}\n卖出条件: MA{self.fast}下穿MA{self.slow}")
+
+
+@dataclass
+class GridStrategy(Strategy):
+    """Buy each time the price falls a grid step lower, sell each time it rises one higher"""
+    base_price: float = 0.0  # 0 takes the first price seen
+    step_pct: float = 1.0
+    levels: int = 5  # Grid lines on each side of the base price
+
+    kind: ClassVar[str] = "grid"
+    label: ClassVar[str] = "网格交易"
+
+    def describe(self) -> str:
+        base = f"{self.base_price:.2f}" if self.base_price > 0 else "启动后首个价格"
+        return (f"策略名称: {self.label}\n基准价: {base}\n网格大小: {self.step_pct:g}%\n"
+                f"网格层数: 上下各 {self.levels} 层\n买入条件: 每下跌一格\n卖出条件: 每上涨一格")
+
+
+@dataclass
+class MACDDivergenceStrategy(Strategy):
+    """Buy on bullish divergence (lower low, higher DIF), sell on bearish divergence"""
+    fast: int = 12
+    slow: int = 26
+    signal: int = 9
+    lookback: int = 20  # Days searched for the previous extreme
+
+    kind: ClassVar[str] = "macd_divergence"
+    label: ClassVar[str] = "MACD背离"
+
+    @property
+    def history_days(self) -> int:
+        return self.slow + self.lookback
+
+    def describe(self) -> str:
+        return (f"策略名称: {self.label}\n参数: MACD({self.fast},{self.slow},{self.signal})\n"
+                f"回看: {self.lookback} 日\n底背离: 买入\n顶背离: 卖出")
+
+
+@dataclass
+class StopLossTakeProfitStrategy(Strategy):
+    """Sell once the price falls stop_loss_pct below or rises take_profit_pct above the entry"""
+    entry_price: float = 0.0  # 0 takes the first price seen
+    stop_loss_pct: float = 2.0
+    take_profit_pct: float = 5.0
+
+    kind: ClassVar[str] = "stop_loss_take_profit"
+    label: ClassVar[str] = "止损止盈"
+
+    def describe(self) -> str:
+        entry = f"{self.entry_price:.2f}" if self.entry_price > 0 else "启动后首个价格"
+        return (f"策略名称: {self.label}\n成本价: {entry}\n"
+                f"止损: -{self.stop_loss_pct:g}%\n止盈: +{self.take_profit_pct:g}%")
+
+
+STRATEGY_TYPES: Dict[str, Type[Strategy]] = {
+    cls.kind: cls for cls in (MACrossStrategy, GridStrategy, MACDDivergenceStrategy, StopLossTakeProfitStrategy)
+}
+
+
+def strategy_from_dict(data: Dict) -> Strategy:
+    """Strategy described by a to_dict() result; unknown keys are ignored."""
+    cls = STRATEGY_TYPES[data["kind"]]
+    names = {f.name for f in fields(cls)}
+    return cls(**{key: value for key, value in data.items() if key in names})
@@ -0,0 +1,525 @@
+"""
+Event-driven evaluation of monitor strategies
+
+StrategyEngine receives every batch of price-cache updates (MarketDataHub
+registers on_prices() as a StockDataService price listener) and evaluates
+the running strategies on it. Running strategies of the same kind share a
+kernel that keeps their parameters and incremental state (running MA
+sums, EMAs and lookback extremes, grid levels, entry prices) in NumPy
+arrays with one slot per strategy, so a quote batch is evaluated with a
+handful of array operations per kind, whatever the number of stocks and
+strategies. Daily indicators treat the live price as today's close; when
+the first quote of a new day arrives, the last price of the previous day
+is rolled into the history.
+
+Signals go to the registered listeners on the thread that delivered the
+quotes (the price poller), so listeners must be cheap or hand off, e.g.
+by emitting a Qt signal.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from core.strategies import (Strategy, MACrossStrategy, GridStrategy, MACDDivergenceStrategy,
+                                 StopLossTakeProfitStrategy, BUY, SELL)
+except ImportError:
+    # Fallback for relative imports if run as package
+    from .strategies import (Strategy, MACrossStrategy, GridStrategy, MACDDivergenceStrategy,
+                             StopLossTakeProfitStrategy, BUY, SELL)
+
+logger = logging.getLogger(__name__)
+
+STOPPED = "stopped"
+RUNNING = "running"
+TRIGGERED = "triggered"  # Fired its final signal (stop-loss / take-profit)
+
+# Quote batches whose evaluation time is kept for latency_stats()
+LATENCY_WINDOW = 2000
+
+
+@dataclass(frozen=True)
+class Signal:
+    """A strategy asking to buy or sell"""
+    strategy_id: int
+    code: str
+    action: str  # BUY or SELL
+    price: float
+    reason: str
+    time: str  # Timestamp of the quote
+    latency: float  # Seconds from receiving the quotes to emitting the signal
+
+
+# (slot, action, reason, done) of a strategy that fired
+Fired = Tuple[int, str, str, bool]
+
+
+class _Kernel:
+    """
+    Running strategies of one kind, one array slot per strategy.
+
+    Every kernel has the columns 'code' (index into the engine's code
+    table), 'day' (ordinal of the provisional daily bar, -1 before the
+    first quote) and 'last' (latest price); subclasses add their
+    parameters and state in new_slot().
+    """
+    kind = ""
+
+    def __init__(self):
+        self.ids: List[int] = []
+        self.cols: Dict[str, np.ndarray] = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def new_slot(self, strategy: Strategy) -> Dict:
+        """Initial column values of a slot for strategy."""
+        return {}
+
+    def add(self, strategy_id: int, strategy: Strategy, code_index: int, closes: Sequence[float]):
+        values = {"code": code_index, "day": -1, "last": np.nan}
+        values.update(self.new_slot(strategy))
+        for name, value in values.items():
+            row = np.asarray(value)[None, ...]
+            column = self.cols.get(name)
+            self.cols[name] = row.copy() if column is None else np.concatenate([column, row])
+        self.ids.append(strategy_id)
+        if closes:
+            self.seed(len(self.ids) - 1, closes)
+
+    def remove(self, strategy_id: int):
+        slot = self.ids.index(strategy_id)
+        del self.ids[slot]
+        for name, column in self.cols.items():
+            self.cols[name] = np.delete(column, slot, axis=0)
+
+    def slots_of(self, code_index: int) -> np.ndarray:
+        return np.flatnonzero(self.cols["code"] == code_index) if self.ids else np.empty(0, dtype=int)
+
+    def seed(self, slot: int, closes: Sequence[float]):
+        """Completed daily closes, oldest first, ending yesterday."""
+
+    def roll(self, rows: np.ndarray, closes: np.ndarray):
+        """Days ended for rows at closes."""
+
+    def evaluate(self, rows: np.ndarray, prices: np.ndarray, days: np.ndarray) -> List[Fired]:
+        return []
+
+    def step(self, price_by_code: np.ndarray, day_by_code: np.ndarray) -> List[Fired]:
+        """Evaluate every slot whose stock has a price in this batch."""
+        if not self.ids:
+            return []
+        prices = price_by_code[self.cols["code"]]
+        rows = np.flatnonzero(~np.isnan(prices))
+        if not rows.size:
+            return []
+        prices = prices[rows]
+        days = day_by_code[self.cols["code"][rows]]
+
+        slot_days = self.cols["day"][rows]
+        last = self.cols["last"][rows]
+        rolled = (slot_days != days) & (slot_days >= 0) & ~np.isnan(last)
+        if rolled.any():
+            self.roll(rows[rolled], last[rolled])
+        self.cols["day"][rows] = days
+        self.cols["last"][rows] = prices
+        return self.evaluate(rows, prices, days)
+
+
+def _last_sums(buffer: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Per row, the sum of the last counts[row] columns of buffer (NaN as 0)."""
+    width = buffer.shape[1]
+    cumulative = np.cumsum(np.nan_to_num(buffer), axis=1)
+    total = cumulative[:, -1]
+    start = width - counts - 1  # Column before the summed range
+    before = np.take_along_axis(cumulative, np.clip(start, 0, width - 1)[:, None], axis=1)[:, 0]
+    return total - np.where(start >= 0, before, 0.0)
+
+
+class _MACrossKernel(_Kernel):
+    kind = MACrossStrategy.kind
+
+    def width(self) -> int:
+        return self.cols["closes"].shape[1] if self.ids else 0
+
+    def new_slot(self, strategy: MACrossStrategy):
+        width = max(self.width(), strategy.slow - 1, 1)
+        if self.ids and width > self.width():
+            # Widen the close buffers on the left for the longer MA
+            pad = np.full((len(self.ids), width - self.width()), np.nan)
+            self.cols["closes"] = np.concatenate([pad, self.cols["closes"]], axis=1)
+        return {"fast": strategy.fast, "slow": strategy.slow, "closes": np.full(width, np.nan), "count": 0,
+                "fast_sum": 0.0, "slow_sum": 0.0, "side": np.int8(0)}
+
+    def resum(self, rows: np.ndarray):
+        closes = self.cols["closes"][rows]
+        self.cols["fast_sum"][rows] = _last_sums(closes, self.cols["fast"][rows] - 1)
+        self.cols["slow_sum"][rows] = _last_sums(closes, self.cols["slow"][rows] - 1)
+
+    def seed(self, slot, closes):
+        width = self.width()
+        closes = list(closes)[-width:]
+        self.cols["closes"][slot] = np.nan
+        self.cols["closes"][slot, width - len(closes):] = closes
+        self.cols["count"][slot] = len(closes)
+        self.cols["side"][slot] = 0
+        self.resum(np.array([slot]))
+
+    def roll(self, rows, closes):
+        buffer = self.cols["closes"]
+        buffer[rows, :-1] = buffer[rows, 1:]
+        buffer[rows, -1] = closes
+        self.cols["count"][rows] = np.minimum(self.cols["count"][rows] + 1, self.width())
+        self.resum(rows)
+
+    def evaluate(self, rows, prices, days):
+        c = self.cols
+        fast, slow = c["fast"][rows], c["slow"][rows]
+        ready = c["count"][rows] >= slow - 1
+        fast_ma = (c["fast_sum"][rows] + prices) / fast
+        slow_ma = (c["slow_sum"][rows] + prices) / slow
+        side = np.sign(fast_ma - slow_ma).astype(np.int8)
+        previous = c["side"][rows]
+        update = ready & (side != 0)
+        fire = update & (previous != 0) & (side != previous)
+        c["side"][rows[update]] = side[update]
+
+        fired = []
+        for i in np.flatnonzero(fire):
+            up = side[i] > 0
+            fired.append((int(rows[i]), BUY if up else SELL,
+                          f"MA{fast[i]}{'上穿' if up else '下穿'}MA{slow[i]} ({fast_ma[i]:.2f}/{slow_ma[i]:.2f})",
+                          False))
+        return fired
+
+
+class _GridKernel(_Kernel):
+    kind = GridStrategy.kind
+
+    def new_slot(self, strategy: GridStrategy):
+        return {"base": strategy.base_price if strategy.base_price > 0 else np.nan,
+                "step": strategy.step_pct, "levels": strategy.levels, "level": np.nan}
+
+    def evaluate(self, rows, prices, days):
+        c = self.cols
+        base = c["base"][rows]
+        unset = np.isnan(base)
+        base[unset] = prices[unset]
+        c["base"][rows] = base
+        step, levels = c["step"][rows], c["levels"][rows]
+        level = np.clip(np.floor((prices / base - 1) * 100 / step + 1e-9), -levels, levels)
+        previous = c["level"][rows]
+        c["level"][rows] = level
+        fire = ~np.isnan(previous) & (level != previous)
+
+        fired = []
+        for i in np.flatnonzero(fire):
+            steps = int(abs(level[i] - previous[i]))
+            line = base[i] * (1 + level[i] * step[i] / 100)
+            down = level[i] < previous[i]
+            fired.append((int(rows[i]), BUY if down else SELL,
+                          f"{'下跌' if down else '上涨'} {steps} 格至第 {int(level[i])} 格 ({line:.2f})", False))
+        return fired
+
+
+class _MACDDivergenceKernel(_Kernel):
+    kind = MACDDivergenceStrategy.kind
+
+    def width(self) -> int:
+        return self.cols["window_close"].shape[1] if self.ids else 0
+
+    def new_slot(self, strategy: MACDDivergenceStrategy):
+        width = max(self.width(), strategy.lookback, 1)
+        if self.ids and width > self.width():
+            pad = np.full((len(self.ids), width - self.width()), np.nan)
+            for name in ("window_close", "window_dif"):
+                self.cols[name] = np.concatenate([pad, self.cols[name]], axis=1)
+        return {"alpha_fast": 2.0 / (strategy.fast + 1), "alpha_slow": 2.0 / (strategy.slow + 1),
+                "need": strategy.history_days, "lookback": strategy.lookback,
+                "ema_fast": np.nan, "ema_slow": np.nan, "days": 0,
+                "window_close": np.full(width, np.nan), "window_dif": np.full(width, np.nan),
+                "low_close": np.nan, "low_dif": np.nan, "high_close": np.nan, "high_dif": np.nan,
+                "fired_buy": -1, "fired_sell": -1}
+
+    def seed(self, slot, closes):
+        c = self.cols
+        c["ema_fast"][slot] = c["ema_slow"][slot] = np.nan
+        c["days"][slot] = 0
+        c["window_close"][slot] = c["window_dif"][slot] = np.nan
+        rows = np.array([slot])
+        for close in closes:
+            self.roll(rows, np.array([close]), extremes=False)
+        self.update_extremes(rows)
+
+    def roll(self, rows, closes, extremes=True):
+        c = self.cols
+        fresh = np.isnan(c["ema_fast"][rows])
+        ema_fast = np.where(fresh, closes, c["ema_fast"][rows])
+        ema_slow = np.where(fresh, closes, c["ema_slow"][rows])
+        ema_fast += c["alpha_fast"][rows] * (closes - ema_fast)
+        ema_slow += c["alpha_slow"][rows] * (closes - ema_slow)
+        c["ema_fast"][rows], c["ema_slow"][rows] = ema_fast, ema_slow
+        c["days"][rows] += 1
+        for name, values in (("window_close", closes), ("window_dif", ema_fast - ema_slow)):
+            window = c[name]
+            window[rows, :-1] = window[rows, 1:]
+            window[rows, -1] = values
+        if extremes:
+            self.update_extremes(rows)
+
+    def update_extremes(self, rows):
+        """Lowest and highest close of each row's lookback window, with their DIF."""
+        c = self.cols
+        width = self.width()
+        outside = np.arange(width)[None, :] < (width - c["lookback"][rows])[:, None]
+        closes = np.where(outside, np.nan, c["window_close"][rows])
+        valid = ~np.isnan(closes).all(axis=1)
+        if not valid.any():
+            return
+        rows, closes = rows[valid], closes[valid]
+        difs = c["window_dif"][rows]
+        low = np.nanargmin(closes, axis=1)[:, None]
+        high = np.nanargmax(closes, axis=1)[:, None]
+        c["low_close"][rows] = np.take_along_axis(closes, low, axis=1)[:, 0]
+        c["low_dif"][rows] = np.take_along_axis(difs, low, axis=1)[:, 0]
+        c["high_close"][rows] = np.take_along_axis(closes, high, axis=1)[:, 0]
+        c["high_dif"][rows] = np.take_along_axis(difs, high, axis=1)[:, 0]
+
+    def evaluate(self, rows, prices, days):
+        c = self.cols
+        ready = c["days"][rows] >= c["need"][rows]
+        ema_fast, ema_slow = c["ema_fast"][rows], c["ema_slow"][rows]
+        dif = ((ema_fast + c["alpha_fast"][rows] * (prices - ema_fast))
+               - (ema_slow + c["alpha_slow"][rows] * (prices - ema_slow)))
+        low_close, low_dif = c["low_close"][rows], c["low_dif"][rows]
+        high_close, high_dif = c["high_close"][rows], c["high_dif"][rows]
+        # Once per day and direction
+        buy = ready & (prices < low_close) & (dif > low_dif) & (c["fired_buy"][rows] != days)
+        sell = ready & ~buy & (prices > high_close) & (dif < high_dif) & (c["fired_sell"][rows] != days)
+        c["fired_buy"][rows[buy]] = days[buy]
+        c["fired_sell"][rows[sell]] = days[sell]
+
+        fired = []
+        for i in np.flatnonzero(buy):
+            fired.append((int(rows[i]), BUY, f"底背离: 价格创 {low_close[i]:.2f} 以下新低, "
+                                             f"DIF {dif[i]:.3f} > {low_dif[i]:.3f}", False))
+        for i in np.flatnonzero(sell):
+            fired.append((int(rows[i]), SELL, f"顶背离: 价格创 {high_close[i]:.2f} 以上新高, "
+                                              f"DIF {dif[i]:.3f} < {high_dif[i]:.3f}", False))
+        return fired
+
+
+class _StopLossTakeProfitKernel(_Kernel):
+    kind = StopLossTakeProfitStrategy.kind
+
+    def new_slot(self, strategy: StopLossTakeProfitStrategy):
+        return {"entry": strategy.entry_price if strategy.entry_price > 0 else np.nan,
+                "stop_loss": strategy.stop_loss_pct, "take_profit": strategy.take_profit_pct}
+
+    def evaluate(self, rows, prices, days):
+        c = self.cols
+        entry = c["entry"][rows]
+        unset = np.isnan(entry)
+        entry[unset] = prices[unset]
+        c["entry"][rows] = entry
+        change = (prices / entry - 1) * 100
+        stop = change <= -c["stop_loss"][rows]
+        take = ~stop & (change >= c["take_profit"][rows])
+
+        fired = []
+        for i in np.flatnonzero(stop | take):
+            label = "止损" if stop[i] else "止盈"
+            fired.append((int(rows[i]), SELL, f"{label}: 相对成本 {entry[i]:.2f} {change[i]:+.2f}%", True))
+        return fired
+
+
+KERNELS = {cls.kind: cls for cls in (_MACrossKernel, _GridKernel, _MACDDivergenceKernel,
+                                     _StopLossTakeProfitKernel)}
+
+
+def completed_closes(kline_data: List[Dict], today: str) -> List[float]:
+    """Closes of the bars before today (today's bar is fed by quotes)."""
+    return [float(bar["close"]) for bar in kline_data if str(bar.get("date", ""))[:10] < today]
+
+
+def _day_ordinal(stamp: str) -> int:
+    try:
+        return date.fromisoformat(stamp[:10]).toordinal()
+    except ValueError:
+        return date.today().toordinal()
+
+
+class StrategyEngine:
+    """
+    Strategies by id, evaluated on every price update of their stock.
+
+    add() registers a strategy (stopped); start() gives it a kernel slot
+    with fresh state and stop() releases it. seed() gives a stock's daily
+    bars to every strategy of that stock, and to those started later.
+    Thread-safe: the UI edits strategies while the price poller calls
+    on_prices().
+    """
+
+    def __init__(self, latency_window: int = LATENCY_WINDOW):
+        self._strategies: Dict[int, Strategy] = {}
+        self._status: Dict[int, str] = {}
+        self._kernels = {kind: cls() for kind, cls in KERNELS.items()}
+        self._code_index: Dict[str, int] = {}  # Stock code -> index used by the kernels
+        self._codes: List[str] = []
+        self._history: Dict[str, List[float]] = {}  # Seeded closes per stock
+        self._listeners: List[Callable[[Signal], None]] = []
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self.latencies = deque(maxlen=latency_window)  # Seconds per evaluated quote batch
+
+    # --- Strategies ---
+    def add(self, strategy: Strategy) -> int:
+        """Register a stopped strategy and return its id."""
+        with self._lock:
+            strategy_id = self._next_id
+            self._next_id += 1
+            self._strategies[strategy_id] = strategy
+            self._status[strategy_id] = STOPPED
+        return strategy_id
+
+    def remove(self, strategy_id: int):
+        with self._lock:
+            self._release(strategy_id)
+            self._strategies.pop(strategy_id, None)
+            self._status.pop(strategy_id, None)
+
+    def start(self, strategy_id: int):
+        """Run a strategy from fresh state (seeded with its stock's history)."""
+        with self._lock:
+            strategy = self._strategies[strategy_id]
+            if self._status[strategy_id] == RUNNING:
+                return
+            code_index = self._code_index.setdefault(strategy.code, len(self._codes))
+            if code_index == len(self._codes):
+                self._codes.append(strategy.code)
+            self._kernels[strategy.kind].add(strategy_id, strategy, code_index,
+                                             self._history.get(strategy.code, []))
+            self._status[strategy_id] = RUNNING
+
+    def stop(self, strategy_id: int):
+        with self._lock:
+            if self._status.get(strategy_id) == RUNNING:
+                self._release(strategy_id)
+                self._status[strategy_id] = STOPPED
+
+    def _release(self, strategy_id: int):
+        if self._status.get(strategy_id) == RUNNING:
+            self._kernels[self._strategies[strategy_id].kind].remove(strategy_id)
+
+    def strategy(self, strategy_id: int) -> Optional[Strategy]:
+        return self._strategies.get(strategy_id)
+
+    def status(self, strategy_id: int) -> Optional[str]:
+        return self._status.get(strategy_id)
+
+    def running_count(self) -> int:
+        with self._lock:
+            return sum(len(kernel) for kernel in self._kernels.values())
+
+    def running_codes(self) -> List[str]:
+        with self._lock:
+            return sorted({self._strategies[i].code for i, status in self._status.items() if status == RUNNING})
+
+    # --- Market data ---
+    def has_history(self, code: str) -> bool:
+        return code in self._history
+
+    def seed(self, code: str, kline_data: List[Dict], today: Optional[str] = None):
+        """Daily bars (oldest first) of a stock for its history-based strategies."""
+        closes = completed_closes(kline_data or [], today or date.today().isoformat())
+        with self._lock:
+            self._history[code] = closes
+            code_index = self._code_index.get(code)
+            if code_index is None:
+                return
+            for kernel in self._kernels.values():
+                for slot in kernel.slots_of(code_index):
+                    kernel.seed(int(slot), closes)
+
+    def add_listener(self, listener: Callable[[Signal], None]):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[Signal], None]):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def on_prices(self, quotes: Dict[str, Dict], received: Optional[float] = None) -> List[Signal]:
+        """
+        Evaluate the running strategies on a batch of quotes.
+
+        Args:
+            quotes: Price cache entries by stock code, with 'current' and 'timestamp'
+            received: perf_counter() when the quotes arrived; defaults to now
+
+        Returns:
+            The signals emitted, after they were passed to the listeners
+        """
+        received = time.perf_counter() if received is None else received
+        results = []
+        with self._lock:
+            if not self._codes:
+                return []
+            prices = np.full(len(self._codes), np.nan)
+            days = np.full(len(self._codes), -1, dtype=np.int64)
+            stamps = {}
+            for code, price_data in quotes.items():
+                index = self._code_index.get(code)
+                price = price_data.get("current") or 0.0
+                if index is None or price <= 0:
+                    continue
+                stamp = str(price_data.get("timestamp") or "")
+                prices[index] = price
+                days[index] = _day_ordinal(stamp)
+                stamps[code] = stamp
+            if not stamps:
+                return []
+
+            triggered = []
+            for kernel in self._kernels.values():
+                fired = kernel.step(prices, days)
+                for slot, action, reason, done in fired:
+                    strategy_id = kernel.ids[slot]
+                    code = self._strategies[strategy_id].code
+                    results.append((strategy_id, code, action, float(prices[self._code_index[code]]), reason))
+                    if done:
+                        triggered.append(strategy_id)
+            for strategy_id in triggered:
+                self._release(strategy_id)
+                self._status[strategy_id] = TRIGGERED
+            listeners = list(self._listeners)
+
+        signals = [Signal(strategy_id, code, action, price, reason, stamps[code], time.perf_counter() - received)
+                   for strategy_id, code, action, price, reason in results]
+        self.latencies.append(time.perf_counter() - received)
+        for signal in signals:
+            for listener in listeners:
+                try:
+                    listener(signal)
+                except Exception as e:
+                    logger.error(f"Strategy signal listener failed: {e}")
+        return signals
+
+    def on_tick(self, code: str, price_data: Dict, received: Optional[float] = None) -> List[Signal]:
+        """on_prices() for a single quote."""
+        return self.on_prices({code: price_data}, received)
+
+    def latency_stats(self) -> Dict:
+        """Quote-to-signal latency over recent batches: count, p50, p99 and max (ms)."""
+        values = np.array(self.latencies) * 1000
+        if not len(values):
+            return {"count": 0, "p50": 0.0, "p99": 0.0, "max": 0.0}
+        return {"count": len(values), "p50": float(np.percentile(values, 50)),
+                "p99": float(np.percentile(values, 99)), "max": float(values.max())}
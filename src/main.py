@@ -5,12 +5,17 @@ import os
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
 
-from PyQt6.QtWidgets import QApplication
-from ui.main_window import MainWindow
+from utils.startup_trace import startup_trace
+
+with startup_trace.phase("imports"):
+    from PyQt6.QtWidgets import QApplication
+    from ui.main_window import MainWindow
 
 def main():
-    app = QApplication(sys.argv)
-    window = MainWindow()
+    with startup_trace.phase("qapplication"):
+        app = QApplication(sys.argv)
+    with startup_trace.phase("main window"):
+        window = MainWindow()
     window.show()
     sys.exit(app.exec())
 
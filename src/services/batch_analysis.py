@@ -0,0 +1,126 @@
+"""
+Batched multi-stock analysis prompts with structured output
+
+Auto-analysis packs several candidates, each with a compact row of its
+numbers, into a single request and asks for a JSON array of
+{code, score, reason}. parse_batch_response() validates the answer item
+by item, so a partly malformed reply still yields the stocks it got
+right and only the rest need to be asked again.
+"""
+import json
+import re
+from typing import Dict, Sequence
+
+# Stocks per request
+BATCH_SIZE = 10
+
+# (field, header, format) of the numbers sent with each stock
+CONTEXT_FIELDS = (
+    ("price", "现价", "{:.2f}"),
+    ("change", "涨跌%", "{:+.2f}"),
+    ("turnover", "换手%", "{:.2f}"),
+    ("volume_ratio", "量比", "{:.2f}"),
+    ("ma_bullish", "均线多头", None),
+    ("kdj_k", "K", "{:.1f}"),
+    ("kdj_d", "D", "{:.1f}"),
+    ("kdj_j", "J", "{:.1f}"),
+    ("dif", "DIF", "{:.3f}"),
+    ("dea", "DEA", "{:.3f}"),
+    ("macd", "MACD", "{:.3f}"),
+    ("rsi", "RSI", "{:.1f}"),
+    ("ma20", "MA20", "{:.2f}"),
+    ("ma60", "MA60", "{:.2f}"),
+)
+CONTEXT_FIELD_NAMES = tuple(field for field, _, _ in CONTEXT_FIELDS)
+
+MAX_REASON_CHARS = 200
+
+BATCH_PROMPT = """请根据下表中每只股票的行情与技术指标，逐只评估其是否符合买入标准。
+
+{table}
+
+只输出一个 JSON 数组，不要输出其他文字。每只股票对应数组中的一个元素：
+{{"code": "股票代码", "score": 0到100的整数买入评分, "reason": "不超过30字的理由"}}"""
+
+
+def format_stock_table(stocks: Sequence[Dict]) -> str:
+    """One compact CSV-style row per stock; missing fields are left empty."""
+    lines = [",".join(["代码", "名称"] + [header for _, header, _ in CONTEXT_FIELDS])]
+    for stock in stocks:
+        cells = [str(stock["code"]), str(stock["name"])]
+        for field, _, fmt in CONTEXT_FIELDS:
+            value = stock.get(field)
+            if value is None:
+                cells.append("")
+            elif fmt is None:
+                cells.append("是" if value else "否")
+            else:
+                cells.append(fmt.format(float(value)))
+        lines.append(",".join(cells))
+    return "\n".join(lines)
+
+
+def build_batch_prompt(stocks: Sequence[Dict]) -> str:
+    """Prompt asking for a JSON array with one {code, score, reason} per stock."""
+    return BATCH_PROMPT.format(table=format_stock_table(stocks))
+
+
+def _extract_json_array(text: str):
+    """The first JSON array in text, allowing Markdown fences and surrounding prose."""
+    fenced = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1)
+    start = text.find("[")
+    end = text.rfind("]")
+    if start < 0 or end <= start:
+        return None
+    try:
+        value = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    return value if isinstance(value, list) else None
+
+
+def _normalize_code(value) -> str:
+    code = str(value).strip()
+    return code.zfill(6) if code.isdigit() else code
+
+
+def parse_batch_response(text: str, stocks: Sequence[Dict]) -> Dict[str, Dict]:
+    """
+    Validated results of a batch answer.
+
+    Items whose code is not in the batch, whose score is not a number in
+    [0, 100], or that repeat an earlier code are dropped.
+
+    Args:
+        text: Raw model output
+        stocks: The stocks the prompt asked about
+
+    Returns:
+        Dict of code -> {'code', 'score' (int), 'reason'} for the stocks
+        answered correctly; stocks missing from it should be asked again
+    """
+    expected = {str(stock["code"]) for stock in stocks}
+    items = _extract_json_array(text or "")
+    results: Dict[str, Dict] = {}
+    for item in items or []:
+        if not isinstance(item, dict):
+            continue
+        code = _normalize_code(item.get("code", ""))
+        if code not in expected or code in results:
+            continue
+        try:
+            score = float(item.get("score"))
+        except (TypeError, ValueError):
+            continue
+        if not 0 <= score <= 100:
+            continue
+        reason = item.get("reason", "")
+        results[code] = {
+            "code": code,
+            "score": int(round(score)),
+            "reason": str(reason).strip()[:MAX_REASON_CHARS] if reason is not None else "",
+        }
+    return results
+
@@ -0,0 +1,297 @@
+"""
+Token-budgeted chat history with a rolling summary
+
+Sending the whole conversation on every request makes long sessions
+slower, costlier and eventually too long for the model. ChatMemory keeps
+the recent turns verbatim and, once they exceed the model's token
+budget, folds the oldest turns into a running summary, so the history
+sent with a request stays bounded however long the session runs.
+
+ChatMemoryStore keeps one ChatMemory per context (a stock code) in a
+bounded LRU; evicted contexts can be spilled to disk and are read back
+when their stock is selected again.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# History tokens per request unless the provider config sets "history_tokens"
+DEFAULT_HISTORY_TOKENS = 4000
+# Compaction shrinks the history to this fraction of the budget, so it
+# runs once every few turns rather than on every request
+COMPACT_TARGET = 0.5
+# The running summary itself is kept below this share of the budget
+SUMMARY_SHARE = 0.25
+# Newest turns never folded into the summary (unless they alone exceed the budget)
+KEEP_RECENT_TURNS = 2
+
+# Per-stock conversations held in memory; older ones are spilled or dropped
+MAX_CONTEXTS = 32
+
+
+def default_spill_dir() -> str:
+    """Spill directory private to this process (created on the first spill)."""
+    return os.path.join(tempfile.gettempdir(), f"stock_chat_contexts_{os.getpid()}")
+
+_encoders = {}
+_encoders_lock = threading.Lock()
+
+
+def _encoder(model_name: Optional[str]):
+    """tiktoken encoder for the model, or None if tiktoken or its data is unavailable."""
+    key = model_name or ""
+    with _encoders_lock:
+        if key in _encoders:
+            return _encoders[key]
+    encoder = None
+    try:
+        import tiktoken
+        try:
+            encoder = tiktoken.encoding_for_model(model_name) if model_name else None
+        except KeyError:
+            encoder = None
+        if encoder is None:
+            encoder = tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # Not installed, or the encoding files cannot be downloaded
+        encoder = None
+    with _encoders_lock:
+        _encoders[key] = encoder
+    return encoder
+
+
+def count_tokens(text: str, model_name: Optional[str] = None) -> int:
+    """
+    Tokens in text for the model.
+
+    Uses tiktoken when available; otherwise estimates one token per CJK
+    character and one per four other characters, which errs on the high
+    side for Chinese text.
+    """
+    if not text:
+        return 0
+    encoder = _encoder(model_name)
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    cjk = sum(1 for ch in text if "⺀" <= ch <= "鿿" or "豈" <= ch <= "￯")
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def history_token_budget(provider_config) -> int:
+    """History token budget of a provider config."""
+    try:
+        return max(200, int((provider_config or {}).get("history_tokens", DEFAULT_HISTORY_TOKENS)))
+    except (TypeError, ValueError):
+        return DEFAULT_HISTORY_TOKENS
+
+
+class ChatMemory:
+    """
+    Conversation as (role, content) messages plus a summary of older turns.
+
+    Roles are "human" and "ai" (the LangChain message types). Each message
+    is stored with its token count so budgeting never re-counts history.
+    """
+
+    def __init__(self, messages: Sequence[Tuple[str, str]] = (), model_name: Optional[str] = None):
+        self.model_name = model_name
+        self.summary = ""
+        self.summary_tokens = 0
+        self.entries: List[Tuple[str, str, int]] = []  # role, content, tokens
+        for role, content in messages:
+            self.add_message(role, content)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        self.summary = ""
+        self.summary_tokens = 0
+        self.entries = []
+
+    def set_model(self, model_name: Optional[str]):
+        """Count tokens with model_name's encoding from now on, recounting the stored history."""
+        if model_name == self.model_name:
+            return
+        self.model_name = model_name
+        self.entries = [(role, content, count_tokens(content, model_name)) for role, content, _ in self.entries]
+        self.summary_tokens = count_tokens(self.summary, model_name)
+
+    def add_message(self, role: str, content: str):
+        self.entries.append((role, content, count_tokens(content, self.model_name)))
+
+    def add_turn(self, user_input: str, response: str):
+        self.add_message("human", user_input)
+        self.add_message("ai", response)
+
+    def set_summary(self, summary: str):
+        self.summary = summary.strip()
+        self.summary_tokens = count_tokens(self.summary, self.model_name)
+
+    def token_count(self) -> int:
+        """Tokens of the summary plus every stored message."""
+        return self.summary_tokens + sum(tokens for _, _, tokens in self.entries)
+
+    def messages(self) -> List[Tuple[str, str]]:
+        """(role, content) of the history to send, the summary first as a system note."""
+        head = [("system", f"此前对话的摘要：\n{self.summary}")] if self.summary else []
+        return head + [(role, content) for role, content, _ in self.entries]
+
+    def to_dict(self) -> Dict:
+        return {"summary": self.summary,
+                "messages": [[role, content] for role, content, _ in self.entries]}
+
+    @classmethod
+    def from_dict(cls, data: Dict, model_name: Optional[str] = None) -> "ChatMemory":
+        memory = cls([(role, content) for role, content in data.get("messages", [])], model_name)
+        memory.set_summary(data.get("summary", ""))
+        return memory
+
+    def as_langchain_messages(self):
+        from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+        types = {"system": SystemMessage, "human": HumanMessage, "ai": AIMessage}
+        return [types[role](content=content) for role, content in self.messages()]
+
+    def fit(self, budget: int, summarize: Optional[Callable[[str, List[Tuple[str, str]]], str]] = None):
+        """
+        Bring the history within budget tokens.
+
+        When over budget, the oldest turns are removed until the messages
+        take COMPACT_TARGET of the budget, keeping the newest
+        KEEP_RECENT_TURNS turns unless they alone leave no room for the
+        summary. summarize(previous_summary, removed_messages) returns the
+        new running summary, which is capped at SUMMARY_SHARE of the
+        budget; without a summarizer, or if it fails, the removed turns are
+        simply dropped.
+        """
+        if self.token_count() <= budget:
+            return
+
+        def message_tokens():
+            return sum(tokens for _, _, tokens in self.entries)
+
+        removed = []
+        keep = KEEP_RECENT_TURNS * 2
+        while len(self.entries) > keep and message_tokens() > budget * COMPACT_TARGET:
+            removed.extend(self.entries[:2])  # One human/ai turn
+            del self.entries[:2]
+        while self.entries and message_tokens() > budget * (1 - SUMMARY_SHARE):
+            removed.extend(self.entries[:2])
+            del self.entries[:2]
+
+        if removed and summarize is not None:
+            try:
+                self.set_summary(summarize(self.summary, [(role, content) for role, content, _ in removed]) or "")
+            except Exception as e:
+                logger.warning("Chat history summarization failed, dropping old turns: %s", e)
+
+        # Cut an oversized summary, keeping its most recent part
+        limit = int(budget * SUMMARY_SHARE)
+        while self.summary_tokens > limit:
+            keep_chars = int(len(self.summary) * limit / self.summary_tokens) - 1
+            self.set_summary(self.summary[len(self.summary) - keep_chars:] if keep_chars > 0 else "")
+
+
+class ChatMemoryStore:
+    """
+    LRU of ChatMemory objects keyed by context (e.g. stock code).
+
+    At most max_contexts conversations stay in memory. With a spill_dir,
+    the least recently used one is written there as JSON when evicted and
+    loaded again by get(). The store only ever reads or deletes the files
+    it wrote itself, so several stores may share a directory; close()
+    removes what is left of them (and the directory, if it ends up empty),
+    so conversations do not outlive the session. Without a spill_dir
+    evicted conversations are discarded.
+    """
+
+    def __init__(self, max_contexts: int = MAX_CONTEXTS, spill_dir: Optional[str] = None):
+        self.max_contexts = max(1, max_contexts)
+        self.spill_dir = spill_dir
+        self._memories: "OrderedDict[str, ChatMemory]" = OrderedDict()
+        self._spilled = set()  # Keys with a spill file written by this store
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._memories)
+
+    def _spill_path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:24]
+        return os.path.join(self.spill_dir, f"{digest}.json")
+
+    def get(self, key: str) -> ChatMemory:
+        """Conversation for key, restored from disk or created empty if needed."""
+        with self._lock:
+            memory = self._memories.get(key)
+            if memory is not None:
+                self._memories.move_to_end(key)
+                return memory
+
+            memory = self._load(key) or ChatMemory()
+            self._memories[key] = memory
+            while len(self._memories) > self.max_contexts:
+                old_key, old_memory = self._memories.popitem(last=False)
+                self._spill(old_key, old_memory)
+            return memory
+
+    def peek(self, key: str) -> Optional[ChatMemory]:
+        """Conversation for key if it is held in memory, without touching the LRU order."""
+        with self._lock:
+            return self._memories.get(key)
+
+    def discard(self, key: str):
+        """Forget the conversation for key, including any spilled copy."""
+        with self._lock:
+            self._memories.pop(key, None)
+            self._remove_spill(key)
+
+    def close(self):
+        """Delete this store's spill files; the conversations in memory are kept."""
+        with self._lock:
+            for key in list(self._spilled):
+                self._remove_spill(key)
+            if self.spill_dir:
+                try:
+                    os.rmdir(self.spill_dir)
+                except OSError:
+                    pass  # Missing, or holds files of another store
+
+    def _remove_spill(self, key: str):
+        if key in self._spilled:
+            self._spilled.discard(key)
+            try:
+                os.remove(self._spill_path(key))
+            except OSError:
+                pass
+
+    def _load(self, key: str) -> Optional[ChatMemory]:
+        if key not in self._spilled:
+            return None
+        path = self._spill_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Failed to restore chat context %s: %s", key, e)
+            return None
+        finally:
+            self._remove_spill(key)
+        return ChatMemory.from_dict(data)
+
+    def _spill(self, key: str, memory: ChatMemory):
+        if not self.spill_dir or not (memory.entries or memory.summary):
+            return
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(self._spill_path(key), "w", encoding="utf-8") as f:
+                json.dump(memory.to_dict(), f, ensure_ascii=False)
+            self._spilled.add(key)
+        except OSError as e:
+            logger.error("Failed to spill chat context %s: %s", key, e)
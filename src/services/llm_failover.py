@@ -0,0 +1,167 @@
+"""
+Hedged and failover streaming across LLM providers
+
+A stalled provider would otherwise block a request until the HTTP
+client's timeout. hedged_stream() runs each attempt on its own thread
+and, per the prompt template's settings:
+
+- hedging: if the first model sends no token within hedge_after seconds,
+  the same request is started on a backup model, and whichever answer
+  starts streaming first is kept (the other is abandoned);
+- failover: if an attempt fails before any token was sent, the request
+  moves on to the next backup model.
+
+Once a model has started answering, its answer is final: an error in the
+middle of the stream is raised to the caller, as chunks already shown
+cannot be taken back.
+"""
+import math
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterator, Optional, Sequence
+
+# Prompt template settings, see failover_settings()
+DEFAULT_HEDGE_AFTER = 0.0  # Seconds; 0 disables hedging
+DEFAULT_FAILOVER = True
+# Backup requests a single hedge may start
+MAX_HEDGES = 1
+
+
+def failover_settings(prompt_data: Optional[Dict]):
+    """(hedge_after seconds, failover) of a prompt template config."""
+    prompt_data = prompt_data or {}
+    try:
+        hedge_after = float(prompt_data.get("hedge_after", DEFAULT_HEDGE_AFTER))
+    except (TypeError, ValueError):
+        hedge_after = DEFAULT_HEDGE_AFTER
+    if not math.isfinite(hedge_after) or hedge_after < 0:
+        hedge_after = DEFAULT_HEDGE_AFTER
+    failover = prompt_data.get("failover", DEFAULT_FAILOVER)
+    if isinstance(failover, str):  # Hand-edited config, e.g. "false"
+        failover = failover.strip().lower() in ("1", "true", "yes", "on")
+    elif not isinstance(failover, (bool, int, float)):
+        failover = DEFAULT_FAILOVER
+    return hedge_after, bool(failover)
+
+
+class StreamAttempt:
+    """One model streaming one request on a daemon thread into a shared queue."""
+
+    def __init__(self, model_name: str, chain, inputs: Dict, events: "queue.Queue"):
+        self.model_name = model_name
+        self.started = time.perf_counter()
+        self.first_chunk_at = None
+        self.chunks = 0
+        self.finished = False
+        self.cancelled = False
+        self._thread = threading.Thread(target=self._run, args=(chain, inputs, events), daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """Stop reading the stream; nothing more is queued."""
+        self.cancelled = True
+
+    def _run(self, chain, inputs, events):
+        try:
+            for chunk in chain.stream(inputs):
+                if self.cancelled:
+                    return
+                events.put((self, "chunk", chunk))
+        except Exception as e:
+            if not self.cancelled:
+                events.put((self, "error", e))
+            return
+        if not self.cancelled:
+            events.put((self, "done", None))
+
+
+def hedged_stream(model_names: Sequence[str], make_chain: Callable[[str], object], inputs: Dict,
+                  hedge_after: float = DEFAULT_HEDGE_AFTER, failover: bool = DEFAULT_FAILOVER,
+                  telemetry=None, on_winner: Optional[Callable[[str], None]] = None) -> Iterator[str]:
+    """
+    Stream the answer of the first model in model_names, hedging and
+    failing over to the following ones.
+
+    make_chain(model_name) returns the chain to call for a model, and
+    on_winner(model_name), if given, is told which model answers before
+    its first chunk is yielded. Each finished, failed or outrun attempt
+    is recorded in telemetry (an LLMTelemetry) if given; an attempt outrun
+    before sending a token counts as failed. Raises the last error if
+    every attempt failed.
+    """
+    events = queue.Queue()
+    backups = list(model_names[1:])
+    attempts = []
+    winner = None
+    hedges = 0
+    last_error = None
+
+    def launch(model_name):
+        attempts.append(StreamAttempt(model_name, make_chain(model_name), inputs, events))
+
+    def record(attempt, ok, ttft=None, tokens_per_sec=None):
+        if telemetry is not None:
+            telemetry.record(attempt.model_name, ttft, tokens_per_sec, ok=ok)
+
+    def fail_over():
+        if failover and backups:
+            launch(backups.pop(0))
+
+    launch(model_names[0])
+    try:
+        while True:
+            timeout = None
+            if winner is None and hedge_after > 0 and hedges < MAX_HEDGES and backups:
+                timeout = max(0.0, attempts[0].started + hedge_after * (hedges + 1) - time.perf_counter())
+            try:
+                attempt, kind, payload = events.get(timeout=timeout)
+            except queue.Empty:
+                # No token yet: race the same request on a backup model
+                hedges += 1
+                launch(backups.pop(0))
+                continue
+            if attempt.cancelled or (winner is not None and attempt is not winner):
+                continue
+
+            if kind == "chunk":
+                attempt.chunks += 1
+                if not payload:
+                    continue
+                if winner is None:
+                    winner = attempt
+                    winner.first_chunk_at = time.perf_counter()
+                    for other in attempts:
+                        if other is not winner and not other.finished:
+                            other.cancel()
+                            # Started earlier and still silent: a stall, not a measured answer
+                            if other.started <= winner.started:
+                                record(other, False)
+                    if on_winner is not None:
+                        on_winner(winner.model_name)
+                yield payload
+                continue
+
+            attempt.finished = True
+            if kind == "error":
+                record(attempt, False)
+                if winner is not None:
+                    raise payload
+                last_error = payload
+            elif winner is None:
+                # Finished without a single token
+                record(attempt, False)
+            else:
+                generation = time.perf_counter() - winner.first_chunk_at
+                record(winner, True, winner.first_chunk_at - winner.started,
+                       (winner.chunks - 1) / generation if winner.chunks > 1 and generation > 0 else None)
+                return
+
+            fail_over()
+            if all(a.finished for a in attempts):
+                if last_error is not None:
+                    raise last_error
+                return  # Empty answer
+    finally:
+        for attempt in attempts:
+            attempt.cancel()
@@ -1,8 +1,34 @@
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.messages import HumanMessage, AIMessage
+import hashlib
 import os
+import threading
+from datetime import datetime
+
+# langchain takes about a second to import, so it is loaded on first use
+# (or by the warm-up thread, see utils.warmup) instead of at startup
+LANGCHAIN_MODULES = (
+    "langchain_openai",
+    "langchain_core.prompts",
+    "langchain_core.output_parsers",
+    "langchain_core.messages",
+)
+
+# Connection pool of each cached client; idle connections are kept open
+# for follow-up questions so they skip the TCP/TLS handshake
+POOL_MAX_CONNECTIONS = 10
+POOL_KEEPALIVE_CONNECTIONS = 5
+POOL_KEEPALIVE_EXPIRY = 120.0  # seconds
+DEFAULT_SYSTEM_PROMPT = "You are a helpful assistant for stock analysis."
+
+# Folding old turns into the running chat summary (see services.chat_memory)
+SUMMARY_PROMPT = ("请将以下对话压缩为简洁的中文摘要，保留涉及的股票代码、关键数据、"
+                  "结论和用户的偏好与要求，不超过300字。只输出摘要。")
+SUMMARY_MESSAGE_CHARS = 2000  # Longer messages are cut before summarizing
+
+
+def client_cache_key(model_name, base_url, api_key):
+    """Identify a provider config without keeping the API key itself in the key."""
+    key_hash = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+    return (model_name, (base_url or "").strip(), key_hash)
 
 # Try to import ConfigManager
 try:
@@ -19,14 +45,124 @@ except ImportError:
         # Fallback absolute import (last resort)
         from src.utils.config_manager import ConfigManager
 
+try:
+    from services.chat_memory import ChatMemory, ChatMemoryStore, history_token_budget, default_spill_dir
+    from services.response_cache import (ResponseCache, CachedResponse, response_cache_key,
+                                         session_start, next_session_start)
+    from services.llm_telemetry import LLMTelemetry, AUTO_MODEL
+    from services.llm_failover import hedged_stream, failover_settings
+except ImportError:
+    # Fallback for relative imports if run as package
+    from .chat_memory import ChatMemory, ChatMemoryStore, history_token_budget, default_spill_dir
+    from .response_cache import (ResponseCache, CachedResponse, response_cache_key,
+                                 session_start, next_session_start)
+    from .llm_telemetry import LLMTelemetry, AUTO_MODEL
+    from .llm_failover import hedged_stream, failover_settings
+
 class LLMService:
-    def __init__(self):
+    def __init__(self, spill_dir=None):
         self.config_manager = ConfigManager()
-        self.chat_history = []
+        # Token-budgeted conversation of requests without a context key,
+        # and one conversation per context (stock code) for the others;
+        # evicted contexts spill to spill_dir (default: a directory private
+        # to this process), cleaned up by close()
+        self.chat_history = ChatMemory()
+        self.contexts = ChatMemoryStore(spill_dir=spill_dir or default_spill_dir())
+        # ChatOpenAI clients per provider config and compiled chains per
+        # (client, system prompt); both are dropped when the config changes
+        self._clients = {}
+        self._chains = {}
+        self._cache_lock = threading.Lock()
+        # Finished responses on disk, valid until the next trading session
+        self.response_cache = ResponseCache()
+        # Latency and error rate per model, used to route AUTO_MODEL requests
+        self.telemetry = LLMTelemetry()
+
+    def clear_history(self, context_key=None):
+        """Clear the chat history, or only the conversation of one context."""
+        if context_key is None:
+            self.chat_history.clear()
+        else:
+            self.contexts.discard(context_key)
+
+    def close(self):
+        """Delete the spilled per-context conversations; called on shutdown."""
+        self.contexts.close()
+
+    def invalidate_clients(self):
+        """Drop cached clients (and the chains built on them) after a provider edit."""
+        with self._cache_lock:
+            self._clients.clear()
+            self._chains.clear()
+
+    def invalidate_prompts(self):
+        """Drop compiled chains after a prompt template edit."""
+        with self._cache_lock:
+            self._chains.clear()
+
+    def get_client(self, model_name, api_key, base_url=None):
+        """
+        Return the ChatOpenAI client for a provider config, creating it on first use.
+
+        Each client owns a keep-alive HTTP connection pool that is reused by
+        every request to the same model, endpoint and key.
+        """
+        key = client_cache_key(model_name, base_url, api_key)
+        with self._cache_lock:
+            llm = self._clients.get(key)
+        if llm is not None:
+            return key, llm
+
+        import httpx
+        from langchain_openai import ChatOpenAI
+
+        kwargs = {
+            "model": model_name,
+            "api_key": api_key,
+            "temperature": 0.7,
+            "streaming": True,  # Enable streaming
+            "http_client": httpx.Client(limits=httpx.Limits(
+                max_connections=POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=POOL_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=POOL_KEEPALIVE_EXPIRY)),
+        }
+        # Only add base_url if it's provided and not empty
+        if base_url and base_url.strip():
+            kwargs["base_url"] = base_url
+        llm = ChatOpenAI(**kwargs)
+
+        with self._cache_lock:
+            # Another thread may have created the same client meanwhile
+            llm = self._clients.setdefault(key, llm)
+        return key, llm
+
+    def get_chain(self, model_name, api_key, base_url, system_prompt):
+        """
+        Return the prompt | llm | parser chain for a provider and system prompt.
+
+        Messages are ordered system prompt, market context, history, input,
+        so consecutive questions about one stock share the longest possible
+        prompt prefix.
+        """
+        client_key, llm = self.get_client(model_name, api_key, base_url)
+        key = (client_key, hashlib.sha256(system_prompt.encode("utf-8")).hexdigest())
+        with self._cache_lock:
+            chain = self._chains.get(key)
+        if chain is not None:
+            return chain
+
+        from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+        from langchain_core.output_parsers import StrOutputParser
 
-    def clear_history(self):
-        """Clear the chat history."""
-        self.chat_history = []
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", system_prompt),
+            MessagesPlaceholder(variable_name="context", optional=True),
+            MessagesPlaceholder(variable_name="history"),
+            ("user", "{input}")
+        ])
+        chain = prompt | llm | StrOutputParser()
+        with self._cache_lock:
+            return self._chains.setdefault(key, chain)
 
     def get_provider_config(self, model_name_selection):
         """
@@ -38,6 +174,31 @@ class LLMService:
                 return config
         return None
 
+    def resolve_model(self, model_name):
+        """
+        Concrete model for a selection: AUTO_MODEL becomes the fastest
+        healthy model with an API key (see LLMTelemetry.choose), any other
+        name is returned unchanged.
+        """
+        if model_name != AUTO_MODEL:
+            return model_name
+        return self.telemetry.choose(self.available_models()) or model_name
+
+    def available_models(self):
+        """Configured models that have an API key."""
+        return [config.get("model_name") for config in self.config_manager.get_providers().values()
+                if config.get("model_name") and config.get("api_key")]
+
+    def backup_models(self, model_name):
+        """The other available models, in the order LLMTelemetry.choose() prefers them."""
+        candidates = [name for name in self.available_models() if name != model_name]
+        ordered = []
+        while candidates:
+            name = self.telemetry.choose(candidates)
+            ordered.append(name)
+            candidates.remove(name)
+        return ordered
+
     def get_prompt_content(self, prompt_name):
         """
         Retrieve the prompt template content by name.
@@ -48,11 +209,55 @@ class LLMService:
             return prompt_data.get("content", "")
         return ""
 
-    def chat_stream(self, user_input, model_name, prompt_name):
+    def summarize_history(self, model_name, api_key, base_url, previous_summary, messages):
+        """Fold messages into the running summary with the chat model (non-streaming)."""
+        from langchain_core.messages import HumanMessage, SystemMessage
+
+        _, llm = self.get_client(model_name, api_key, base_url)
+        lines = [f"已有摘要：{previous_summary}"] if previous_summary else []
+        for role, content in messages:
+            speaker = "用户" if role == "human" else "助手"
+            lines.append(f"{speaker}：{content[:SUMMARY_MESSAGE_CHARS]}")
+        result = llm.invoke([SystemMessage(content=SUMMARY_PROMPT), HumanMessage(content="\n".join(lines))])
+        return result.content
+
+    def chat_stream(self, user_input, model_name, prompt_name, context_version=None, use_cache=True,
+                    history=None, context_key=None, context=None):
         """
         Execute the chat with the LLM in streaming mode.
         Returns a generator yielding response chunks.
+
+        A request already answered in the current trading session (same
+        model, prompt, input, history and context_version) is served from
+        the response cache as a single CachedResponse chunk. context_version
+        defaults to the version of context if given, else to the current
+        session, for callers whose input already carries the market data it
+        depends on.
+
+        context is an optional MarketContext (see services.market_context)
+        sent as a system message between the prompt template and the history.
+
+        history is the ChatMemory to answer in and extend; it defaults to
+        the conversation of context_key (e.g. a stock code) if given, else
+        the shared chat history. Pass a list of messages (usually empty) for
+        an independent request, e.g. one of several analyses running
+        concurrently. The history is first brought within the model's token
+        budget, summarizing the oldest turns.
+
+        model_name may be AUTO_MODEL, see resolve_model(). The prompt
+        template's hedge_after and failover settings let the request move to
+        backup_models() when the model stalls or fails (see
+        services.llm_failover). Every request sent to a provider is recorded
+        in self.telemetry.
         """
+        model_name = self.resolve_model(model_name)
+        if history is None:
+            history = self.contexts.get(context_key) if context_key else self.chat_history
+        elif not isinstance(history, ChatMemory):
+            history = ChatMemory([(m.type, m.content) for m in history], model_name)
+        # Budget in the tokens of the model about to answer
+        history.set_model(model_name)
+
         # 1. Get Config
         provider_config = self.get_provider_config(model_name)
         if not provider_config:
@@ -70,41 +275,57 @@ class LLMService:
         system_prompt = self.get_prompt_content(prompt_name)
         if not system_prompt:
              # Fallback if no prompt selected or found
-             system_prompt = "You are a helpful assistant for stock analysis."
+             system_prompt = DEFAULT_SYSTEM_PROMPT
         
-        # 3. Initialize LLM
-        kwargs = {
-            "model": model_name,
-            "api_key": api_key,
-            "temperature": 0.7,
-            "streaming": True  # Enable streaming
-        }
-        
-        # Only add base_url if it's provided and not empty
-        if base_url and base_url.strip():
-            kwargs["base_url"] = base_url
-            
+        # 3. Keep the history within the token budget
+        history.fit(history_token_budget(provider_config),
+                    lambda summary, messages: self.summarize_history(
+                        model_name, api_key, base_url, summary, messages))
+
+        # 4. Serve a repeated request from the response cache
+        now = datetime.now()
+        if context_version is None:
+            context_version = context.version if context is not None else session_start(now).isoformat()
+        history_messages = history.messages()
+        cache_key = response_cache_key(model_name, system_prompt, user_input, history_messages, context_version)
+        cached = self.response_cache.get(cache_key) if use_cache else None
+
+        # 5. Get the cached client and chain for this provider and prompt
         try:
-            llm = ChatOpenAI(**kwargs)
-            
-            # 4. Create Chain
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", system_prompt),
-                MessagesPlaceholder(variable_name="history"),
-                ("user", "{input}")
-            ])
-            
-            chain = prompt | llm | StrOutputParser()
-            
-            # 5. Stream
+            if cached is not None:
+                history.add_turn(user_input, cached)
+                yield CachedResponse(cached)
+                return
+
+            def make_chain(name):
+                config = provider_config if name == model_name else self.get_provider_config(name)
+                return self.get_chain(name, config.get("api_key"), config.get("base_url"), system_prompt)
+
+            # 6. Stream, hedging and failing over to other providers as the prompt allows
+            hedge_after, failover = failover_settings(self.config_manager.get_prompts().get(prompt_name))
+            models = [model_name]
+            if hedge_after > 0 or failover:
+                models += self.backup_models(model_name)
             full_response = ""
-            for chunk in chain.stream({"input": user_input, "history": self.chat_history}):
+            answered_by = [model_name]  # Becomes the backup model if one answers instead
+            inputs = {"input": user_input, "history": history.as_langchain_messages()}
+            if context is not None:
+                from langchain_core.messages import SystemMessage
+                inputs["context"] = [SystemMessage(content=context.text)]
+            for chunk in hedged_stream(models, make_chain, inputs, hedge_after, failover, self.telemetry,
+                                       on_winner=lambda name: answered_by.__setitem__(0, name)):
                 full_response += chunk
                 yield chunk
-            
-            # 6. Update History
-            self.chat_history.append(HumanMessage(content=user_input))
-            self.chat_history.append(AIMessage(content=full_response))
+
+            # 7. Update History
+            history.add_turn(user_input, full_response)
+            if use_cache and full_response:
+                # Cached for the model that actually answered
+                winner = answered_by[0]
+                if winner != model_name:
+                    cache_key = response_cache_key(winner, system_prompt, user_input, history_messages,
+                                                   context_version)
+                self.response_cache.put(cache_key, winner, full_response, next_session_start(now).timestamp())
             
         except Exception as e:
             yield f"Error calling LLM: {str(e)}"
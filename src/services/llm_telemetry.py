@@ -0,0 +1,116 @@
+"""
+Rolling latency telemetry of LLM providers
+
+LLMService records every request it sends to a provider: time to the
+first token, generation speed and whether it failed. LLMTelemetry keeps
+the last WINDOW requests per model and summarizes them for the
+configuration tab, and choose() picks the model an "auto" request is
+routed to: the fastest one that is currently healthy.
+"""
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Sequence
+
+# Model selector entry that routes each request to the fastest healthy provider
+AUTO_MODEL = "auto"
+
+# Requests remembered per model
+WINDOW = 50
+# A model failing more often than this (over MIN_SAMPLES requests or more)
+# is skipped by choose() while a healthier one is available
+MAX_ERROR_RATE = 0.3
+MIN_SAMPLES = 3
+# Answer length used to rank models: expected latency is
+# ttft + TYPICAL_ANSWER_TOKENS / tokens_per_sec
+TYPICAL_ANSWER_TOKENS = 300
+
+
+def _median(values: List[float]) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+class LLMTelemetry:
+    """
+    Per-model rolling window of request outcomes. Thread-safe.
+
+    Each sample is (time, ok, ttft, tokens_per_sec); failed requests have
+    no timings.
+    """
+
+    def __init__(self, window: int = WINDOW):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model_name: str, ttft: Optional[float] = None,
+               tokens_per_sec: Optional[float] = None, ok: bool = True):
+        """Record one finished (ok) or failed request to model_name."""
+        sample = (time.time(), ok, ttft if ok else None, tokens_per_sec if ok else None)
+        with self._lock:
+            self._samples.setdefault(model_name, deque(maxlen=self.window)).append(sample)
+
+    def reset(self, model_name: Optional[str] = None):
+        """Forget the samples of one model, or of every model."""
+        with self._lock:
+            if model_name is None:
+                self._samples.clear()
+            else:
+                self._samples.pop(model_name, None)
+
+    def stats(self, model_name: str) -> Dict:
+        """
+        Summary of the window of model_name.
+
+        Returns a dict with 'model', 'requests', 'errors', 'error_rate',
+        'ttft' and 'tokens_per_sec' (medians of the successful requests,
+        None without any) and 'last' (time of the latest request).
+        """
+        with self._lock:
+            samples = list(self._samples.get(model_name, ()))
+        errors = sum(1 for _, ok, _, _ in samples if not ok)
+        ttfts = [ttft for _, ok, ttft, _ in samples if ok and ttft is not None]
+        rates = [rate for _, ok, _, rate in samples if ok and rate]
+        return {
+            "model": model_name,
+            "requests": len(samples),
+            "errors": errors,
+            "error_rate": errors / len(samples) if samples else 0.0,
+            "ttft": _median(ttfts),
+            "tokens_per_sec": _median(rates),
+            "last": samples[-1][0] if samples else None,
+        }
+
+    def is_healthy(self, stats: Dict) -> bool:
+        return stats["requests"] < MIN_SAMPLES or stats["error_rate"] <= MAX_ERROR_RATE
+
+    def expected_latency(self, stats: Dict) -> Optional[float]:
+        """Seconds a typical answer takes from this model, None if never measured."""
+        if stats["ttft"] is None:
+            return None
+        generation = TYPICAL_ANSWER_TOKENS / stats["tokens_per_sec"] if stats["tokens_per_sec"] else 0.0
+        return stats["ttft"] + generation
+
+    def choose(self, model_names: Sequence[str]) -> Optional[str]:
+        """
+        Model to route an "auto" request to.
+
+        Models never measured come first (in the given order) so every
+        provider gets sampled; then the healthy model with the lowest
+        expected latency. If none is healthy, the one failing least.
+        """
+        if not model_names:
+            return None
+        all_stats = [self.stats(name) for name in model_names]
+        for stats in all_stats:
+            if stats["requests"] == 0:
+                return stats["model"]
+
+        healthy = [s for s in all_stats if self.is_healthy(s) and self.expected_latency(s) is not None]
+        if healthy:
+            return min(healthy, key=self.expected_latency)["model"]
+        return min(all_stats, key=lambda s: s["error_rate"])["model"]
@@ -0,0 +1,179 @@
+"""
+Compact market context for LLM prompts
+
+Turns a stock's recent daily bars into a short block of text: summary
+statistics, indicator values computed from the bars, and a table of the
+latest bars. Everything is derived from the bars alone and formatted in
+a fixed order, so the same bars always give byte-identical text; it is
+sent as a system message right after the prompt template, which keeps
+the prompt prefix stable across questions about the same stock and lets
+providers reuse their prompt cache. Built contexts are cached per
+(code, last bar).
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Bars listed in the table; indicators use every bar available
+CONTEXT_BARS = 20
+# Bars requested when the caller has none loaded
+CONTEXT_DAYS = 120
+CONTEXT_CACHE_SIZE = 64
+
+
+@dataclass(frozen=True)
+class MarketContext:
+    """Context text for one stock as of its last bar"""
+    code: str
+    version: str  # Digest of the text; changes when a new or updated bar arrives
+    text: str
+
+
+def _ema(values: np.ndarray, period: int) -> np.ndarray:
+    alpha = 2.0 / (period + 1)
+    out = np.empty(len(values))
+    acc = float(values[0])
+    for i, value in enumerate(values.tolist()):
+        acc = alpha * value + (1 - alpha) * acc
+        out[i] = acc
+    return out
+
+
+def _rsi(closes: np.ndarray, period: int = 14) -> Optional[float]:
+    if len(closes) <= period:
+        return None
+    deltas = np.diff(closes)
+    gains = np.clip(deltas, 0, None)
+    losses = np.clip(-deltas, 0, None)
+    avg_gain = gains[:period].mean()
+    avg_loss = losses[:period].mean()
+    for gain, loss in zip(gains[period:].tolist(), losses[period:].tolist()):
+        avg_gain = (avg_gain * (period - 1) + gain) / period
+        avg_loss = (avg_loss * (period - 1) + loss) / period
+    if avg_loss == 0:
+        return 100.0
+    return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+
+def _kdj(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int = 9):
+    if len(closes) < period:
+        return None
+    k = d = 50.0
+    for i in range(period - 1, len(closes)):
+        high = highs[i - period + 1:i + 1].max()
+        low = lows[i - period + 1:i + 1].min()
+        rsv = 50.0 if high == low else (closes[i] - low) / (high - low) * 100
+        k = (2 * k + rsv) / 3
+        d = (2 * d + k) / 3
+    return k, d, 3 * k - 2 * d
+
+
+def _pct(new: float, old: float) -> str:
+    return f"{(new / old - 1) * 100:+.1f}%" if old else "-"
+
+
+def build_context_text(code: str, name: str, kline_data: List[Dict]) -> str:
+    """
+    Context block for a stock from its daily bars (oldest first).
+
+    Args:
+        code: Stock code
+        name: Stock name
+        kline_data: Bars with keys date, open, close, high, low, volume
+    """
+    ohlcv = np.array([(d['open'], d['high'], d['low'], d['close'], d.get('volume', 0) or 0)
+                      for d in kline_data], dtype=np.float64).reshape(len(kline_data), 5)
+    opens, highs, lows, closes, volumes = ohlcv.T
+    n = len(closes)
+    last = closes[-1]
+    dates = [str(d.get('date', ''))[:10] for d in kline_data]
+
+    stats = [f"收盘{last:.2f}"]
+    for days in (1, 5, 20, 60):
+        if n > days:
+            stats.append(f"{days}日{_pct(last, closes[-1 - days])}")
+    stats.append(f"{n}日高{highs.max():.2f} 低{lows.min():.2f}")
+    if n > 20:
+        returns = np.diff(closes[-21:]) / closes[-21:-1]
+        stats.append(f"20日波动{returns.std() * 100:.2f}%")
+    if n >= 20 and volumes[-20:].mean() > 0:
+        stats.append(f"量比5/20 {volumes[-5:].mean() / volumes[-20:].mean():.2f}")
+
+    indicators = []
+    mas = [f"MA{p} {closes[-p:].mean():.2f}" for p in (5, 10, 20, 60) if n >= p]
+    if mas:
+        indicators.append(" ".join(mas))
+    rsi = _rsi(closes)
+    if rsi is not None:
+        indicators.append(f"RSI14 {rsi:.1f}")
+    if n >= 35:
+        dif = _ema(closes, 12) - _ema(closes, 26)
+        dea = _ema(dif, 9)
+        indicators.append(f"MACD DIF {dif[-1]:.3f} DEA {dea[-1]:.3f} 柱 {2 * (dif[-1] - dea[-1]):.3f}")
+    kdj = _kdj(highs, lows, closes)
+    if kdj is not None:
+        indicators.append("KDJ {:.1f}/{:.1f}/{:.1f}".format(*kdj))
+
+    lines = [f"[行情上下文] {name}({code}) 日线 截至{dates[-1]}",
+             "统计: " + " ".join(stats)]
+    if indicators:
+        lines.append("指标: " + " | ".join(indicators))
+    lines.append(f"近{min(n, CONTEXT_BARS)}日K线(日期,开,高,低,收,量万):")
+    for i in range(max(0, n - CONTEXT_BARS), n):
+        lines.append(f"{dates[i][5:]},{opens[i]:.2f},{highs[i]:.2f},{lows[i]:.2f},"
+                     f"{closes[i]:.2f},{volumes[i] / 1e4:.1f}")
+    return "\n".join(lines)
+
+
+def bar_cache_key(code: str, kline_data: List[Dict]) -> tuple:
+    """Identify a context by symbol, bar count and the latest bar."""
+    last = kline_data[-1]
+    return (code, len(kline_data), last.get('date'), last.get('open'), last.get('high'),
+            last.get('low'), last.get('close'), last.get('volume'))
+
+
+class MarketContextBuilder:
+    """
+    Builds MarketContext objects, reusing them while the last bar is unchanged.
+
+    build() may fetch bars, so call it from a worker thread.
+    """
+
+    def __init__(self, data_service, cache_size: int = CONTEXT_CACHE_SIZE):
+        self.data_service = data_service
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[tuple, MarketContext]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def build(self, code: str, name: str, kline_data: Optional[List[Dict]] = None) -> Optional[MarketContext]:
+        """
+        Context for a stock, or None if no bars are available.
+
+        Args:
+            code: Stock code
+            name: Stock name
+            kline_data: Daily bars already loaded by the caller; fetched if None
+        """
+        if kline_data is None:
+            kline_data = self.data_service.fetch_kline_data(code, period="daily", days=CONTEXT_DAYS)
+        if not kline_data:
+            return None
+
+        key = bar_cache_key(code, kline_data)
+        with self._lock:
+            context = self._cache.get(key)
+            if context is not None:
+                self._cache.move_to_end(key)
+                return context
+
+        text = build_context_text(code, name, kline_data)
+        context = MarketContext(code, hashlib.sha256(text.encode("utf-8")).hexdigest()[:16], text)
+        with self._lock:
+            self._cache[key] = context
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return context
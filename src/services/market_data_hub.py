@@ -0,0 +1,142 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List
+
+try:
+    from core.strategy_engine import StrategyEngine
+    from services.llm_service import LLMService
+    from services.market_context import MarketContextBuilder
+    from services.stock_data_service import StockDataService
+    from services.stock_search import StockSearchIndex, build_search_index
+except ImportError:
+    # Fallback for relative imports if run as package
+    from ..core.strategy_engine import StrategyEngine
+    from .llm_service import LLMService
+    from .market_context import MarketContextBuilder
+    from .stock_data_service import StockDataService
+    from .stock_search import StockSearchIndex, build_search_index
+
+logger = logging.getLogger(__name__)
+
+
+class MarketDataHub:
+    """
+    Process-wide owner of the shared market data and LLM services.
+
+    MainWindow creates one hub and hands it to every tab, so the stock
+    universe is loaded once, all tabs read the same price cache and
+    strategy engine, and identical concurrent upstream requests are
+    coalesced by the single StockDataService. Tabs subscribe to the
+    symbols they display; a symbol is polled while at least one
+    subscriber holds it.
+    """
+
+    def __init__(self, data_service: StockDataService = None,
+                 llm_service: LLMService = None, update_interval: int = 10):
+        self.data_service = data_service if data_service is not None else StockDataService()
+        self.llm_service = llm_service if llm_service is not None else LLMService()
+        self.update_interval = update_interval  # Seconds between price polls
+        # Compact per-stock context for LLM prompts, cached per last bar
+        self.market_context = MarketContextBuilder(self.data_service)
+        # Monitor strategies, evaluated on every batch of price cache updates
+        self.strategy_engine = StrategyEngine()
+        self.data_service.add_price_listener(self.strategy_engine.on_prices)
+
+        # Reference count per subscribed symbol
+        self._subscriptions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        # Search index over the stock universe, built on first use
+        self._search_index = None
+        self._search_index_lock = threading.Lock()
+
+        # Server watch-list updates are network calls; run them in order off the caller's thread
+        self._server_sync = ThreadPoolExecutor(max_workers=1, thread_name_prefix="watch-sync")
+
+    def get_search_index(self) -> StockSearchIndex:
+        """
+        Shared pinyin search index over all stocks.
+
+        The first call builds it (several hundred ms for the full
+        universe); MainWindow does that on its startup loader thread.
+        """
+        with self._search_index_lock:
+            if self._search_index is None:
+                try:
+                    self._search_index = build_search_index(self.data_service.get_all_stocks())
+                except Exception as e:
+                    logger.error(f"Failed to build stock search index: {e}")
+                    return StockSearchIndex([])
+            return self._search_index
+
+    def peek_search_index(self):
+        """The search index if it has been built, else None; never blocks."""
+        return self._search_index
+
+    def subscribe(self, stock_codes: Iterable[str]):
+        """
+        Add one reference to each symbol and start polling new ones.
+
+        Args:
+            stock_codes: Stock codes the caller wants kept up to date
+        """
+        changed = False
+        with self._lock:
+            for code in stock_codes:
+                count = self._subscriptions.get(code, 0)
+                self._subscriptions[code] = count + 1
+                changed = changed or count == 0
+        if changed:
+            self._sync_watched_stocks()
+
+    def unsubscribe(self, stock_codes: Iterable[str]):
+        """
+        Drop one reference to each symbol; symbols nobody holds stop polling.
+
+        Args:
+            stock_codes: Stock codes previously passed to subscribe()
+        """
+        changed = False
+        with self._lock:
+            for code in stock_codes:
+                count = self._subscriptions.get(code, 0)
+                if count <= 1:
+                    changed = changed or count == 1
+                    self._subscriptions.pop(code, None)
+                else:
+                    self._subscriptions[code] = count - 1
+        if changed:
+            self._sync_watched_stocks()
+
+    def subscribed_codes(self) -> List[str]:
+        """Symbols with at least one subscriber, in subscription order."""
+        with self._lock:
+            return list(self._subscriptions)
+
+    def subscriber_count(self, stock_code: str) -> int:
+        with self._lock:
+            return self._subscriptions.get(stock_code, 0)
+
+    def _sync_watched_stocks(self):
+        """Point the server watch list and the price poller at the subscribed set."""
+        stock_codes = self.subscribed_codes()
+
+        # Update watched stocks on server (for fallback)
+        self._server_sync.submit(self.data_service.update_watched_stocks, stock_codes)
+
+        if not stock_codes:
+            self.data_service.stop_auto_update()
+        elif self.data_service.auto_update_running:
+            self.data_service.update_watched_stocks_list(stock_codes)
+        else:
+            self.data_service.start_auto_update(stock_codes, interval=self.update_interval)
+
+    def shutdown(self):
+        """Stop background polling; called when the main window closes."""
+        with self._lock:
+            self._subscriptions.clear()
+        self.data_service.stop_auto_update()
+        self._server_sync.shutdown(wait=False)
+        self.llm_service.close()
+        logger.info("Market data hub shut down")
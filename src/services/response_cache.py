@@ -0,0 +1,168 @@
+"""
+Persistent cache of LLM responses
+
+Auto-analysis asks every screened stock the same question and users
+often repeat an analysis within the day, so finished responses are kept
+in a small SQLite file. An entry is keyed by the model, a hash of the
+system prompt, the normalized input (including the conversation so far)
+and a market-data context version, and it expires when the next trading
+session opens.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# src/services/response_cache.py -> project root -> cache/
+DEFAULT_CACHE_PATH = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', '..', 'cache', 'llm_responses.sqlite3'))
+MAX_ENTRIES = 2000
+
+# A-share sessions open at 09:30 on weekdays (exchange holidays are not modelled)
+SESSION_OPEN = (9, 30)
+
+
+def session_start(now: datetime) -> datetime:
+    """Opening time of the latest trading session that started at or before now."""
+    start = now.replace(hour=SESSION_OPEN[0], minute=SESSION_OPEN[1], second=0, microsecond=0)
+    if start > now:
+        start -= timedelta(days=1)
+    while start.weekday() >= 5:  # Saturday, Sunday
+        start -= timedelta(days=1)
+    return start
+
+
+def next_session_start(now: datetime) -> datetime:
+    """Opening time of the first trading session that starts after now."""
+    start = now.replace(hour=SESSION_OPEN[0], minute=SESSION_OPEN[1], second=0, microsecond=0)
+    if start <= now:
+        start += timedelta(days=1)
+    while start.weekday() >= 5:
+        start += timedelta(days=1)
+    return start
+
+
+def normalize_input(text: str) -> str:
+    """Collapse whitespace so re-typed questions hit the same entry."""
+    return " ".join(text.split())
+
+
+def response_cache_key(model_name: str, system_prompt: str, user_input: str,
+                       history=(), context_version: str = "") -> str:
+    """
+    Digest identifying one LLM request.
+
+    Args:
+        model_name: Model the request is sent to
+        system_prompt: System prompt text (hashed)
+        user_input: Question; whitespace differences are ignored
+        history: Earlier (role, text) turns of the conversation
+        context_version: Version of the market data the answer depends on
+    """
+    payload = json.dumps([
+        model_name,
+        hashlib.sha256(system_prompt.encode("utf-8")).hexdigest(),
+        normalize_input(user_input),
+        [[role, normalize_input(text)] for role, text in history],
+        context_version,
+    ], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CachedResponse(str):
+    """A response chunk served from the cache rather than the provider."""
+
+
+class ResponseCache:
+    """
+    SQLite-backed response cache bounded to max_entries.
+
+    The database is opened on first use; each call uses its own
+    connection so the cache can be shared by worker threads.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._ready:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5)
+        if not self._ready:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses (created_at)")
+            self._ready = True
+        return conn
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[str]:
+        """Cached response for key, or None if missing or expired."""
+        now = time.time() if now is None else now
+        try:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    row = conn.execute("SELECT response FROM responses WHERE key = ? AND expires_at > ?",
+                                       (key, now)).fetchone()
+                    if row is not None:
+                        conn.execute("UPDATE responses SET hits = hits + 1 WHERE key = ?", (key,))
+                conn.close()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("Response cache read failed: %s", e)
+            return None
+        return row[0] if row is not None else None
+
+    def put(self, key: str, model_name: str, response: str, expires_at: float,
+            now: Optional[float] = None):
+        """Store a response until expires_at, evicting expired and then oldest entries."""
+        now = time.time() if now is None else now
+        try:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    conn.execute("INSERT OR REPLACE INTO responses (key, model, response, created_at, expires_at) "
+                                 "VALUES (?, ?, ?, ?, ?)", (key, model_name, response, now, expires_at))
+                    conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+                    conn.execute("DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                                 "ORDER BY created_at DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+                conn.close()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("Response cache write failed: %s", e)
+
+    def count(self) -> int:
+        try:
+            with self._lock:
+                conn = self._connect()
+                (n,) = conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+                conn.close()
+            return n
+        except (sqlite3.Error, OSError):
+            return 0
+
+    def clear(self):
+        """Remove every entry."""
+        try:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    conn.execute("DELETE FROM responses")
+                conn.close()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("Response cache clear failed: %s", e)
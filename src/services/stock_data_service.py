@@ -1,5 +1,6 @@
+import copy
 import random
-import pandas as pd
+import numpy as np
 import os
 from pathlib import Path
 import requests
@@ -11,16 +12,87 @@ from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Numeric indicator fields of each stock, stored column-wise for screening
+INDICATOR_FIELDS = [
+    "price", "change", "turnover", "volume_ratio",
+    "kdj_k", "kdj_d", "kdj_j", "macd", "dif", "dea", "rsi",
+    "ma5", "ma10", "ma20", "ma60", "boll_upper", "boll_mid", "boll_lower",
+]
+
+
+class _InflightCall:
+    """Result slot shared by every caller waiting on the same request."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _RequestCoalescer:
+    """
+    Coalesce identical concurrent requests into one upstream call.
+
+    The first caller for a key runs the request; callers arriving while it
+    is in flight wait and receive a shallow copy of its result (or the same
+    exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def run(self, key, func, *args, **kwargs):
+        with self._lock:
+            call = self._inflight.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _InflightCall()
+                self._inflight[key] = call
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.copy(call.result)
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.done.set()
+
+    def inflight_count(self) -> int:
+        with self._lock:
+            return len(self._inflight)
+
+
 class StockDataService:
     def __init__(self, server_url: str = None):
         # Load stocks from CSV
         self.stocks = self._load_stocks_from_csv()
+        # Column arrays mirroring self.stocks, used by the vectorized screener
+        self.columns = self._build_columns(self.stocks)
         self.stock_cache = {}  # Cache for stock data with indicators
         
         # Price cache: {stock_code: {price_data, timestamp}}
         self.price_cache = {}
         self.price_cache_lock = threading.Lock()
         
+        # Identical concurrent upstream requests share one call
+        self.coalescer = _RequestCoalescer()
+
+        # Called with {code: price_data} after every price cache update
+        self.price_listeners = []
+        # quotes collects the fresh quotes of a thread running fetch_multiple_realtime_prices(),
+        # which notifies once per batch
+        self._batch_fetch = threading.local()
+        
         # Auto-update control
         self.auto_update_running = False
         self.auto_update_thread = None
@@ -49,6 +121,8 @@ class StockDataService:
                 print(f"Warning: {csv_path} not found, using mock data")
                 return self._generate_mock_stocks()
             
+            import pandas as pd  # Only needed here; deferred to keep startup imports light
+
             df = pd.read_csv(csv_path)
             stocks = []
             
@@ -139,14 +213,41 @@ class StockDataService:
             })
         return data
     
+    def _build_columns(self, stocks):
+        """Build one NumPy array per field (row i = self.stocks[i])"""
+        columns = {
+            "code": np.array([stock["code"] for stock in stocks], dtype=str),
+            "name": np.array([stock["name"] for stock in stocks], dtype=str),
+            "ma_bullish": np.array([bool(stock.get("ma_bullish", False)) for stock in stocks], dtype=bool),
+        }
+        for field in INDICATOR_FIELDS:
+            columns[field] = np.array([stock.get(field, 0.0) for stock in stocks], dtype=np.float64)
+        return columns
+
     def get_all_stocks(self):
         """Get all stocks without filtering"""
         return self.stocks.copy()
 
+    def all_indices(self) -> np.ndarray:
+        """Row indices of every stock in self.stocks / self.columns"""
+        return np.arange(len(self.stocks))
+
     def filter_stocks(self, criteria):
         """
         Filter stocks based on multiple criteria
         
+        Args:
+            criteria: see filter_indices()
+            
+        Returns:
+            List of copies of the matching stock dictionaries
+        """
+        return [self.stocks[i].copy() for i in self.filter_indices(criteria)]
+
+    def filter_indices(self, criteria) -> np.ndarray:
+        """
+        Screen the universe with array operations over the indicator columns
+        
         Args:
             criteria: dict with filter conditions like:
                 {
@@ -170,124 +271,97 @@ class StockDataService:
                     'boll_lower_break': bool,  # Price near lower band
                     'boll_upper_break': bool,  # Price near upper band
                 }
-        """
-        results = []
-        
-        for stock in self.stocks:
-            # Refresh mock data slightly for demo
-            self._refresh_mock_indicators(stock)
-            
-            # Apply filters
-            if not self._check_stock_criteria(stock, criteria):
-                continue
                 
-            results.append(stock.copy())
+        Returns:
+            Row indices (into self.stocks / self.columns) of matching stocks
+        """
+        # Refresh mock data slightly for demo
+        self._refresh_mock_indicators()
         
-        return results
+        return np.flatnonzero(self._criteria_mask(criteria))
     
-    def _refresh_mock_indicators(self, stock):
+    def _refresh_mock_indicators(self):
         """Refresh mock technical indicators"""
         # Randomly update some values to simulate real-time data
-        if random.random() > 0.7:
-            stock["turnover"] = round(random.uniform(0.5, 15.0), 2)
-            stock["change"] = round(random.uniform(-10, 10), 2)
-            stock["volume_ratio"] = round(random.uniform(0.3, 5.0), 2)
+        cols = self.columns
+        rows = np.flatnonzero(np.random.random(len(self.stocks)) > 0.7)
+        cols["turnover"][rows] = np.round(np.random.uniform(0.5, 15.0, len(rows)), 2)
+        cols["change"][rows] = np.round(np.random.uniform(-10, 10, len(rows)), 2)
+        cols["volume_ratio"][rows] = np.round(np.random.uniform(0.3, 5.0, len(rows)), 2)
+        
+        # Keep the stock dictionaries in sync with the columns
+        for i in rows.tolist():
+            stock = self.stocks[i]
+            stock["turnover"] = float(cols["turnover"][i])
+            stock["change"] = float(cols["change"][i])
+            stock["volume_ratio"] = float(cols["volume_ratio"][i])
     
-    def _check_stock_criteria(self, stock, criteria):
-        """Check if a stock meets all criteria"""
+    def _criteria_mask(self, criteria) -> np.ndarray:
+        """Boolean mask of stocks meeting all criteria"""
+        c = self.columns
+        mask = np.ones(len(self.stocks), dtype=bool)
+        
         # Turnover rate
         if 'min_turnover' in criteria:
-            if stock["turnover"] < criteria['min_turnover']:
-                return False
-        
+            mask &= c["turnover"] >= criteria['min_turnover']
         if 'max_turnover' in criteria:
-            if stock["turnover"] > criteria['max_turnover']:
-                return False
+            mask &= c["turnover"] <= criteria['max_turnover']
         
         # MA bullish arrangement
         if criteria.get('ma_bullish', False):
-            if not stock.get("ma_bullish", False):
-                return False
+            mask &= c["ma_bullish"]
         
         # Price change
         if 'min_change' in criteria:
-            if stock["change"] < criteria['min_change']:
-                return False
-        
+            mask &= c["change"] >= criteria['min_change']
         if 'max_change' in criteria:
-            if stock["change"] > criteria['max_change']:
-                return False
+            mask &= c["change"] <= criteria['max_change']
         
         # Volume ratio
         if 'min_volume_ratio' in criteria:
-            if stock.get("volume_ratio", 0) < criteria['min_volume_ratio']:
-                return False
+            mask &= c["volume_ratio"] >= criteria['min_volume_ratio']
         
         # KDJ indicators
         if criteria.get('kdj_golden_cross', False):
             # K crosses above D
-            if not (stock.get("kdj_k", 0) > stock.get("kdj_d", 0) and 
-                    stock.get("kdj_k", 0) < 80):
-                return False
-        
+            mask &= (c["kdj_k"] > c["kdj_d"]) & (c["kdj_k"] < 80)
         if criteria.get('kdj_death_cross', False):
             # K crosses below D
-            if not (stock.get("kdj_k", 0) < stock.get("kdj_d", 0) and 
-                    stock.get("kdj_k", 0) > 20):
-                return False
-        
+            mask &= (c["kdj_k"] < c["kdj_d"]) & (c["kdj_k"] > 20)
         if criteria.get('kdj_low_area', False):
-            if stock.get("kdj_k", 100) >= 20:
-                return False
-        
+            mask &= c["kdj_k"] < 20
         if criteria.get('kdj_high_area', False):
-            if stock.get("kdj_k", 0) <= 80:
-                return False
+            mask &= c["kdj_k"] > 80
         
         # MACD indicators
         if criteria.get('macd_golden_cross', False):
-            if not (stock.get("dif", 0) > stock.get("dea", 0) and 
-                    stock.get("macd", 0) > 0):
-                return False
-        
+            mask &= (c["dif"] > c["dea"]) & (c["macd"] > 0)
         if criteria.get('macd_death_cross', False):
-            if not (stock.get("dif", 0) < stock.get("dea", 0)):
-                return False
-        
+            mask &= c["dif"] < c["dea"]
         if criteria.get('macd_above_zero', False):
-            if stock.get("macd", -1) <= 0:
-                return False
+            mask &= c["macd"] > 0
         
         # RSI indicators
         if criteria.get('rsi_oversold', False):
-            if stock.get("rsi", 50) >= 30:
-                return False
-        
+            mask &= c["rsi"] < 30
         if criteria.get('rsi_overbought', False):
-            if stock.get("rsi", 50) <= 70:
-                return False
+            mask &= c["rsi"] > 70
         
         # Price vs MA
         if criteria.get('price_above_ma20', False):
-            if stock.get("price", 0) <= stock.get("ma20", 0):
-                return False
-        
+            mask &= c["price"] > c["ma20"]
         if criteria.get('price_above_ma60', False):
-            if stock.get("price", 0) <= stock.get("ma60", 0):
-                return False
+            mask &= c["price"] > c["ma60"]
         
         # Bollinger Bands
         if criteria.get('boll_lower_break', False):
             # Price near or below lower band
-            if stock.get("price", 0) > stock.get("boll_lower", 0) * 1.02:
-                return False
-        
+            mask &= c["price"] <= c["boll_lower"] * 1.02
         if criteria.get('boll_upper_break', False):
             # Price near or above upper band
-            if stock.get("price", 0) < stock.get("boll_upper", 0) * 0.98:
-                return False
+            mask &= c["price"] >= c["boll_upper"] * 0.98
         
-        return True
+        return mask
 
     def get_stock_details(self, code):
         """Get details for a single stock."""
@@ -356,6 +430,12 @@ class StockDataService:
         Returns:
             List of K-line data dictionaries or None if error
         """
+        return self.coalescer.run(("kline", stock_code, period, adjust, days),
+                                  self._fetch_kline_data, stock_code, period, adjust, days)
+
+    def _fetch_kline_data(self, stock_code: str, period: str, adjust: str,
+                          days: int) -> Optional[List[Dict]]:
+        """Fetch K-line data from server (uncoalesced)."""
         try:
             response = requests.get(
                 f"{self.server_url}/api/v1/data/kline/{stock_code}",
@@ -393,6 +473,53 @@ class StockDataService:
                 }
         return None
 
+    def get_cached_prices(self, stock_codes: List[str]) -> Dict[str, Dict]:
+        """
+        Get cached price data for many stocks under a single lock. Returns immediately.
+        
+        Args:
+            stock_codes: Stock codes
+            
+        Returns:
+            Dictionary with stock code as key and cached price data as value;
+            codes without a cache entry are omitted
+        """
+        results = {}
+        with self.price_cache_lock:
+            for code in stock_codes:
+                cache_entry = self.price_cache.get(code)
+                if cache_entry:
+                    results[code] = {
+                        **cache_entry['data'],
+                        'cached_at': cache_entry['timestamp'],
+                        'from_cache': True
+                    }
+        return results
+
+    def add_price_listener(self, listener):
+        """
+        Call listener(quotes) with {stock_code: price_data} after price cache updates.
+        
+        A single fetch passes one quote; fetch_multiple_realtime_prices()
+        passes all the fresh quotes of the batch at once. Listeners run on
+        the thread that fetched the prices (usually the auto-update thread)
+        and must return quickly.
+        """
+        self.price_listeners.append(listener)
+
+    def remove_price_listener(self, listener):
+        if listener in self.price_listeners:
+            self.price_listeners.remove(listener)
+
+    def _notify_prices(self, quotes: Dict[str, Dict]):
+        if not quotes:
+            return
+        for listener in list(self.price_listeners):
+            try:
+                listener(quotes)
+            except Exception as e:
+                logger.error(f"Price listener failed for {len(quotes)} quotes: {e}")
+
     def fetch_realtime_price(self, stock_code: str) -> Optional[Dict]:
         """
         Fetch realtime price for a single stock using akshare bid-ask API.
@@ -404,13 +531,17 @@ class StockDataService:
         Returns:
             Price data dictionary or None if error
         """
+        # Ensure stock code is 6 digits without prefix
+        if len(stock_code) > 6:
+            stock_code = stock_code[-6:]  # Remove SH/SZ prefix if present
+        
+        return self.coalescer.run(("price", stock_code), self._fetch_realtime_price, stock_code)
+
+    def _fetch_realtime_price(self, stock_code: str) -> Optional[Dict]:
+        """Fetch realtime price using akshare and update cache (uncoalesced)."""
         try:
             import akshare as ak
             
-            # Ensure stock code is 6 digits without prefix
-            if len(stock_code) > 6:
-                stock_code = stock_code[-6:]  # Remove SH/SZ prefix if present
-            
             # Use stock_bid_ask_em for single stock (much faster)
             df = ak.stock_bid_ask_em(symbol=stock_code)
             
@@ -482,6 +613,12 @@ class StockDataService:
                 }
             
             logger.info(f"Updated price for {stock_code}: {price_data['current']}")
+            # Only the caller that fetched notifies; coalesced callers just get a copy
+            batch = getattr(self._batch_fetch, 'quotes', None)
+            if batch is None:
+                self._notify_prices({stock_code: price_data})
+            else:
+                batch[stock_code] = price_data
             return price_data
                 
         except Exception as e:
@@ -519,24 +656,29 @@ class StockDataService:
             else:
                 normalized_codes.append(code)
         
-        # Fetch each stock individually
-        for code in normalized_codes:
-            try:
-                price_data = self.fetch_realtime_price(code)
-                if price_data:
-                    results[code] = price_data
-            except Exception as e:
-                logger.error(f"Error fetching price for {code}: {e}")
-                # Try to use cache
-                with self.price_cache_lock:
-                    if code in self.price_cache:
-                        results[code] = {
-                            **self.price_cache[code]['data'],
-                            'from_cache': True,
-                            'stale': True
-                        }
+        # Fetch each stock individually; listeners get the quotes fetched here as one batch
+        fresh = self._batch_fetch.quotes = {}
+        try:
+            for code in normalized_codes:
+                try:
+                    price_data = self.fetch_realtime_price(code)
+                    if price_data:
+                        results[code] = price_data
+                except Exception as e:
+                    logger.error(f"Error fetching price for {code}: {e}")
+                    # Try to use cache
+                    with self.price_cache_lock:
+                        if code in self.price_cache:
+                            results[code] = {
+                                **self.price_cache[code]['data'],
+                                'from_cache': True,
+                                'stale': True
+                            }
+        finally:
+            self._batch_fetch.quotes = None
         
         logger.info(f"Updated prices for {len(results)}/{len(normalized_codes)} stocks")
+        self._notify_prices(fresh)
         return results
 
     def start_auto_update(self, stock_codes: List[str], interval: int = 10):
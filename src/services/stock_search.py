@@ -0,0 +1,264 @@
+"""
+Stock search over codes, names and pinyin
+
+StockSearchIndex answers a query from n-gram posting lists instead of
+scanning the whole universe. Exact matches (prefix or substring) are found
+by intersecting postings; typo-tolerant matches on full pinyin are found
+with a trigram filter followed by a bounded edit-distance check, so only a
+handful of candidates are ever compared character by character.
+"""
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Searchable fields of each stock, in tie-break order
+FIELDS = ("code", "name", "initials", "pinyin")
+
+# Relevance of an exact match per field: (prefix match, substring match)
+EXACT_WEIGHTS = {
+    "code": (100.0, 80.0),
+    "name": (95.0, 85.0),
+    "initials": (90.0, 70.0),
+    "pinyin": (80.0, 65.0),
+}
+
+# Relevance of a fuzzy pinyin match, reduced by FUZZY_PENALTY per edit
+FUZZY_WEIGHT = 55.0
+FUZZY_PENALTY = 15.0
+
+# Extra score for covering more of the field (favours "中国核电" over "中国核电子")
+COVERAGE_BONUS = 10.0
+
+# Only the best-aligned fuzzy candidates are verified with the edit distance
+MAX_FUZZY_VERIFY = 48
+
+# Posting entries pack (stock id, position) into one int
+_POS_BITS = 7
+_POS_MASK = (1 << _POS_BITS) - 1
+
+
+def max_edits(query: str) -> int:
+    """Number of typos tolerated for a query of this length."""
+    if len(query) < 4:
+        return 0
+    if len(query) < 9:
+        return 1
+    return 2
+
+
+def bounded_substring_distance(query: str, text: str, k: int) -> Optional[int]:
+    """
+    Smallest edit distance between query and any substring of text.
+
+    Uses optimal string alignment (insert, delete, substitute and swap of
+    adjacent characters all cost 1). Gives up as soon as every alignment
+    is more than k edits away.
+
+    Returns:
+        The distance, or None if it exceeds k
+    """
+    m = len(query)
+    n = len(text)
+    # Row 0 is all zeros: the match may start anywhere in text
+    prev2 = None
+    prev = [0] * (n + 1)
+    for i in range(1, m + 1):
+        qc = query[i - 1]
+        cur = [i] + [0] * n
+        row_min = i
+        for j in range(1, n + 1):
+            tc = text[j - 1]
+            cost = 0 if qc == tc else 1
+            best = prev[j - 1] + cost
+            if prev[j] + 1 < best:
+                best = prev[j] + 1
+            if cur[j - 1] + 1 < best:
+                best = cur[j - 1] + 1
+            if (prev2 is not None and j > 1 and qc == text[j - 2]
+                    and query[i - 2] == tc and prev2[j - 2] + 1 < best):
+                best = prev2[j - 2] + 1
+            cur[j] = best
+            if best < row_min:
+                row_min = best
+        if row_min > k:
+            return None
+        prev2, prev = prev, cur
+
+    # The match may end anywhere in text
+    distance = min(prev)
+    return distance if distance <= k else None
+
+
+class StockSearchIndex:
+    """
+    N-gram index over stock codes, names, pinyin initials and full pinyin.
+
+    Stocks are expected to carry 'code' and 'name' and, for pinyin search,
+    'pinyin_full' and 'pinyin_initials' (see build_search_index).
+    Posting lists are NumPy arrays so a query is scored with array operations.
+    The index is read-only after construction, so it can be queried from a
+    worker thread.
+    """
+
+    def __init__(self, stocks: List[Dict]):
+        self.stocks = stocks
+        self.fields = {field: [] for field in FIELDS}
+        grams = {field: defaultdict(list) for field in FIELDS}
+
+        for sid, stock in enumerate(stocks):
+            values = {
+                "code": str(stock.get("code", "")),
+                "name": str(stock.get("name", "")).lower(),
+                "initials": stock.get("pinyin_initials", ""),
+                "pinyin": stock.get("pinyin_full", ""),
+            }
+            for field, value in values.items():
+                self.fields[field].append(value)
+                # Full pinyin only gets trigrams: one or two latin letters
+                # match nearly everything and are covered by the initials
+                min_n = 3 if field == "pinyin" else 1
+                self._add_grams(grams[field], sid, value, min_n)
+
+        # grams[field][gram] -> packed (stock id << _POS_BITS | position) array
+        self.grams = {
+            field: {gram: np.array(entries, dtype=np.int64) for gram, entries in postings.items()}
+            for field, postings in grams.items()
+        }
+        self.lengths = {
+            field: np.array([max(1, len(value)) for value in values], dtype=np.float64)
+            for field, values in self.fields.items()
+        }
+
+    @staticmethod
+    def _add_grams(postings, sid: int, value: str, min_n: int):
+        packed_sid = sid << _POS_BITS
+        for n in range(min_n, 4):
+            for pos in range(min(len(value) - n + 1, _POS_MASK + 1)):
+                postings[value[pos:pos + n]].append(packed_sid | pos)
+
+    def __len__(self):
+        return len(self.stocks)
+
+    def search(self, query: str, limit: int = 20,
+               is_cancelled: Optional[Callable[[], bool]] = None) -> List[Dict]:
+        """
+        Find the stocks most relevant to a query.
+
+        Args:
+            query: Code, Chinese name, pinyin initials or (possibly mistyped) pinyin
+            limit: Maximum number of results
+            is_cancelled: Optional callback; when it returns True the search
+                          stops and returns []
+
+        Returns:
+            Matching stocks, most relevant first
+        """
+        return [stock for _, stock in self.search_scored(query, limit, is_cancelled)]
+
+    def search_scored(self, query: str, limit: int = 20,
+                      is_cancelled: Optional[Callable[[], bool]] = None) -> List[Tuple[float, Dict]]:
+        """Same as search() but returns (score, stock) pairs."""
+        text = query.strip().lower()
+        if not text or not self.stocks:
+            return []
+
+        # Best score of each stock over all fields; 0 means no match
+        scores = np.zeros(len(self.stocks), dtype=np.float64)
+        for field in FIELDS:
+            entries = self._exact_entries(field, text)
+            if entries is None or not len(entries):
+                continue
+            sids = entries >> _POS_BITS
+            prefix_weight, contains_weight = EXACT_WEIGHTS[field]
+            field_scores = (np.where((entries & _POS_MASK) == 0, prefix_weight, contains_weight)
+                            + COVERAGE_BONUS * len(text) / self.lengths[field][sids])
+            np.maximum.at(scores, sids, field_scores)
+        if is_cancelled and is_cancelled():
+            return []
+
+        k = max_edits(text)
+        if k and np.count_nonzero(scores) < limit and text.isascii() and text.isalpha():
+            for sid, distance in self._fuzzy_hits(text, k, scores):
+                scores[sid] = (FUZZY_WEIGHT - FUZZY_PENALTY * distance
+                               + COVERAGE_BONUS * min(1.0, len(text) / self.lengths["pinyin"][sid]))
+            if is_cancelled and is_cancelled():
+                return []
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > limit:
+            # Keep everything tied with the limit-th score so the sort stays stable
+            cutoff = np.partition(scores[matched], len(matched) - limit)[len(matched) - limit]
+            matched = matched[scores[matched] >= cutoff]
+        ranked = matched[np.lexsort((matched, -scores[matched]))][:limit]
+        return [(float(scores[sid]), self.stocks[sid]) for sid in ranked]
+
+    def _exact_entries(self, field: str, text: str):
+        """Packed (sid, position) entries of stocks whose field contains text."""
+        postings = self.grams[field]
+        if len(text) <= 3:
+            return postings.get(text)
+
+        # Longer queries: candidates come from the rarest trigram, then verify
+        rarest = None
+        for pos in range(len(text) - 2):
+            entries = postings.get(text[pos:pos + 3])
+            if entries is None:
+                return None
+            if rarest is None or len(entries) < len(rarest):
+                rarest = entries
+        values = self.fields[field]
+        hits = []
+        for sid in np.unique(rarest >> _POS_BITS).tolist():
+            pos = values[sid].find(text)
+            if pos >= 0:
+                hits.append(sid << _POS_BITS | min(pos, _POS_MASK))
+        return np.array(hits, dtype=np.int64)
+
+    def _fuzzy_hits(self, text: str, k: int, scores: np.ndarray):
+        """Yield (sid, distance) for unmatched pinyin within k edits of text."""
+        postings = self.grams["pinyin"]
+        query_grams = [text[pos:pos + 3] for pos in range(len(text) - 2)]
+
+        # Count trigrams shared with each stock
+        shared = [postings[gram] >> _POS_BITS for gram in query_grams if gram in postings]
+        if not shared:
+            return
+        counts = np.bincount(np.concatenate(shared), minlength=len(self.stocks))
+        counts[scores > 0] = 0  # Already matched exactly
+
+        # q-gram lemma: each edit destroys at most 4 trigrams (a swap of
+        # adjacent letters touches two positions)
+        threshold = max(1, len(query_grams) - 4 * k)
+        candidates = np.flatnonzero(counts >= threshold)
+        candidates = candidates[np.lexsort((candidates, -counts[candidates]))][:MAX_FUZZY_VERIFY]
+
+        values = self.fields["pinyin"]
+        for sid in candidates.tolist():
+            value = values[sid]
+            # Compare against the window most shared trigrams agree on
+            offsets = [value.find(gram) - qpos for qpos, gram in enumerate(query_grams)
+                       if gram in value]
+            offset = max(set(offsets), key=offsets.count)
+            window = value[max(0, offset - k):offset + len(text) + k]
+            distance = bounded_substring_distance(text, window, k)
+            if distance is not None:
+                yield sid, distance
+
+
+def build_search_index(stocks: List[Dict]) -> StockSearchIndex:
+    """
+    Add pinyin fields to each stock and index them.
+
+    Sets 'pinyin_full' (zhongguohedian) and 'pinyin_initials' (zghd) on
+    every stock dict in place. Converting all names to pinyin is the slow
+    part of building the index, so callers run this once per universe.
+    """
+    # pypinyin loads a large phrase dictionary; import it only when needed
+    from pypinyin import lazy_pinyin
+
+    for stock in stocks:
+        pinyin_list = lazy_pinyin(stock['name'])
+        stock['pinyin_full'] = ''.join(pinyin_list)
+        stock['pinyin_initials'] = ''.join([p[0] for p in pinyin_list])
+    return StockSearchIndex(stocks)
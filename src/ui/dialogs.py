@@ -1,5 +1,14 @@
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QFormLayout, QLineEdit, 
-                             QDialogButtonBox, QTextEdit, QLabel)
+                             QDialogButtonBox, QTextEdit, QLabel, QSpinBox, QDoubleSpinBox,
+                             QCheckBox)
+
+try:
+    from services.chat_memory import history_token_budget
+    from services.llm_failover import failover_settings
+except ImportError:
+    # Fallback for relative imports if run as package
+    from ..services.chat_memory import history_token_budget
+    from ..services.llm_failover import failover_settings
 
 class BaseDialog(QDialog):
     def __init__(self, parent=None, title="Dialog"):
@@ -29,19 +38,29 @@ class LLMProviderDialog(BaseDialog):
         self.api_key_input.setEchoMode(QLineEdit.EchoMode.Password)
         self.base_url_input = QLineEdit(self.data.get("base_url", ""))
         self.model_name_input = QLineEdit(self.data.get("model_name", ""))
+        self.history_tokens_input = QSpinBox()
+        self.history_tokens_input.setRange(200, 1000000)
+        self.history_tokens_input.setSingleStep(1000)
+        self.history_tokens_input.setValue(history_token_budget(self.data))  # Default on a bad value
+        self.history_tokens_input.setToolTip("每次请求携带的对话历史上限，超出后较早的对话会被压缩为摘要")
         
         self.add_input("供应商名称:", self.name_input)
         self.add_input("API Key:", self.api_key_input)
         self.add_input("Base URL (可选):", self.base_url_input)
         self.add_input("模型名称:", self.model_name_input)
+        self.add_input("历史上下文 Token:", self.history_tokens_input)
 
     def get_data(self):
-        return {
+        # Keep settings this dialog does not edit (e.g. max_concurrency)
+        data = dict(self.data)
+        data.update({
             "name": self.name_input.text(),
             "api_key": self.api_key_input.text(),
             "base_url": self.base_url_input.text(),
-            "model_name": self.model_name_input.text()
-        }
+            "model_name": self.model_name_input.text(),
+            "history_tokens": self.history_tokens_input.value(),
+        })
+        return data
 
 class PromptTemplateDialog(BaseDialog):
     def __init__(self, parent=None, data=None):
@@ -52,8 +71,21 @@ class PromptTemplateDialog(BaseDialog):
         self.name_input = QLineEdit(self.data.get("name", ""))
         self.content_input = QTextEdit()
         self.content_input.setPlainText(self.data.get("content", ""))
+        hedge_after, failover = failover_settings(self.data)
+        self.hedge_after_input = QDoubleSpinBox()
+        self.hedge_after_input.setRange(0, 120)
+        self.hedge_after_input.setDecimals(1)
+        self.hedge_after_input.setSingleStep(0.5)
+        self.hedge_after_input.setSuffix(" 秒")
+        self.hedge_after_input.setSpecialValueText("关闭")
+        self.hedge_after_input.setValue(hedge_after)
+        self.hedge_after_input.setToolTip("超过该时间仍未收到首字时，同时向备用模型发送相同请求，采用先开始输出的回答")
+        self.failover_input = QCheckBox("请求出错时自动切换到其他模型")
+        self.failover_input.setChecked(failover)
         
         self.add_input("模板名称:", self.name_input)
+        self.add_input("对冲请求等待:", self.hedge_after_input)
+        self.add_input("故障转移:", self.failover_input)
         self.layout.addWidget(QLabel("提示词内容:"))
         self.layout.addWidget(self.content_input)
         
@@ -62,7 +94,11 @@ class PromptTemplateDialog(BaseDialog):
         self.layout.addWidget(self.button_box)
 
     def get_data(self):
-        return {
+        data = dict(self.data)
+        data.update({
             "name": self.name_input.text(),
-            "content": self.content_input.toPlainText()
-        }
+            "content": self.content_input.toPlainText(),
+            "hedge_after": self.hedge_after_input.value(),
+            "failover": self.failover_input.isChecked(),
+        })
+        return data
@@ -1,17 +1,28 @@
 import sys
 from PyQt6.QtWidgets import (QMainWindow, QTabWidget, QLabel, QVBoxLayout, QWidget, QApplication)
-from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtCore import Qt, pyqtSignal, QTimer
 
 # Import Tab Widgets
 from .tabs.trading_monitor import TradingMonitorTab
 from .tabs.smart_selection import SmartSelectionTab
 from .tabs.configuration import ConfigTab
 from .theme_manager import ThemeManager
+from .utils.worker import MarketHubLoader
 
 try:
     from ..utils.config_manager import ConfigManager
+    from ..utils.startup_trace import startup_trace
+    from ..utils.warmup import warm_up_imports
+    from ..services.market_data_hub import MarketDataHub
 except ImportError:
     from utils.config_manager import ConfigManager
+    from utils.startup_trace import startup_trace
+    from utils.warmup import warm_up_imports
+    from services.market_data_hub import MarketDataHub
+
+# Tab order: (key, title); each tab is built the first time it is shown
+TABS = [("trading", "交易监控"), ("selection", "选股"), ("config", "配置")]
+DATA_TABS = ("trading", "selection")  # Tabs that need the market data hub
 
 class MainWindow(QMainWindow):
     # Signal for favorites update
@@ -25,17 +36,32 @@ class MainWindow(QMainWindow):
         self.resize(1400, 900)
         
         # Initialize config manager
-        self.config_manager = ConfigManager()
+        with startup_trace.phase("config"):
+            self.config_manager = ConfigManager()
         
-        # Central Widget - QTabWidget
-        self.tabs = QTabWidget()
-        self.setCentralWidget(self.tabs)
+        # Shared market data / LLM services for all tabs, loaded in the background
+        self.market_hub = None
+        self.closing = False
+        self.hub_loader = MarketHubLoader(MarketDataHub, startup_trace)
+        self.hub_loader.hub_ready.connect(self.on_hub_loaded)
+        
+        # Tabs are created on first activation; until then a placeholder is shown
+        self.tab_trading = None
+        self.tab_selection = None
+        self.tab_config = None
+        self.warmup_thread = None
         
-        # Initialize Tabs
-        self.init_tabs()
+        # Central Widget - QTabWidget
+        with startup_trace.phase("window"):
+            self.tabs = QTabWidget()
+            self.setCentralWidget(self.tabs)
+            self.init_tabs()
         
         # Apply Initial Theme
-        self.apply_initial_theme()
+        with startup_trace.phase("theme"):
+            self.apply_initial_theme()
+        
+        self.hub_loader.start()
 
     def apply_initial_theme(self):
         config_manager = ConfigManager()
@@ -44,52 +70,112 @@ class MainWindow(QMainWindow):
         ThemeManager.apply_theme(QApplication.instance(), theme)
 
     def init_tabs(self):
-        # 1. Trading Monitor Tab
-        self.tab_trading = TradingMonitorTab()
-        self.tabs.addTab(self.tab_trading, "交易监控")
-        
-        # 2. Smart Selection Tab
-        self.tab_selection = SmartSelectionTab()
-        self.tabs.addTab(self.tab_selection, "选股")
-        
-        # 3. Configuration Tab
-        self.tab_config = ConfigTab()
-        self.tabs.addTab(self.tab_config, "配置")
-
-        # Connect signals for model synchronization
-        self.tab_config.modelsUpdated.connect(self.tab_trading.update_models)
-        self.tab_config.modelsUpdated.connect(self.tab_selection.update_models)
-
-        # Connect signals for prompt synchronization
-        self.tab_config.promptsUpdated.connect(self.tab_trading.update_prompts)
-        self.tab_config.promptsUpdated.connect(self.tab_selection.update_prompts)
-
-        # Initial synchronization
-        initial_models = self.tab_config.get_model_names()
-        self.tab_trading.update_models(initial_models)
-        self.tab_selection.update_models(initial_models)
-
-        # Initial prompt synchronization
-        # We need to expose get_prompt_names in ConfigTab or access via manager, 
-        # but ConfigTab manages the state so let's use its prompts dict.
-        initial_prompts = list(self.tab_config.prompts.keys())
-        self.tab_trading.update_prompts(initial_prompts)
-        self.tab_selection.update_prompts(initial_prompts)
-        
+        """Add a placeholder page per tab; real tabs are built by ensure_tab()"""
+        for key, title in TABS:
+            placeholder = QLabel("正在加载行情数据..." if key in DATA_TABS else "正在加载...")
+            placeholder.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            placeholder.setStyleSheet("color: #999;")
+            self.tabs.addTab(placeholder, title)
+        self.tabs.currentChanged.connect(self.ensure_tab)
+
+    def on_hub_loaded(self, hub):
+        """Market data is ready: build the tab the user is looking at"""
+        if self.closing:
+            return
+        if hub is None:
+            for index, (key, _) in enumerate(TABS):
+                if key in DATA_TABS and self.tab_widget(key) is None:
+                    self.tabs.widget(index).setText("行情数据加载失败，请检查数据文件后重启。")
+            return
+        self.market_hub = hub
+        if self.tab_config is not None:
+            self.tab_config.set_llm_service(hub.llm_service)
+        # Let the window paint before building widgets
+        QTimer.singleShot(0, lambda: self.ensure_tab(self.tabs.currentIndex()))
+
+    def tab_widget(self, key):
+        return getattr(self, f"tab_{key}")
+
+    def ensure_tab(self, index):
+        """Build the tab at index if it is still a placeholder"""
+        if index < 0:
+            return
+        key, title = TABS[index]
+        if self.tab_widget(key) is not None:
+            return
+        if key in DATA_TABS and self.market_hub is None:
+            return  # on_hub_loaded() builds it
+
+        with startup_trace.phase(f"build tab: {key}"):
+            if key == "trading":
+                widget = TradingMonitorTab(self.market_hub)
+            elif key == "selection":
+                widget = SmartSelectionTab(self.market_hub)
+            else:
+                widget = ConfigTab()
+            setattr(self, f"tab_{key}", widget)
+            self.connect_tab(key, widget)
+
+            # Swap the placeholder for the real tab without re-entering ensure_tab
+            self.tabs.blockSignals(True)
+            placeholder = self.tabs.widget(index)
+            self.tabs.removeTab(index)
+            self.tabs.insertTab(index, widget, title)
+            self.tabs.setCurrentIndex(index)
+            self.tabs.blockSignals(False)
+            placeholder.deleteLater()
+
+        startup_trace.report()
+        if self.warmup_thread is None:
+            # First tab is usable: load the deferred dependencies in the background
+            self.warmup_thread = warm_up_imports(trace=startup_trace)
+
+    def connect_tab(self, key, widget):
+        """Wire a newly built tab to the window and to the tabs built before it"""
+        data_tabs = [self.tab_widget(k) for k in DATA_TABS if self.tab_widget(k) is not None]
+        if key == "config":
+            # Provider and prompt edits invalidate the cached LLM clients and chains
+            self.tab_config.modelsUpdated.connect(self.on_models_updated)
+            self.tab_config.promptsUpdated.connect(self.on_prompts_updated)
+            if self.market_hub is not None:
+                self.tab_config.set_llm_service(self.market_hub.llm_service)
+            # Connect signals for model and prompt synchronization
+            for tab in data_tabs:
+                self.tab_config.modelsUpdated.connect(tab.update_models)
+                self.tab_config.promptsUpdated.connect(tab.update_prompts)
+            return
+
+        # Data tabs read the current models and prompts from config when built
+        if self.tab_config is not None:
+            self.tab_config.modelsUpdated.connect(widget.update_models)
+            self.tab_config.promptsUpdated.connect(widget.update_prompts)
+
         # Connect favorites signals
-        self.favoritesUpdated.connect(self.tab_trading.update_favorites)
-        self.favoritesUpdated.connect(self.tab_selection.update_favorites)
-        
-        # Connect add/remove favorite signals from tabs
-        self.tab_trading.favoriteAdded.connect(self.on_favorite_added)
-        self.tab_trading.favoriteRemoved.connect(self.on_favorite_removed)
-        self.tab_selection.favoriteAdded.connect(self.on_favorite_added)
-        self.tab_selection.favoriteRemoved.connect(self.on_favorite_removed)
-        
+        self.favoritesUpdated.connect(widget.update_favorites)
+        widget.favoriteAdded.connect(self.on_favorite_added)
+        widget.favoriteRemoved.connect(self.on_favorite_removed)
+
         # Load initial favorites
-        initial_favorites = self.config_manager.get_favorites()
-        self.favoritesUpdated.emit(initial_favorites)
+        widget.update_favorites(self.config_manager.get_favorites())
     
+    def closeEvent(self, event):
+        """Stop background price polling before the window closes"""
+        self.closing = True
+        self.hub_loader.wait()
+        if self.market_hub is not None:
+            self.market_hub.shutdown()
+        super().closeEvent(event)
+
+    def on_models_updated(self, model_names):
+        """A provider was added, edited or removed: rebuild LLM clients on next use"""
+        if self.market_hub is not None:
+            self.market_hub.llm_service.invalidate_clients()
+
+    def on_prompts_updated(self, prompt_names):
+        """A prompt template changed: recompile prompt chains on next use"""
+        if self.market_hub is not None:
+            self.market_hub.llm_service.invalidate_prompts()
+
     def on_favorite_added(self, code, name):
         """Handle favorite stock added"""
         if self.config_manager.add_favorite(code, name):
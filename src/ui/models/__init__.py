@@ -0,0 +1,5 @@
+"""UI Models"""
+from .watchlist_model import WatchlistModel
+from .screener_model import ScreenerTableModel
+
+__all__ = ['WatchlistModel', 'ScreenerTableModel']
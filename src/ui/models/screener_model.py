@@ -0,0 +1,155 @@
+"""
+Virtual screener result model over column arrays
+"""
+from typing import Dict, List
+
+import numpy as np
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QColor
+
+# (field, header, display format); every indicator the screener computes
+COLUMNS = [
+    ("code", "代码", None),
+    ("name", "名称", None),
+    ("price", "现价", "{:.2f}"),
+    ("change", "涨跌%", "{:+.2f}%"),
+    ("turnover", "换手%", "{:.2f}%"),
+    ("volume_ratio", "量比", "{:.2f}"),
+    ("ma_bullish", "均线", None),
+    ("kdj_k", "K", "{:.2f}"),
+    ("kdj_d", "D", "{:.2f}"),
+    ("kdj_j", "J", "{:.2f}"),
+    ("macd", "MACD", "{:.3f}"),
+    ("dif", "DIF", "{:.3f}"),
+    ("dea", "DEA", "{:.3f}"),
+    ("rsi", "RSI", "{:.2f}"),
+    ("ma5", "MA5", "{:.2f}"),
+    ("ma10", "MA10", "{:.2f}"),
+    ("ma20", "MA20", "{:.2f}"),
+    ("ma60", "MA60", "{:.2f}"),
+    ("boll_upper", "BOLL上轨", "{:.2f}"),
+    ("boll_mid", "BOLL中轨", "{:.2f}"),
+    ("boll_lower", "BOLL下轨", "{:.2f}"),
+]
+
+COLOR_BULLISH = QColor("#4CAF50")
+COLOR_NEUTRAL = QColor("#999")
+
+
+class ScreenerTableModel(QAbstractTableModel):
+    """
+    Screener results as a view over the screener's row-index array.
+
+    No per-cell objects are created: data() formats values straight from
+    the shared column arrays. Rows are exposed in pages through
+    canFetchMore()/fetchMore(), and sorting reorders the index array with
+    NumPy argsort.
+    """
+
+    PAGE_SIZE = 200
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.columns: Dict[str, np.ndarray] = {}
+        self.indices = np.zeros(0, dtype=np.int64)
+        self.loaded = 0  # Rows exposed to the view so far
+
+    # --- Qt model interface ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return COLUMNS[section][1]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        field, _, fmt = COLUMNS[index.column()]
+        value = self.columns[field][self.indices[index.row()]]
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if field == "ma_bullish":
+                return "✓" if value else "✗"
+            if fmt is None:
+                return str(value)
+            return fmt.format(value)
+        elif role == Qt.ItemDataRole.TextAlignmentRole:
+            if field in ("code", "name"):
+                return None
+            return Qt.AlignmentFlag.AlignCenter
+        elif role == Qt.ItemDataRole.ForegroundRole:
+            if field == "ma_bullish":
+                return COLOR_BULLISH if value else COLOR_NEUTRAL
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.loaded < len(self.indices)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(self.PAGE_SIZE, len(self.indices) - self.loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self.loaded, self.loaded + count - 1)
+        self.loaded += count
+        self.endInsertRows()
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        """Reorder the index array by one column using NumPy argsort"""
+        if not len(self.indices):
+            return
+        field = COLUMNS[column][0]
+        keys = self.columns[field][self.indices]
+        if order == Qt.SortOrder.DescendingOrder:
+            if keys.dtype.kind in "fi":
+                # Negate numbers so ties keep their current order
+                permutation = np.argsort(-keys, kind="stable")
+            else:
+                permutation = np.argsort(keys, kind="stable")[::-1]
+        else:
+            permutation = np.argsort(keys, kind="stable")
+
+        self.layoutAboutToBeChanged.emit()
+        self.indices = self.indices[permutation]
+        self.layoutChanged.emit()
+
+    # --- Screener API ---
+
+    def set_result(self, columns: Dict[str, np.ndarray], indices: np.ndarray):
+        """
+        Show a screener result.
+
+        Args:
+            columns: Column arrays of the stock universe (StockDataService.columns)
+            indices: Row indices of the matching stocks
+        """
+        self.beginResetModel()
+        self.columns = columns
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.loaded = min(self.PAGE_SIZE, len(self.indices))
+        self.endResetModel()
+
+    def result_count(self) -> int:
+        """Number of matching stocks, including rows not fetched yet"""
+        return len(self.indices)
+
+    def code_at(self, row: int) -> str:
+        return str(self.columns["code"][self.indices[row]])
+
+    def name_at(self, row: int) -> str:
+        return str(self.columns["name"][self.indices[row]])
+
+    def stocks_in_order(self, fields=()) -> List[Dict]:
+        """Code, name and the given extra fields of every result row, in the current sort order"""
+        names = ("code", "name") + tuple(fields)
+        if not len(self.indices):
+            return []
+        values = [self.columns[field][self.indices].tolist() for field in names]
+        return [dict(zip(names, row)) for row in zip(*values)]
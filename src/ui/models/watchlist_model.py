@@ -0,0 +1,176 @@
+"""
+Watchlist table model backed by quote arrays
+"""
+from typing import Dict, List
+
+import numpy as np
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QColor
+
+COL_CODE, COL_NAME, COL_PRICE, COL_CHANGE = range(4)
+
+# Red for up, green for down in China; gray for no change
+COLOR_UP = QColor("#FF0000")
+COLOR_DOWN = QColor("#00FF00")
+COLOR_FLAT = QColor("#888888")
+
+
+def _changed(new: np.ndarray, old: np.ndarray) -> np.ndarray:
+    """Element-wise inequality that treats NaN -> NaN as unchanged."""
+    return ~((new == old) | (np.isnan(new) & np.isnan(old)))
+
+
+class WatchlistModel(QAbstractTableModel):
+    """
+    Watchlist of stocks with their latest price and change percent.
+
+    Quotes live in NumPy arrays; update_quotes() compares the new values
+    with the old ones and emits dataChanged only for the cells that
+    actually changed, so large watchlists refresh without rebuilding items.
+    """
+
+    HEADERS = ["代码", "名称", "现价", "涨跌幅"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.codes: List[str] = []
+        self.names: List[str] = []
+        self.row_of: Dict[str, int] = {}
+        self.prices = np.full(0, np.nan)
+        self.percents = np.full(0, np.nan)
+        self.from_cache = np.zeros(0, dtype=bool)
+
+    # --- Qt model interface ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.codes)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row, col = index.row(), index.column()
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if col == COL_CODE:
+                return self.codes[row]
+            if col == COL_NAME:
+                return self.names[row]
+            if col == COL_PRICE:
+                price = self.prices[row]
+                return "--" if np.isnan(price) else f"{price:.2f}"
+            if col == COL_CHANGE:
+                percent = self.percents[row]
+                return "--" if np.isnan(percent) else f"{percent:+.2f}%"
+        elif role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+        elif role == Qt.ItemDataRole.ForegroundRole:
+            if col in (COL_PRICE, COL_CHANGE):
+                percent = self.percents[row]
+                if np.isnan(percent):
+                    return None
+                if percent > 0:
+                    return COLOR_UP
+                if percent < 0:
+                    return COLOR_DOWN
+                return COLOR_FLAT
+        elif role == Qt.ItemDataRole.ToolTipRole:
+            # Cache indicator if data is from cache
+            if col == COL_PRICE and self.from_cache[row]:
+                return "缓存数据"
+        return None
+
+    # --- Watchlist API ---
+
+    def code_at(self, row: int) -> str:
+        return self.codes[row]
+
+    def name_at(self, row: int) -> str:
+        return self.names[row]
+
+    def set_symbols(self, favorites: List[Dict]):
+        """
+        Replace the watched symbols, keeping quotes of symbols still present.
+
+        Args:
+            favorites: List of {"code": ..., "name": ...} dictionaries
+        """
+        codes = [fav.get('code', '') for fav in favorites]
+        names = [fav.get('name', '') for fav in favorites]
+
+        prices = np.full(len(codes), np.nan)
+        percents = np.full(len(codes), np.nan)
+        from_cache = np.zeros(len(codes), dtype=bool)
+        for row, code in enumerate(codes):
+            old_row = self.row_of.get(code)
+            if old_row is not None:
+                prices[row] = self.prices[old_row]
+                percents[row] = self.percents[old_row]
+                from_cache[row] = self.from_cache[old_row]
+
+        self.beginResetModel()
+        self.codes = codes
+        self.names = names
+        self.row_of = {code: row for row, code in enumerate(codes)}
+        self.prices = prices
+        self.percents = percents
+        self.from_cache = from_cache
+        self.endResetModel()
+
+    def update_quotes(self, quotes: Dict[str, Dict]) -> int:
+        """
+        Apply price data and notify views about changed cells only.
+
+        Args:
+            quotes: Mapping of stock code to price data with 'current',
+                    'percent' and optional 'from_cache' keys
+
+        Returns:
+            Number of cells that changed
+        """
+        if not quotes or not self.codes:
+            return 0
+
+        prices = self.prices.copy()
+        percents = self.percents.copy()
+        from_cache = self.from_cache.copy()
+        for code, price_data in quotes.items():
+            row = self.row_of.get(code)
+            if row is None or not price_data:
+                continue
+            prices[row] = price_data.get('current', 0)
+            percents[row] = price_data.get('percent', 0)
+            from_cache[row] = price_data.get('from_cache', False)
+
+        price_changed = _changed(prices, self.prices)
+        percent_changed = _changed(percents, self.percents)
+        # The price cell is also repainted when its color or tooltip changes
+        price_cell_changed = (price_changed
+                              | _changed(np.sign(percents), np.sign(self.percents))
+                              | (from_cache != self.from_cache))
+
+        self.prices = prices
+        self.percents = percents
+        self.from_cache = from_cache
+
+        self._emit_changed_runs(price_cell_changed, COL_PRICE)
+        self._emit_changed_runs(percent_changed, COL_CHANGE)
+        return int(np.count_nonzero(price_cell_changed) + np.count_nonzero(percent_changed))
+
+    def _emit_changed_runs(self, changed: np.ndarray, column: int):
+        """Emit one dataChanged per run of consecutive changed rows."""
+        rows = np.flatnonzero(changed)
+        if not len(rows):
+            return
+        breaks = np.flatnonzero(np.diff(rows) > 1)
+        starts = np.concatenate(([rows[0]], rows[breaks + 1]))
+        ends = np.concatenate((rows[breaks], [rows[-1]]))
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            self.dataChanged.emit(self.index(start, column), self.index(end, column))
@@ -1,13 +1,18 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QFormLayout, QGroupBox, 
                              QLineEdit, QComboBox, QPushButton, QScrollArea, QListWidget, 
-                             QLabel, QSplitter, QApplication)
+                             QLabel, QSplitter, QApplication, QTableWidget, QTableWidgetItem,
+                             QHeaderView)
 from PyQt6.QtCore import Qt, pyqtSignal, QTimer
 from ..theme_manager import ThemeManager
 from ..dialogs import LLMProviderDialog, PromptTemplateDialog
 try:
     from ...utils.config_manager import ConfigManager
+    from ...services.llm_telemetry import AUTO_MODEL
 except ImportError:
     from utils.config_manager import ConfigManager
+    from services.llm_telemetry import AUTO_MODEL
+
+TELEMETRY_REFRESH_MS = 3000
 
 class ConfigTab(QWidget):
     # Signal emitted when model list changes, passing list of model names
@@ -19,9 +24,15 @@ class ConfigTab(QWidget):
         self.config_manager = ConfigManager()
         self.providers = self.config_manager.get_providers()
         self.prompts = self.config_manager.get_prompts()
+        self.llm_service = None  # Set once market data is loaded, see set_llm_service()
         
         self.init_ui()
 
+        # Refresh the latency table while the tab is shown
+        self.telemetry_timer = QTimer(self)
+        self.telemetry_timer.timeout.connect(self.refresh_telemetry)
+        self.telemetry_timer.start(TELEMETRY_REFRESH_MS)
+
     def get_model_names(self):
         """Extract just the model names from providers"""
         return [p.get('model_name', '') for p in self.providers.values() if p.get('model_name')]
@@ -62,6 +73,9 @@ class ConfigTab(QWidget):
         
         # 2. Prompt Templates Manager
         left_layout.addWidget(self.create_prompt_manager_group())
+
+        # 3. Provider latency
+        left_layout.addWidget(self.create_telemetry_group())
         
         # --- Right Column: Strategy & Notification & Appearance ---
         right_widget = QWidget()
@@ -178,6 +192,55 @@ class ConfigTab(QWidget):
         
         return group
     
+    def create_telemetry_group(self):
+        group = QGroupBox("模型响应统计 (最近 50 次请求)")
+        layout = QVBoxLayout(group)
+
+        self.telemetry_table = QTableWidget(0, 5)
+        self.telemetry_table.setHorizontalHeaderLabels(["模型", "请求数", "首字延迟", "生成速度", "错误率"])
+        self.telemetry_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.telemetry_table.verticalHeader().setVisible(False)
+        self.telemetry_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.telemetry_table.setMaximumHeight(180)
+        self.auto_model_label = QLabel(f"{AUTO_MODEL}: 尚无数据")
+        self.auto_model_label.setStyleSheet("color: #666;")
+
+        layout.addWidget(self.telemetry_table)
+        layout.addWidget(self.auto_model_label)
+        return group
+
+    def set_llm_service(self, llm_service):
+        """Show the latency telemetry of the shared LLMService"""
+        self.llm_service = llm_service
+        self.refresh_telemetry()
+
+    def refresh_telemetry(self):
+        """Fill the latency table from the service's rolling telemetry"""
+        if self.llm_service is None or not self.isVisible():
+            return
+        telemetry = self.llm_service.telemetry
+        model_names = self.get_model_names()
+        self.telemetry_table.setRowCount(len(model_names))
+        for row, model_name in enumerate(model_names):
+            stats = telemetry.stats(model_name)
+            healthy = telemetry.is_healthy(stats)
+            cells = [
+                model_name,
+                str(stats["requests"]),
+                "-" if stats["ttft"] is None else f"{stats['ttft']:.2f}s",
+                "-" if stats["tokens_per_sec"] is None else f"{stats['tokens_per_sec']:.1f} tok/s",
+                f"{stats['error_rate'] * 100:.0f}%" if stats["requests"] else "-",
+            ]
+            for column, text in enumerate(cells):
+                item = QTableWidgetItem(text)
+                if not healthy:
+                    item.setForeground(Qt.GlobalColor.red)
+                self.telemetry_table.setItem(row, column, item)
+
+        chosen = self.llm_service.resolve_model(AUTO_MODEL)
+        self.auto_model_label.setText(f"{AUTO_MODEL} 当前将使用: {chosen}" if chosen != AUTO_MODEL
+                                      else f"{AUTO_MODEL}: 没有可用的模型")
+
     # --- Interaction Logic: Providers ---
     def add_provider(self):
         dialog = LLMProviderDialog(self)
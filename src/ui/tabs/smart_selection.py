@@ -1,34 +1,45 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QSplitter, 
-                             QTableWidget, QTableWidgetItem, QTextEdit, QPushButton, 
+                             QTableWidget, QTableWidgetItem, QTableView, QTextEdit, QPushButton, 
                              QGroupBox, QHeaderView, QComboBox, QLabel, QDoubleSpinBox, 
                              QCheckBox, QAbstractItemView, QMessageBox, QTabWidget,
-                             QScrollArea, QSpinBox)
-from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+                             QScrollArea, QSpinBox, QProgressBar)
+from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QColor, QFont
-import markdown
 
 try:
-    from services.llm_service import LLMService
-    from services.stock_data_service import StockDataService
-    from ui.utils.worker import LLMWorker
+    from services.market_data_hub import MarketDataHub
+    from services.llm_telemetry import AUTO_MODEL
+    from services.batch_analysis import (BATCH_SIZE, CONTEXT_FIELD_NAMES, build_batch_prompt,
+                                         parse_batch_response)
+    from ui.utils.worker import LLMWorker, format_stream_stats
+    from ui.utils.markdown_stream import StreamingMarkdownRenderer
+    from ui.models.screener_model import ScreenerTableModel
+    from ui.utils.analysis_pipeline import AnalysisPipeline, provider_concurrency
 except ImportError:
     # Fallback for relative imports
-    from ...services.llm_service import LLMService
-    from ...services.stock_data_service import StockDataService
-    from ..utils.worker import LLMWorker
+    from ...services.market_data_hub import MarketDataHub
+    from ...services.llm_telemetry import AUTO_MODEL
+    from ...services.batch_analysis import (BATCH_SIZE, CONTEXT_FIELD_NAMES, build_batch_prompt,
+                                            parse_batch_response)
+    from ..utils.worker import LLMWorker, format_stream_stats
+    from ..utils.markdown_stream import StreamingMarkdownRenderer
+    from ..models.screener_model import ScreenerTableModel
+    from ..utils.analysis_pipeline import AnalysisPipeline, provider_concurrency
 
 class SmartSelectionTab(QWidget):
     # Signals for favorite stock management
     favoriteAdded = pyqtSignal(str, str)  # code, name
     favoriteRemoved = pyqtSignal(str)  # code
     
-    def __init__(self):
+    def __init__(self, hub=None):
         super().__init__()
-        self.llm_service = LLMService()
-        self.data_service = StockDataService()
+        # Services are shared with the other tabs through the hub
+        self.hub = hub if hub is not None else MarketDataHub()
+        self.llm_service = self.hub.llm_service
+        self.data_service = self.hub.data_service
         self.init_ui()
         self.load_initial_config()
-        self.ai_analysis_queue = [] # Queue for auto-analysis
+        self.analysis_pipeline = None  # Auto-analysis in progress or last run
         
         # Load all stocks on initialization
         self.load_all_stocks()
@@ -210,14 +221,18 @@ class SmartSelectionTab(QWidget):
         
         col1_splitter.addWidget(filter_group)
         
-        # Primary Result Table
-        self.primary_table = QTableWidget(0, 4)
-        self.primary_table.setHorizontalHeaderLabels(["代码", "名称", "换手%", "均线"])
-        self.primary_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        # Primary Result Table (virtual: rows are paged in and sorted by NumPy)
+        self.primary_model = ScreenerTableModel(self)
+        self.primary_table = QTableView()
+        self.primary_table.setModel(self.primary_model)
+        self.primary_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        self.primary_table.horizontalHeader().setDefaultSectionSize(64)
         self.primary_table.verticalHeader().setVisible(False)
+        self.primary_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
         self.primary_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         self.primary_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
-        self.primary_table.itemClicked.connect(self.on_primary_item_clicked)
+        self.primary_table.setSortingEnabled(True)
+        self.primary_table.clicked.connect(self.on_primary_item_clicked)
         
         col1_splitter.addWidget(self.primary_table)
         
@@ -250,6 +265,7 @@ class SmartSelectionTab(QWidget):
         self.chat_history = QTextEdit()
         self.chat_history.setReadOnly(True)
         self.chat_history.setPlaceholderText("选择左侧股票进行分析，或点击“AI自动复选”批量分析...")
+        self.stream_renderer = StreamingMarkdownRenderer(self.chat_history, self)
         chat_layout.addWidget(self.chat_history)
         
         # Input & Actions
@@ -293,6 +309,23 @@ class SmartSelectionTab(QWidget):
         self.btn_add_fav = QPushButton("➕ 添加到自选")
         self.btn_add_fav.clicked.connect(self.on_add_to_favorites)
         
+        # Auto-analysis progress, cancellation and retry
+        analysis_bar = QHBoxLayout()
+        self.analysis_progress = QProgressBar()
+        self.analysis_progress.setTextVisible(True)
+        self.analysis_progress.setFormat("%v / %m")
+        self.analysis_progress.setValue(0)
+        self.btn_cancel_analysis = QPushButton("停止")
+        self.btn_cancel_analysis.setEnabled(False)
+        self.btn_cancel_analysis.clicked.connect(self.on_cancel_auto_analysis)
+        self.btn_retry_analysis = QPushButton("重试失败")
+        self.btn_retry_analysis.setEnabled(False)
+        self.btn_retry_analysis.clicked.connect(self.on_retry_auto_analysis)
+        analysis_bar.addWidget(self.analysis_progress, 1)
+        analysis_bar.addWidget(self.btn_cancel_analysis)
+        analysis_bar.addWidget(self.btn_retry_analysis)
+        
+        llm_result_layout.addLayout(analysis_bar)
         llm_result_layout.addWidget(self.llm_table)
         llm_result_layout.addWidget(self.btn_add_fav)
         
@@ -344,6 +377,8 @@ class SmartSelectionTab(QWidget):
         current = self.model_selector.currentText()
         self.model_selector.clear()
         self.model_selector.addItems(model_names)
+        if model_names:
+            self.model_selector.addItem(AUTO_MODEL)  # Fastest healthy provider per request
         if current:
             idx = self.model_selector.findText(current)
             if idx >= 0: self.model_selector.setCurrentIndex(idx)
@@ -360,8 +395,7 @@ class SmartSelectionTab(QWidget):
     def load_all_stocks(self):
         """Load all stocks when tab is first opened"""
         try:
-            all_stocks = self.data_service.get_all_stocks()
-            self.populate_table(all_stocks)
+            self.populate_table(self.data_service.all_indices())
         except Exception as e:
             QMessageBox.warning(self, "错误", f"加载股票列表失败: {str(e)}")
     
@@ -461,7 +495,7 @@ class SmartSelectionTab(QWidget):
         
         # Apply filters
         try:
-            results = self.data_service.filter_stocks(criteria)
+            results = self.data_service.filter_indices(criteria)
             self.populate_table(results)
             
             # Show result count
@@ -470,33 +504,18 @@ class SmartSelectionTab(QWidget):
         except Exception as e:
             QMessageBox.warning(self, "错误", f"筛选失败: {str(e)}")
     
-    def populate_table(self, stocks):
-        """Populate the primary table with stock data"""
-        self.primary_table.setRowCount(0)
-        self.primary_table.setRowCount(len(stocks))
-        
-        for row, data in enumerate(stocks):
-            self.primary_table.setItem(row, 0, QTableWidgetItem(data["code"]))
-            self.primary_table.setItem(row, 1, QTableWidgetItem(data["name"]))
-            
-            t_item = QTableWidgetItem(f"{data.get('turnover', 0):.2f}%")
-            t_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.primary_table.setItem(row, 2, t_item)
-            
-            ma_val = "✓" if data.get("ma_bullish", False) else "✗"
-            ma_item = QTableWidgetItem(ma_val)
-            ma_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            if data.get("ma_bullish", False):
-                ma_item.setForeground(QColor("#4CAF50"))
-            else:
-                ma_item.setForeground(QColor("#999"))
-            self.primary_table.setItem(row, 3, ma_item)
+    def populate_table(self, indices):
+        """Show the screener's matching row indices in the primary table"""
+        self.primary_model.set_result(self.data_service.columns, indices)
+        # Re-apply the header's current sort to the new result
+        header = self.primary_table.horizontalHeader()
+        if header.sortIndicatorSection() >= 0:
+            self.primary_model.sort(header.sortIndicatorSection(), header.sortIndicatorOrder())
 
-    def on_primary_item_clicked(self, item):
+    def on_primary_item_clicked(self, index):
         """Update chat context when clicking a stock"""
-        row = item.row()
-        code = self.primary_table.item(row, 0).text()
-        name = self.primary_table.item(row, 1).text()
+        code = self.primary_model.code_at(index.row())
+        name = self.primary_model.name_at(index.row())
         
         self.chat_history.append(f"<b>[系统]</b> 已选中: {name} ({code})，准备分析...")
         self.chat_input.setText(f"请分析 {name} ({code}) 的近期走势及投资价值。")
@@ -507,12 +526,11 @@ class SmartSelectionTab(QWidget):
         if not text: return
         self.process_chat_request(text)
 
-    def process_chat_request(self, text, is_auto=False):
-        """Process a chat request, potentially part of auto-analysis"""
+    def process_chat_request(self, text):
+        """Send a chat message; the reply streams into the chat pane"""
         self.chat_history.append(f"<b>[用户]</b> {text}")
         self.chat_input.clear()
         self.btn_send.setEnabled(False)
-        self.btn_auto_analyze.setEnabled(False) # Lock during process
         
         model_name = self.model_selector.currentText()
         prompt_name = self.prompt_selector.currentText()
@@ -520,99 +538,116 @@ class SmartSelectionTab(QWidget):
         self.chat_history.append(f"<b>[系统]</b> 思考中 ({model_name})...")
         
         # Prepare streaming
-        self.current_stream_response = ""
         self.chat_history.append("<b>[LLM]</b> ")
-        cursor = self.chat_history.textCursor()
-        cursor.movePosition(cursor.MoveOperation.End)
-        self.response_start_position = cursor.position()
+        self.stream_renderer.start()
         
         try:
             self.worker = LLMWorker(self.llm_service, text, model_name, prompt_name)
             self.worker.stream_updated.connect(self.on_llm_stream)
-            # Pass is_auto flag via lambda if needed, but worker finished is generic.
-            # We'll handle post-processing in finished.
-            self.worker.finished.connect(lambda r: self.on_llm_finished(r, is_auto))
+            self.worker.stats_ready.connect(self.on_llm_stats)
+            self.worker.finished.connect(self.on_llm_finished)
             self.worker.start()
         except Exception as e:
             self.chat_history.append(f"<span style='color:red'>启动失败: {str(e)}</span>")
             self.btn_send.setEnabled(True)
-            self.btn_auto_analyze.setEnabled(True)
 
     def on_llm_stream(self, chunk):
-        self.current_stream_response += chunk
-        try:
-            # Enable table extension and other useful extensions for markdown rendering
-            html = markdown.markdown(
-                self.current_stream_response, 
-                extensions=['tables', 'fenced_code', 'nl2br', 'sane_lists']
-            )
-        except:
-            html = self.current_stream_response
-            
-        cursor = self.chat_history.textCursor()
-        cursor.setPosition(self.response_start_position)
-        cursor.movePosition(cursor.MoveOperation.End, cursor.MoveMode.KeepAnchor)
-        cursor.insertHtml(html)
-        
-        sb = self.chat_history.verticalScrollBar()
-        sb.setValue(sb.maximum())
+        self.stream_renderer.append(chunk)
 
-    def on_llm_finished(self, response, is_auto):
-        self.btn_send.setEnabled(True)
-        
-        # If auto-analysis, maybe add to result list based on keyword?
-        # Simulation: if "买入" or "推荐" in response, add to AI Results.
-        if is_auto:
-            # Simple heuristic for demo
-            score = "High" if "买" in response or "高" in response else "Medium"
-            
-            # Find which stock we were analyzing
-            # (In a real app, we'd track the current analyzing stock clearer)
-            # For now, popping from queue
-            if self.ai_analysis_queue:
-                stock = self.ai_analysis_queue.pop(0)
-                self.add_to_llm_results(stock["code"], stock["name"], score)
-                
-                # Check if we should continue queue
-                if self.ai_analysis_queue:
-                    QTimer.singleShot(1000, self.process_next_auto_analysis)
-                else:
-                    self.chat_history.append("<b>[系统]</b> 自动复选完成！")
-                    self.btn_auto_analyze.setEnabled(True)
-                    return
+    def on_llm_stats(self, stats):
+        """Show time-to-first-token and generation speed under the reply"""
+        self.stream_renderer.finish()
+        self.chat_history.append(f"<span style='color: #999; font-size: 11px;'>{format_stream_stats(stats)}</span>")
 
-        self.btn_auto_analyze.setEnabled(True)
+    def on_llm_finished(self, response):
+        self.stream_renderer.finish()
+        self.btn_send.setEnabled(True)
 
     # --- Auto Analysis Logic ---
     def on_start_auto_analysis(self):
-        """Iterate through primary list and ask LLM"""
-        count = self.primary_table.rowCount()
-        if count == 0:
+        """Ask the LLM about every stock in the primary list, several at a time"""
+        if self.primary_model.result_count() == 0:
             QMessageBox.warning(self, "提示", "请先进行初选！")
             return
-            
-        self.ai_analysis_queue = []
-        for row in range(count):
-            code = self.primary_table.item(row, 0).text()
-            name = self.primary_table.item(row, 1).text()
-            self.ai_analysis_queue.append({"code": code, "name": name})
-            
-        self.chat_history.append(f"<b>[系统]</b> 开始对 {len(self.ai_analysis_queue)} 只股票进行自动复选...")
-        self.process_next_auto_analysis()
+        if self.analysis_pipeline is not None and self.analysis_pipeline.is_running():
+            return
 
-    def process_next_auto_analysis(self):
-        if not self.ai_analysis_queue: return
-        
-        stock = self.ai_analysis_queue[0] # Peek
-        prompt = f"请简要评估股票 {stock['name']} ({stock['code']}) 的是否符合买入标准？"
-        self.process_chat_request(prompt, is_auto=True)
+        model_name = self.model_selector.currentText()
+        prompt_name = self.prompt_selector.currentText()
+        if not model_name:
+            QMessageBox.warning(self, "提示", "请先选择一个模型。")
+            return
+
+        # Every result row, including pages the view has not fetched yet, with its numbers
+        stocks = self.primary_model.stocks_in_order(CONTEXT_FIELD_NAMES)
+        # "auto" routes each request on its own; size the pool for the provider it picks now
+        concurrency = provider_concurrency(self.llm_service.get_provider_config(
+            self.llm_service.resolve_model(model_name)))
+
+        self.llm_table.setRowCount(0)
+        self.analysis_pipeline = AnalysisPipeline(self.llm_service, model_name, prompt_name,
+                                                  build_batch_prompt, parse_batch_response,
+                                                  batch_size=BATCH_SIZE, concurrency=concurrency,
+                                                  parent=self)
+        self.analysis_pipeline.item_finished.connect(self.on_analysis_result)
+        self.analysis_pipeline.item_failed.connect(self.on_analysis_failed)
+        self.analysis_pipeline.progress.connect(self.on_analysis_progress)
+        self.analysis_pipeline.finished.connect(self.on_analysis_finished)
+
+        self.chat_history.append(f"<b>[系统]</b> 开始对 {len(stocks)} 只股票进行自动复选"
+                                 f"（{model_name}，每批 {BATCH_SIZE} 只，并发 {concurrency}）...")
+        self.btn_auto_analyze.setEnabled(False)
+        self.btn_cancel_analysis.setEnabled(True)
+        self.btn_retry_analysis.setEnabled(False)
+        self.analysis_pipeline.start(stocks)
+
+    def on_cancel_auto_analysis(self):
+        if self.analysis_pipeline is not None:
+            self.analysis_pipeline.cancel()
+
+    def on_retry_auto_analysis(self):
+        if self.analysis_pipeline is None or self.analysis_pipeline.is_running():
+            return
+        self.btn_auto_analyze.setEnabled(False)
+        self.btn_cancel_analysis.setEnabled(True)
+        self.btn_retry_analysis.setEnabled(False)
+        count = self.analysis_pipeline.retry_failed()
+        self.chat_history.append(f"<b>[系统]</b> 重新分析 {count} 只失败的股票...")
+
+    def on_analysis_progress(self, done, failed, total):
+        self.analysis_progress.setMaximum(max(1, total))
+        self.analysis_progress.setValue(done + failed)
+        self.analysis_progress.setToolTip(f"完成 {done}，失败 {failed}，共 {total}")
+
+    def on_analysis_result(self, stock, result):
+        self.add_to_llm_results(stock["code"], stock["name"], str(result["score"]), result["reason"])
+
+    def on_analysis_failed(self, stock, error):
+        self.add_to_llm_results(stock["code"], stock["name"], "失败", error, failed=True)
+
+    def on_analysis_finished(self):
+        pipeline = self.analysis_pipeline
+        failed = len(pipeline.failed)
+        state = "已完成" if pipeline.done + failed >= pipeline.total() else "已停止"
+        self.chat_history.append(f"<b>[系统]</b> 自动复选{state}：成功 {pipeline.done}，失败 {failed}，"
+                                 f"共 {pipeline.total()} 只，{pipeline.requests} 次请求。")
+        self.btn_auto_analyze.setEnabled(True)
+        self.btn_cancel_analysis.setEnabled(False)
+        self.btn_retry_analysis.setEnabled(failed > 0)
 
-    def add_to_llm_results(self, code, name, score):
-        row = self.llm_table.rowCount()
-        self.llm_table.insertRow(row)
-        self.llm_table.setItem(row, 0, QTableWidgetItem(code))
-        self.llm_table.setItem(row, 1, QTableWidgetItem(name))
-        self.llm_table.setItem(row, 2, QTableWidgetItem(score))
+    def add_to_llm_results(self, code, name, score, detail="", failed=False):
+        """Add or update the result row of a stock; the reason or error is its tooltip"""
+        row = next((r for r in range(self.llm_table.rowCount())
+                    if self.llm_table.item(r, 0).text() == code), None)
+        if row is None:
+            row = self.llm_table.rowCount()
+            self.llm_table.insertRow(row)
+        items = [QTableWidgetItem(code), QTableWidgetItem(name), QTableWidgetItem(score)]
+        for column, item in enumerate(items):
+            item.setToolTip(detail[:2000])
+            if failed:
+                item.setForeground(QColor("red"))
+            self.llm_table.setItem(row, column, item)
 
     # --- Favorites Logic ---
     def on_add_to_favorites(self):
@@ -697,6 +732,8 @@ class SmartSelectionTab(QWidget):
         self.btn_start_filter.setEnabled(False)
         self.btn_send.setEnabled(False)
         self.btn_auto_analyze.setEnabled(False)
+        self.btn_cancel_analysis.setEnabled(False)
+        self.btn_retry_analysis.setEnabled(False)
         self.btn_add_fav.setEnabled(False)
         self.btn_remove_fav.setEnabled(False)
         
@@ -1,37 +1,82 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QSplitter, 
-                             QTableWidget, QTableWidgetItem, QTextEdit, QPushButton, QLabel, 
+                             QTableWidget, QTableWidgetItem, QTableView, QTextEdit, QPushButton, QLabel, 
                              QListWidget, QGroupBox, QHeaderView, QComboBox, QStyle, QMessageBox,
                              QLineEdit, QCompleter, QListWidgetItem)
 from PyQt6.QtCore import Qt, pyqtSignal, QTimer
 from PyQt6.QtGui import QColor
-import markdown
-from pypinyin import lazy_pinyin
 try:
-    from services.llm_service import LLMService
-    from services.stock_data_service import StockDataService
-    from ui.utils.worker import LLMWorker, KLineWorker
+    from core.strategies import (STRATEGY_TYPES, ACTION_NAMES, BUY, MACrossStrategy, GridStrategy,
+                                 MACDDivergenceStrategy)
+    from core.strategy_engine import RUNNING, TRIGGERED
+    from services.market_data_hub import MarketDataHub
+    from services.stock_search import StockSearchIndex
+    from services.llm_telemetry import AUTO_MODEL
+    from ui.utils.worker import LLMWorker, format_stream_stats, KLineWorker, StockSearchWorker, SearchIndexWorker
+    from ui.utils.worker import MarketContextWorker, BacktestWorker
+    from ui.utils.markdown_stream import StreamingMarkdownRenderer
     from ui.widgets.kline_chart import KLineChartWidget
+    from ui.models.watchlist_model import WatchlistModel
 except ImportError:
     # Fallback for relative imports if run as package
-    from ...services.llm_service import LLMService
-    from ...services.stock_data_service import StockDataService
-    from ..utils.worker import LLMWorker, KLineWorker
+    from ...core.strategies import (STRATEGY_TYPES, ACTION_NAMES, BUY, MACrossStrategy, GridStrategy,
+                                    MACDDivergenceStrategy)
+    from ...core.strategy_engine import RUNNING, TRIGGERED
+    from ...services.market_data_hub import MarketDataHub
+    from ...services.stock_search import StockSearchIndex
+    from ...services.llm_telemetry import AUTO_MODEL
+    from ..utils.worker import LLMWorker, format_stream_stats, KLineWorker, StockSearchWorker, SearchIndexWorker
+    from ..utils.worker import MarketContextWorker, BacktestWorker
+    from ..utils.markdown_stream import StreamingMarkdownRenderer
     from ..widgets.kline_chart import KLineChartWidget
+    from ..models.watchlist_model import WatchlistModel
+
+# Monitor table columns and status texts
+MONITOR_HEADERS = ["代码", "名称", "策略", "状态"]
+STATUS_NEW = ("待启动", "#FFA000")
+STATUS_STYLES = {
+    RUNNING: ("运行中", "#4CAF50"),
+    TRIGGERED: ("已触发", "#FFA000"),
+}
+STATUS_STOPPED = ("已停止", "#FF5252")
+SIGNALS_SHOWN = 10  # Latest signals listed in the strategy preview
+BACKTEST_DAYS = 250  # Daily bars an accepted strategy is backtested on
 
 class TradingMonitorTab(QWidget):
     # Signals for favorite stock management
     favoriteAdded = pyqtSignal(str, str)  # code, name
     favoriteRemoved = pyqtSignal(str)  # code
+    # Strategy signals arrive on the price poller thread; this hands them to the UI thread
+    strategySignal = pyqtSignal(object)  # core.strategy_engine.Signal
     
-    def __init__(self):
+    def __init__(self, hub=None):
         super().__init__()
         self.current_stock_code = None
         self.current_stock_name = None
-        self.llm_service = LLMService()
-        self.data_service = StockDataService()
+        # Services are shared with the other tabs through the hub
+        self.hub = hub if hub is not None else MarketDataHub()
+        self.llm_service = self.hub.llm_service
+        self.data_service = self.hub.data_service
+        self.subscribed_codes = []  # Watchlist codes this tab holds in the hub
         self.all_stocks = []  # Store all stocks for search
-        self.mock_strategies = {}  # Store strategy details for monitored stocks
+        self.search_index = StockSearchIndex([])  # N-gram index over all_stocks
+        self.strategy_engine = self.hub.strategy_engine
+        self.strategy_signals = {}  # Recent signal lines per strategy id
+        self.strategy_subscriptions = set()  # Strategy ids holding a price subscription
+        self.history_workers = []  # Daily bars being loaded to seed strategies
+        self.strategy_backtests = {}  # Backtest summary line per strategy id
+        self.backtest_workers = []  # Keep running backtests alive
         self.kline_worker = None  # Store K-line worker reference
+        self.search_index_worker = None  # Loads the search index if it is not ready yet
+        self.market_context = None  # MarketContext of the selected stock, once built
+        self.context_workers = []  # Keep running context builds alive
+        
+        # Debounced background search: only the latest request is delivered
+        self.search_request_id = 0
+        self.search_workers = []  # Keep running search threads alive
+        self.search_debounce_timer = QTimer()
+        self.search_debounce_timer.setSingleShot(True)
+        self.search_debounce_timer.setInterval(150)  # ms of typing pause before searching
+        self.search_debounce_timer.timeout.connect(self.run_search)
         
         # Timer for refreshing realtime stock data
         self.refresh_timer = QTimer()
@@ -42,6 +87,9 @@ class TradingMonitorTab(QWidget):
         self.load_initial_config()
         self.load_all_stocks()
 
+        self.strategySignal.connect(self.on_strategy_signal)
+        self.strategy_engine.add_listener(self.strategySignal.emit)
+
     def load_initial_config(self):
         """Load initial models and prompts"""
         if hasattr(self, 'llm_service') and self.llm_service:
@@ -72,6 +120,8 @@ class TradingMonitorTab(QWidget):
         chart_group = QGroupBox("K线预览")
         chart_layout = QVBoxLayout(chart_group)
         self.kline_chart = KLineChartWidget()
+        self.kline_chart.expand_requested.connect(self.open_interactive_chart)
+        self.kline_dialog = None
         chart_layout.addWidget(self.kline_chart)
         
         # Watchlist Group (Bottom)
@@ -108,9 +158,10 @@ class TradingMonitorTab(QWidget):
         self.search_results_list.itemDoubleClicked.connect(self.on_search_item_double_clicked)
         watchlist_layout.addWidget(self.search_results_list)
         
-        # Watchlist Table
-        self.watchlist_table = QTableWidget(0, 4)
-        self.watchlist_table.setHorizontalHeaderLabels(["代码", "名称", "现价", "涨跌幅"])
+        # Watchlist Table (model/view: refreshes only touch changed cells)
+        self.watchlist_model = WatchlistModel(self)
+        self.watchlist_table = QTableView()
+        self.watchlist_table.setModel(self.watchlist_model)
         
         # Set column widths: code, name get more space, price and change get fixed width
         header = self.watchlist_table.horizontalHeader()
@@ -125,12 +176,14 @@ class TradingMonitorTab(QWidget):
         self.watchlist_table.setColumnWidth(3, 60)   # Change% column
         
         self.watchlist_table.verticalHeader().setVisible(False)
+        # Fixed row height avoids measuring every row of large watchlists
+        self.watchlist_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
         self.watchlist_table.setAlternatingRowColors(True)
         # Fix: Select entire row, disable editing
-        self.watchlist_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.watchlist_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        self.watchlist_table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
-        self.watchlist_table.itemClicked.connect(self.on_stock_selected)
+        self.watchlist_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.watchlist_table.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
+        self.watchlist_table.setSelectionMode(QTableView.SelectionMode.SingleSelection)
+        self.watchlist_table.clicked.connect(self.on_stock_selected)
         watchlist_layout.addWidget(self.watchlist_table)
         
         # Splitter for Left Area (Chart on top, Watchlist on bottom)
@@ -170,6 +223,7 @@ class TradingMonitorTab(QWidget):
         self.chat_history = QTextEdit()
         self.chat_history.setReadOnly(True)
         self.chat_history.setPlaceholderText("对话历史将显示在这里...")
+        self.stream_renderer = StreamingMarkdownRenderer(self.chat_history, self)
         
         self.chat_input = QTextEdit()
         self.chat_input.setMaximumHeight(100)
@@ -194,6 +248,13 @@ class TradingMonitorTab(QWidget):
         self.btn_reject.setStyleSheet("background-color: #f44336; color: white; font-weight: bold;")
         self.btn_reject.setToolTip("拒绝当前策略建议")
 
+        # Strategy created when a suggestion is accepted
+        self.strategy_type_selector = QComboBox()
+        for kind, cls in STRATEGY_TYPES.items():
+            self.strategy_type_selector.addItem(cls.label, kind)
+        self.strategy_type_selector.setFixedHeight(35)
+        self.strategy_type_selector.setToolTip("采纳后加入监控的策略类型")
+
         self.btn_clear = QPushButton("清空")
         self.btn_clear.setFixedHeight(35)
         self.btn_clear.setCursor(Qt.CursorShape.PointingHandCursor)
@@ -205,6 +266,7 @@ class TradingMonitorTab(QWidget):
         self.btn_clear.clicked.connect(self.on_clear_chat)
 
         action_layout.addWidget(self.btn_send, 3)
+        action_layout.addWidget(self.strategy_type_selector, 1)
         action_layout.addWidget(self.btn_accept, 1)
         action_layout.addWidget(self.btn_reject, 1)
         action_layout.addWidget(self.btn_clear, 1)
@@ -262,8 +324,8 @@ class TradingMonitorTab(QWidget):
         list_group.setMinimumWidth(50)
         list_layout = QVBoxLayout(list_group)
         
-        self.monitor_table = QTableWidget(0, 3)
-        self.monitor_table.setHorizontalHeaderLabels(["代码", "名称", "状态"])
+        self.monitor_table = QTableWidget(0, len(MONITOR_HEADERS))
+        self.monitor_table.setHorizontalHeaderLabels(MONITOR_HEADERS)
         self.monitor_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.monitor_table.verticalHeader().setVisible(False)
         self.monitor_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
@@ -307,6 +369,8 @@ class TradingMonitorTab(QWidget):
         current_text = self.model_selector.currentText()
         self.model_selector.clear()
         self.model_selector.addItems(model_names)
+        if model_names:
+            self.model_selector.addItem(AUTO_MODEL)  # Fastest healthy provider per request
         
         # Restore selection if possible
         index = self.model_selector.findText(current_text)
@@ -329,6 +393,8 @@ class TradingMonitorTab(QWidget):
         current_text = self.model_selector.currentText()
         self.model_selector.clear()
         self.model_selector.addItems(model_names)
+        if model_names:
+            self.model_selector.addItem(AUTO_MODEL)  # Fastest healthy provider per request
         
         # Restore selection if possible
         index = self.model_selector.findText(current_text)
@@ -337,74 +403,99 @@ class TradingMonitorTab(QWidget):
     
     def load_all_stocks(self):
         """Load all stocks for search functionality"""
-        try:
-            self.all_stocks = self.data_service.get_all_stocks()
-            # Pre-compute pinyin initials for each stock
-            for stock in self.all_stocks:
-                pinyin_list = lazy_pinyin(stock['name'])
-                stock['pinyin_full'] = ''.join(pinyin_list)  # Full pinyin: zhongguohedian
-                stock['pinyin_initials'] = ''.join([p[0] for p in pinyin_list])  # Initials: zghd
-        except Exception as e:
-            print(f"Failed to load stocks: {e}")
-            self.all_stocks = []
+        # Pinyin is pre-computed once per universe by the shared hub
+        search_index = self.hub.peek_search_index()
+        if search_index is not None:
+            self.on_search_index_loaded(search_index)
+            return
+        
+        # Still being built (startup loader) or never built: wait off the UI thread
+        self.search_input.setPlaceholderText("正在加载股票列表...")
+        self.search_index_worker = SearchIndexWorker(self.hub)
+        self.search_index_worker.finished.connect(self.on_search_index_loaded)
+        self.search_index_worker.start()
+    
+    def on_search_index_loaded(self, search_index):
+        """Enable search once the stock universe is indexed"""
+        self.search_index = search_index
+        self.all_stocks = search_index.stocks
+        self.search_input.setPlaceholderText("搜索: 代码/名称/拼音首字母...")
+        if not self.all_stocks:
             # Add sample data for demonstration
             self.add_monitor_sample_data()
+        elif self.search_input.text().strip():
+            # Answer whatever was typed while loading
+            self.run_search()
     
     def on_search_text_changed(self, text):
-        """Handle search text change with fuzzy matching"""
-        text = text.strip().lower()
-        
-        if not text:
+        """Debounce search input; a newer keystroke cancels any stale query.
+        Matching is typo-tolerant and ranked, see StockSearchIndex."""
+        # Invalidate whatever search is pending or in flight
+        self.search_request_id += 1
+        for worker in self.search_workers:
+            worker.cancel()
+        
+        if not text.strip():
+            self.search_debounce_timer.stop()
             self.search_results_list.hide()
             return
         
-        # Find matching stocks
-        matches = []
-        for stock in self.all_stocks:
-            code = stock['code']
-            name = stock['name']
-            name_lower = name.lower()
-            
-            # Match by code (exact or prefix)
-            if code.startswith(text):
-                matches.append((stock, 1))  # Priority 1: code match
-                continue
-            
-            # Match by name (contains)
-            if text in name_lower:
-                matches.append((stock, 2))  # Priority 2: name contains
-                continue
-            
-            # Match by pinyin initials (e.g., "zghd" for "中国核电")
-            if 'pinyin_initials' in stock and text in stock['pinyin_initials']:
-                matches.append((stock, 3))  # Priority 3: pinyin initials
-                continue
-            
-            # Match by full pinyin (e.g., "zhongguo" for "中国核电")
-            if 'pinyin_full' in stock and text in stock['pinyin_full']:
-                matches.append((stock, 4))  # Priority 4: full pinyin
+        # Restart the debounce window
+        self.search_debounce_timer.start()
+    
+    def run_search(self):
+        """Run the current query on a background worker"""
+        query = self.search_input.text().strip().lower()
+        if not query:
+            return
         
-        # Sort by priority and limit results
-        matches.sort(key=lambda x: x[1])
-        matches = matches[:20]  # Show top 20 results
+        # Drop references to finished workers, keep running ones alive
+        self.search_workers = [w for w in self.search_workers if w.isRunning()]
+        
+        worker = StockSearchWorker(self.search_index, query, self.search_request_id)
+        worker.finished.connect(self.on_search_results)
+        self.search_workers.append(worker)
+        worker.start()
+    
+    def on_search_results(self, request_id, matches):
+        """Display search results, ignoring any superseded request"""
+        if request_id != self.search_request_id:
+            return
         
-        # Display results
-        self.search_results_list.clear()
         if matches:
-            for stock, _ in matches:
-                item = QListWidgetItem(f"{stock['code']} {stock['name']}")
-                item.setData(Qt.ItemDataRole.UserRole, stock)
-                self.search_results_list.addItem(item)
+            self._show_search_results(matches)
             self.search_results_list.show()
         else:
             self.search_results_list.hide()
     
+    def _show_search_results(self, matches):
+        """Fill the results list, reusing the items it already shows"""
+        results_list = self.search_results_list
+        for row, stock in enumerate(matches):
+            text = f"{stock['code']} {stock['name']}"
+            item = results_list.item(row)
+            if item is None:
+                item = QListWidgetItem()
+                results_list.addItem(item)
+            if item.text() != text:
+                item.setText(text)
+            item.setData(Qt.ItemDataRole.UserRole, stock)
+        
+        # Remove surplus rows from the previous result set
+        while results_list.count() > len(matches):
+            results_list.takeItem(results_list.count() - 1)
+        
+        # Old selection no longer refers to the same stock
+        results_list.setCurrentRow(-1)
+    
     def on_search_item_selected(self):
         """Handle search result item selection (Enter key or single click)"""
         current_item = self.search_results_list.currentItem()
         if current_item:
             stock = current_item.data(Qt.ItemDataRole.UserRole)
             self.search_input.setText(f"{stock['code']} {stock['name']}")
+            # The selection itself is not a new query
+            self.search_debounce_timer.stop()
             self.search_results_list.hide()
     
     def on_search_item_double_clicked(self, item):
@@ -456,13 +547,13 @@ class TradingMonitorTab(QWidget):
     
     def on_remove_from_watchlist(self):
         """Remove selected stock from watchlist"""
-        row = self.watchlist_table.currentRow()
-        if row < 0:
+        index = self.watchlist_table.currentIndex()
+        if not index.isValid():
             QMessageBox.warning(self, "提示", "请先选择要移除的股票")
             return
         
-        code = self.watchlist_table.item(row, 0).text()
-        name = self.watchlist_table.item(row, 1).text()
+        code = self.watchlist_model.code_at(index.row())
+        name = self.watchlist_model.name_at(index.row())
         
         reply = QMessageBox.question(self, "确认", 
                                     f"确定要从自选股中移除 {name} ({code}) 吗？",
@@ -472,153 +563,92 @@ class TradingMonitorTab(QWidget):
             self.favoriteRemoved.emit(code)
     
     def update_favorites(self, favorites):
-        """Update watchlist table with favorites from config"""
-        self.watchlist_table.setRowCount(0)
-        self.watchlist_table.setRowCount(len(favorites))
-        
-        for row, fav in enumerate(favorites):
-            code = fav.get('code', '')
-            name = fav.get('name', '')
-            
-            code_item = QTableWidgetItem(code)
-            code_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.watchlist_table.setItem(row, 0, code_item)
-            
-            name_item = QTableWidgetItem(name)
-            name_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.watchlist_table.setItem(row, 1, name_item)
-            
-            # Try to get cached price first (instant display)
-            cached_price = self.data_service.get_cached_price(code)
-            if cached_price:
-                self._update_watchlist_row(row, code, cached_price)
-            else:
-                # Initialize with placeholder values
-                price_item = QTableWidgetItem("--")
-                price_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                self.watchlist_table.setItem(row, 2, price_item)
-                
-                change_item = QTableWidgetItem("--")
-                change_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                self.watchlist_table.setItem(row, 3, change_item)
+        """Update watchlist with favorites from config"""
+        self.watchlist_model.set_symbols(favorites)
         
         # Get stock codes
         stock_codes = [fav.get('code', '') for fav in favorites]
         
-        # Update watched stocks on server (for fallback)
-        self.data_service.update_watched_stocks(stock_codes)
+        # Hold references only for codes that were added, release removed ones;
+        # the hub polls prices while any tab subscribes to a code
+        current, previous = set(stock_codes), set(self.subscribed_codes)
+        added = [code for code in stock_codes if code not in previous]
+        removed = [code for code in self.subscribed_codes if code not in current]
+        self.subscribed_codes = stock_codes
+        self.hub.subscribe(added)
+        self.hub.unsubscribe(removed)
         
-        # Start auto-update with akshare (10 seconds interval)
         if stock_codes:
-            # Stop previous auto-update if running
-            self.data_service.stop_auto_update()
-            # Start new auto-update
-            self.data_service.start_auto_update(stock_codes, interval=10)
-            
             # Also use local timer to update UI
             self.refresh_timer.start(self.refresh_interval)
             # Fetch immediately (won't block, uses cache if available)
             self.refresh_realtime_data()
         else:
-            self.data_service.stop_auto_update()
             self.refresh_timer.stop()
     
     def refresh_realtime_data(self):
         """Refresh realtime stock data for watchlist using cached data"""
-        # Get stock codes from watchlist
-        stock_codes = []
-        for row in range(self.watchlist_table.rowCount()):
-            code_item = self.watchlist_table.item(row, 0)
-            if code_item:
-                stock_codes.append(code_item.text())
-        
+        stock_codes = self.watchlist_model.codes
         if not stock_codes:
             return
         
-        # Get cached prices (instant return)
-        for row in range(self.watchlist_table.rowCount()):
-            code_item = self.watchlist_table.item(row, 0)
-            if not code_item:
-                continue
-            
-            code = code_item.text()
-            # Get cached price (returns immediately)
-            price_data = self.data_service.get_cached_price(code)
-            
-            if price_data:
-                self._update_watchlist_row(row, code, price_data)
-    
-    def _update_watchlist_row(self, row: int, code: str, price_data: dict):
-        """Update a single watchlist row with price data"""
-        try:
-            # Update price
-            price = price_data.get('current', 0)
-            price_item = QTableWidgetItem(f"{price:.2f}")
-            price_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            
-            # Update change percent
-            change_percent = price_data.get('percent', 0)
-            change_item = QTableWidgetItem(f"{change_percent:+.2f}%")
-            change_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            
-            # Color based on change
-            if change_percent > 0:
-                price_item.setForeground(QColor("#FF0000"))  # Red for up
-                change_item.setForeground(QColor("#FF0000"))
-            elif change_percent < 0:
-                price_item.setForeground(QColor("#00FF00"))  # Green for down
-                change_item.setForeground(QColor("#00FF00"))
-            else:
-                price_item.setForeground(QColor("#888888"))  # Gray for no change
-                change_item.setForeground(QColor("#888888"))
-            
-            # Add cache indicator if data is from cache
-            if price_data.get('from_cache', False):
-                price_item.setToolTip("缓存数据")
-            
-            self.watchlist_table.setItem(row, 2, price_item)
-            self.watchlist_table.setItem(row, 3, change_item)
-        except Exception as e:
-            print(f"Error updating row {row} for {code}: {e}")
+        # Get cached prices (instant return); the model repaints changed cells only
+        quotes = self.data_service.get_cached_prices(stock_codes)
+        self.watchlist_model.update_quotes(quotes)
     
     def add_monitor_sample_data(self):
-        """Add sample data to monitor list"""
-        monitor_data = [
-            ("000001", "平安银行", "运行中"),
-            ("600519", "贵州茅台", "已停止"),
-            ("300750", "宁德时代", "运行中"),
+        """Add sample strategies to the monitor list"""
+        samples = [
+            MACrossStrategy("000001", "平安银行"),
+            GridStrategy("600519", "贵州茅台"),
+            MACDDivergenceStrategy("300750", "宁德时代"),
         ]
-        self.monitor_table.setRowCount(len(monitor_data))
-        for row, item_data in enumerate(monitor_data):
-            for col, value in enumerate(item_data):
-                item = QTableWidgetItem(value)
-                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                if col == 2: # Status
-                    if value == "运行中":
-                        item.setForeground(QColor("#4CAF50")) # Green
-                    else:
-                        item.setForeground(QColor("#FF5252")) # Red
-                self.monitor_table.setItem(row, col, item)
-                
-        # Mock strategy details
-        self.mock_strategies = {
-            "000001": "策略名称: 均线突破\n监控周期: 15分钟\n买入条件: MA5上穿MA20\n卖出条件: MA5下穿MA20\n止损: -2%\n止盈: +5%",
-            "600519": "策略名称: 网格交易\n监控周期: 1小时\n网格大小: 1%\n单笔金额: 50000\n当前持仓: 200股",
-            "300750": "策略名称: MACD背离\n监控周期: 30分钟\n底背离: 开启\n顶背离: 开启\n风险等级: 中",
-        }
-
-    def on_stock_selected(self, item):
+        for strategy in samples:
+            self.add_monitor_row(self.strategy_engine.add(strategy))
+
+    def add_monitor_row(self, strategy_id: int) -> int:
+        """Append a row for a strategy of the engine; returns the row"""
+        strategy = self.strategy_engine.strategy(strategy_id)
+        row = self.monitor_table.rowCount()
+        self.monitor_table.insertRow(row)
+        for col, value in enumerate([strategy.code, strategy.name, strategy.label]):
+            item = QTableWidgetItem(value)
+            item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+            if col == 0:
+                item.setData(Qt.ItemDataRole.UserRole, strategy_id)
+            self.monitor_table.setItem(row, col, item)
+        status_item = QTableWidgetItem()
+        status_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.monitor_table.setItem(row, 3, status_item)
+        self.set_monitor_status(row, STATUS_NEW)
+        return row
+
+    def set_monitor_status(self, row: int, style):
+        text, color = style
+        item = self.monitor_table.item(row, 3)
+        item.setText(text)
+        item.setForeground(QColor(color))
+
+    def strategy_id_at(self, row: int):
+        item = self.monitor_table.item(row, 0)
+        return item.data(Qt.ItemDataRole.UserRole) if item is not None else None
+
+    def monitor_row_of(self, strategy_id: int) -> int:
+        for row in range(self.monitor_table.rowCount()):
+            if self.strategy_id_at(row) == strategy_id:
+                return row
+        return -1
+
+    def on_stock_selected(self, index):
         """Handle stock selection from watchlist"""
-        row = item.row()
-        code_item = self.watchlist_table.item(row, 0)
-        name_item = self.watchlist_table.item(row, 1)
-        
-        if code_item and name_item:
-            code = code_item.text()
-            name = name_item.text()
+        if index.isValid():
+            code = self.watchlist_model.code_at(index.row())
+            name = self.watchlist_model.name_at(index.row())
             
             self.current_stock_code = code
             self.current_stock_name = name
+            if self.market_context is not None and self.market_context.code != code:
+                self.market_context = None
             
             self.current_stock_label.setText(f"当前分析: {name} ({code})")
             # Update style to indicate active selection
@@ -635,8 +665,11 @@ class TradingMonitorTab(QWidget):
             # Fetch and display K-line data
             self.load_kline_chart(code, name)
             
-            # Simulate LLM providing a strategy suggestion
-            self.chat_history.append(f"<b>[系统]</b> 已选择 {name} ({code})。")
+            # Each stock has its own LLM conversation; say when one is resumed
+            memory = self.llm_service.contexts.peek(code)
+            turns = len(memory) // 2 if memory is not None else 0
+            resumed = f"继续此前的 {turns} 轮对话。" if turns else ""
+            self.chat_history.append(f"<b>[系统]</b> 已选择 {name} ({code})。{resumed}")
     
     def load_kline_chart(self, stock_code: str, stock_name: str):
         """Load K-line chart for selected stock asynchronously"""
@@ -658,7 +691,35 @@ class TradingMonitorTab(QWidget):
             self.kline_chart.update_chart(stock_code, stock_name, kline_data)
         except Exception as e:
             print(f"Error updating chart: {e}")
+        self.build_market_context(stock_code, stock_name, kline_data)
+
+    def build_market_context(self, stock_code: str, stock_name: str, kline_data: list):
+        """Build the LLM context from the chart's bars in the background"""
+        self.context_workers = [w for w in self.context_workers if w.isRunning()]
+        worker = MarketContextWorker(self.hub.market_context, stock_code, stock_name, list(kline_data))
+        worker.finished.connect(self.on_market_context_built)
+        self.context_workers.append(worker)
+        worker.start()
+
+    def on_market_context_built(self, stock_code: str, context):
+        if context is not None and stock_code == self.current_stock_code:
+            self.market_context = context
     
+    def open_interactive_chart(self):
+        """Open the pan/zoom chart with the full history of the charted stock"""
+        # pyqtgraph is only loaded once an interactive chart is requested
+        try:
+            from ui.widgets.kline_interactive import KLineChartDialog
+        except ImportError:
+            from ..widgets.kline_interactive import KLineChartDialog
+
+        chart = self.kline_chart
+        if self.kline_dialog is not None:
+            self.kline_dialog.close()
+        self.kline_dialog = KLineChartDialog(self.data_service, chart.stock_code, chart.stock_name,
+                                             chart.kline_data, self)
+        self.kline_dialog.show()
+
     def on_kline_error(self, stock_name: str, error_message: str):
         """Handle K-line loading error"""
         self.kline_chart.clear_chart()
@@ -690,17 +751,18 @@ class TradingMonitorTab(QWidget):
         self.chat_history.append(f"<b>[系统]</b> 正在思考 ({model_name})...")
         
         # Prepare for streaming
-        self.current_stream_response = ""
         self.chat_history.append("<b>[LLM助手]</b> ") # Start a new line for the assistant
-        
-        # Capture the start position for streaming updates
-        cursor = self.chat_history.textCursor()
-        cursor.movePosition(cursor.MoveOperation.End)
-        self.response_start_position = cursor.position()
+        self.stream_renderer.start()
         
         try:
-            self.worker = LLMWorker(self.llm_service, full_input, model_name, prompt_name)
+            # Market numbers go with the request once built for the current stock
+            context = self.market_context
+            if context is not None and context.code != self.current_stock_code:
+                context = None
+            self.worker = LLMWorker(self.llm_service, full_input, model_name, prompt_name,
+                                    context_key=self.current_stock_code or None, context=context)
             self.worker.stream_updated.connect(self.on_llm_stream)
+            self.worker.stats_ready.connect(self.on_llm_stats)
             self.worker.finished.connect(self.on_llm_response)
             self.worker.start()
         except Exception as e:
@@ -710,34 +772,17 @@ class TradingMonitorTab(QWidget):
 
     def on_llm_stream(self, chunk):
         """Handle streaming chunk with incremental Markdown rendering"""
-        self.current_stream_response += chunk
-        
-        # Render current accumulated text to HTML
-        try:
-            # Enable table extension and other useful extensions for markdown rendering
-            html_response = markdown.markdown(
-                self.current_stream_response,
-                extensions=['tables', 'fenced_code', 'nl2br', 'sane_lists']
-            )
-        except Exception:
-            # Fallback to raw text if markdown fails
-            html_response = self.current_stream_response
-
-        # Update the text area
-        cursor = self.chat_history.textCursor()
-        cursor.setPosition(self.response_start_position)
-        cursor.movePosition(cursor.MoveOperation.End, cursor.MoveMode.KeepAnchor)
-        
-        # Replace the current content with the new rendered HTML
-        # insertHtml will replace the selected text
-        cursor.insertHtml(html_response)
-        
-        # Scroll to bottom
-        scrollbar = self.chat_history.verticalScrollBar()
-        scrollbar.setValue(scrollbar.maximum())
+        self.stream_renderer.append(chunk)
+
+    def on_llm_stats(self, stats):
+        """Show time-to-first-token and generation speed under the reply"""
+        self.stream_renderer.finish()
+        self.chat_history.append(f"<span style='color: #999; font-size: 11px;'>{format_stream_stats(stats)}</span>")
 
     def on_llm_response(self, response):
         """Handle response from LLM Worker"""
+        self.stream_renderer.finish()
+
         # Check for error prefix from LLMService or Worker
         if response.startswith("Error:") or response.startswith("System Error:"):
              cursor = self.chat_history.textCursor()
@@ -758,41 +803,59 @@ class TradingMonitorTab(QWidget):
         code = self.current_stock_code
         name = self.current_stock_name
         
-        # Check if already monitored
+        kind = self.strategy_type_selector.currentData()
+        strategy_cls = STRATEGY_TYPES[kind]
+
+        # Check if already monitored with this strategy
         for row in range(self.monitor_table.rowCount()):
-            existing_code = self.monitor_table.item(row, 0).text()
-            if existing_code == code:
-                QMessageBox.information(self, "提示", f"{name} ({code}) 已经在监控列表中。")
+            existing = self.strategy_engine.strategy(self.strategy_id_at(row))
+            if existing is not None and existing.code == code and existing.kind == kind:
+                QMessageBox.information(self, "提示", f"{name} ({code}) 已经在监控列表中 ({strategy_cls.label})。")
                 return
 
-        # Add to monitor list
-        row = self.monitor_table.rowCount()
-        self.monitor_table.insertRow(row)
-        
-        self.monitor_table.setItem(row, 0, QTableWidgetItem(code))
-        self.monitor_table.setItem(row, 1, QTableWidgetItem(name))
-        
-        status_item = QTableWidgetItem("待启动")
-        status_item.setForeground(QColor("#FFA000")) # Orange
-        status_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.monitor_table.setItem(row, 2, status_item)
-        
-        # Generate and save mock strategy
-        strategy_text = (f"策略名称: LLM智能推荐策略\n"
-                         f"来源: {self.model_selector.currentText()}\n"
-                         f"创建时间: 刚刚\n"
-                         f"买入条件: 智能判定\n"
-                         f"卖出条件: 智能判定\n"
-                         f"风险偏好: {self.prompt_selector.currentText()}")
-        
-        self.mock_strategies[code] = strategy_text
+        # Add to monitor list (stopped until started)
+        strategy_id = self.strategy_engine.add(strategy_cls(code, name))
+        row = self.add_monitor_row(strategy_id)
         
-        self.chat_history.append(f"<span style='color: green;'><b>[系统]</b> 已采纳 {name} 的策略建议，并加入监控列表。</span>")
+        self.chat_history.append(f"<span style='color: green;'><b>[系统]</b> 已采纳 {name} 的策略建议"
+                                 f"（{strategy_cls.label}），并加入监控列表。</span>")
+        self.backtest_strategy(strategy_id)
         
         # Select the new item
         self.monitor_table.selectRow(row)
         self.on_monitor_selected(self.monitor_table.item(row, 0))
 
+    def backtest_strategy(self, strategy_id: int):
+        """Backtest a strategy on its stock's recent daily bars in the background"""
+        self.backtest_workers = [w for w in self.backtest_workers if w.isRunning()]
+        worker = BacktestWorker(self.data_service, strategy_id, self.strategy_engine.strategy(strategy_id),
+                                days=BACKTEST_DAYS)
+        worker.finished.connect(self.on_backtest_finished)
+        worker.error.connect(self.on_backtest_error)
+        self.backtest_workers.append(worker)
+        worker.start()
+
+    def on_backtest_finished(self, strategy_id: int, result):
+        strategy = self.strategy_engine.strategy(strategy_id)
+        if strategy is None:
+            return  # Deleted meanwhile
+        stats = result.stats(strategy.code)
+        summary = (f"近{len(result.dates)}日 收益 {stats['total_return'] * 100:+.2f}% · "
+                   f"最大回撤 {stats['max_drawdown'] * 100:.2f}% · 交易 {stats['trades']} 次 · "
+                   f"胜率 {stats['win_rate'] * 100:.0f}% · 持仓天数 {stats['exposure'] * 100:.0f}%")
+        self.strategy_backtests[strategy_id] = summary
+        self.chat_history.append(f"<span style='color: #2196F3;'><b>[回测]</b> {strategy.name} ({strategy.code}) "
+                                 f"{strategy.label}: {summary}</span>")
+        row = self.monitor_row_of(strategy_id)
+        if row >= 0 and self.monitor_table.currentRow() == row:
+            self.on_monitor_selected(self.monitor_table.item(row, 0))
+
+    def on_backtest_error(self, strategy_id: int, error_message: str):
+        strategy = self.strategy_engine.strategy(strategy_id)
+        if strategy is not None:
+            self.chat_history.append(f"<span style='color: #FFA000;'><b>[回测]</b> {strategy.name} "
+                                     f"({strategy.code}) 回测未完成: {error_message}</span>")
+
     def on_reject_strategy(self):
         """Reject current LLM strategy suggestion"""
         if not self.current_stock_code:
@@ -808,43 +871,89 @@ class TradingMonitorTab(QWidget):
 
     def on_monitor_selected(self, item):
         row = item.row()
-        code = self.monitor_table.item(row, 0).text()
-        name = self.monitor_table.item(row, 1).text()
-        status = self.monitor_table.item(row, 2).text()
+        strategy_id = self.strategy_id_at(row)
+        strategy = self.strategy_engine.strategy(strategy_id)
+        if strategy is None:
+            return
+        status = self.monitor_table.item(row, 3).text()
         
         # Update details
-        details = f"股票: {name} ({code})\n状态: {status}\n\n"
-        details += self.mock_strategies.get(code, "暂无详细策略信息")
+        details = f"股票: {strategy.name} ({strategy.code})\n状态: {status}\n\n"
+        details += strategy.describe()
+        backtest = self.strategy_backtests.get(strategy_id)
+        if backtest:
+            details += f"\n\n回测 (T+1, 涨跌停, 整手):\n{backtest}"
+        signals = self.strategy_signals.get(strategy_id)
+        if signals:
+            details += "\n\n最近信号:\n" + "\n".join(reversed(signals))
         self.strategy_details.setText(details)
         
         # Enable buttons based on status
         self.btn_delete.setEnabled(True)
-        if status == "运行中":
-            self.btn_start.setEnabled(False)
-            self.btn_stop.setEnabled(True)
-        else:
-            self.btn_start.setEnabled(True)
-            self.btn_stop.setEnabled(False)
+        running = self.strategy_engine.status(strategy_id) == RUNNING
+        self.btn_start.setEnabled(not running)
+        self.btn_stop.setEnabled(running)
             
     def on_start_strategy(self):
         row = self.monitor_table.currentRow()
-        if row >= 0:
-            self.monitor_table.item(row, 2).setText("运行中")
-            self.monitor_table.item(row, 2).setForeground(QColor("#4CAF50"))
-            self.on_monitor_selected(self.monitor_table.currentItem()) # Refresh UI
-            self.strategy_details.append("\n[系统] 策略已启动")
+        if row < 0:
+            return
+        strategy_id = self.strategy_id_at(row)
+        strategy = self.strategy_engine.strategy(strategy_id)
+        self.strategy_engine.start(strategy_id)
+        # Keep the stock's price polled while the strategy runs
+        if strategy_id not in self.strategy_subscriptions:
+            self.strategy_subscriptions.add(strategy_id)
+            self.hub.subscribe([strategy.code])
+        if strategy.history_days and not self.strategy_engine.has_history(strategy.code):
+            self.load_strategy_history(strategy)
+
+        self.set_monitor_status(row, STATUS_STYLES[RUNNING])
+        self.on_monitor_selected(self.monitor_table.item(row, 0)) # Refresh UI
+        self.strategy_details.append("\n[系统] 策略已启动")
+
+    def load_strategy_history(self, strategy):
+        """Load daily bars of a stock in the background to seed its strategies"""
+        self.history_workers = [w for w in self.history_workers if w.isRunning()]
+        worker = KLineWorker(self.data_service, strategy.code, strategy.name,
+                             days=max(120, strategy.history_days * 2))
+        worker.finished.connect(self.on_strategy_history_loaded)
+        worker.error.connect(self.on_strategy_history_error)
+        self.history_workers.append(worker)
+        worker.start()
+
+    def on_strategy_history_loaded(self, stock_code: str, stock_name: str, kline_data: list):
+        self.strategy_engine.seed(stock_code, kline_data)
+
+    def on_strategy_history_error(self, stock_name: str, error_message: str):
+        self.chat_history.append(f"<span style='color: #FFA000;'><b>[策略]</b> {stock_name} 的历史K线加载失败，"
+                                 f"依赖均线/MACD的策略暂不会产生信号: {error_message}</span>")
+
+    def release_strategy_subscription(self, strategy_id: int):
+        if strategy_id in self.strategy_subscriptions:
+            self.strategy_subscriptions.discard(strategy_id)
+            strategy = self.strategy_engine.strategy(strategy_id)
+            if strategy is not None:
+                self.hub.unsubscribe([strategy.code])
 
     def on_stop_strategy(self):
         row = self.monitor_table.currentRow()
         if row >= 0:
-            self.monitor_table.item(row, 2).setText("已停止")
-            self.monitor_table.item(row, 2).setForeground(QColor("#FF5252"))
-            self.on_monitor_selected(self.monitor_table.currentItem()) # Refresh UI
+            strategy_id = self.strategy_id_at(row)
+            self.strategy_engine.stop(strategy_id)
+            self.release_strategy_subscription(strategy_id)
+            self.set_monitor_status(row, STATUS_STOPPED)
+            self.on_monitor_selected(self.monitor_table.item(row, 0)) # Refresh UI
             self.strategy_details.append("\n[系统] 策略已停止")
 
     def on_delete_strategy(self):
         row = self.monitor_table.currentRow()
         if row >= 0:
+            strategy_id = self.strategy_id_at(row)
+            self.release_strategy_subscription(strategy_id)
+            self.strategy_engine.remove(strategy_id)
+            self.strategy_signals.pop(strategy_id, None)
+            self.strategy_backtests.pop(strategy_id, None)
             self.monitor_table.removeRow(row)
             self.strategy_details.clear()
             self.strategy_details.setPlaceholderText("策略已删除")
@@ -852,3 +961,25 @@ class TradingMonitorTab(QWidget):
             self.btn_stop.setEnabled(False)
             self.btn_delete.setEnabled(False)
 
+    def on_strategy_signal(self, signal):
+        """A running strategy fired: log it and refresh its row"""
+        row = self.monitor_row_of(signal.strategy_id)
+        if row < 0:
+            return  # Deleted meanwhile
+        strategy = self.strategy_engine.strategy(signal.strategy_id)
+        action = ACTION_NAMES[signal.action]
+        line = f"{signal.time[11:19]} {action} @ {signal.price:.2f}  {signal.reason}"
+        signals = self.strategy_signals.setdefault(signal.strategy_id, [])
+        signals.append(line)
+        del signals[:-SIGNALS_SHOWN]
+
+        color = "#FF0000" if signal.action == BUY else "#00AA00"
+        self.chat_history.append(f"<span style='color: {color};'><b>[策略信号]</b> {strategy.name} ({strategy.code}) "
+                                 f"{strategy.label}: {action} @ {signal.price:.2f} · {signal.reason} · "
+                                 f"延迟 {signal.latency * 1000:.2f}ms</span>")
+
+        if self.strategy_engine.status(signal.strategy_id) == TRIGGERED:
+            self.release_strategy_subscription(signal.strategy_id)
+            self.set_monitor_status(row, STATUS_STYLES[TRIGGERED])
+        if self.monitor_table.currentRow() == row:
+            self.on_monitor_selected(self.monitor_table.item(row, 0))
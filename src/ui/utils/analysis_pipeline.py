@@ -0,0 +1,220 @@
+"""
+Concurrent, batched LLM analysis of a list of stocks
+
+AnalysisPipeline packs the stocks into batches of `batch_size`, asks one
+request per batch and keeps up to `concurrency` AnalysisWorker threads
+busy with independent requests (no shared chat history). Each answer is
+parsed into per-stock results, which are reported as soon as they
+arrive. Stocks a batch did not answer validly, or whose whole request
+failed, are asked again one by one; single-stock requests are retried
+with a growing delay, and those that still fail can be retried as a
+batch with retry_failed(). Retries skip the response cache, which would
+otherwise replay the answer that was rejected. cancel() drops the queue
+and ignores every request still in flight.
+"""
+from typing import Callable, Dict, List, Sequence
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+try:
+    from ui.utils.worker import AnalysisWorker
+except ImportError:
+    # Fallback for relative imports if run as package
+    from .worker import AnalysisWorker
+
+# Concurrent requests per provider unless its config sets "max_concurrency"
+DEFAULT_PROVIDER_CONCURRENCY = 4
+MAX_RETRIES = 2
+RETRY_DELAY_MS = 2000  # Multiplied by the attempt number
+
+
+def provider_concurrency(provider_config) -> int:
+    """Concurrent request limit for a provider config; 1 if the provider is unknown."""
+    if not provider_config:
+        return 1
+    try:
+        return max(1, int(provider_config.get("max_concurrency", DEFAULT_PROVIDER_CONCURRENCY)))
+    except (TypeError, ValueError):
+        return DEFAULT_PROVIDER_CONCURRENCY
+
+
+class AnalysisPipeline(QObject):
+    """
+    Runs batched prompts about a list of stocks against a single model.
+
+    make_prompt(stocks) builds the request for a batch and
+    parse_response(text, stocks) returns {code: result} for the stocks the
+    answer covered validly.
+    """
+
+    item_finished = pyqtSignal(dict, dict)  # stock, parsed result
+    item_failed = pyqtSignal(dict, str)  # stock, error after the last retry
+    progress = pyqtSignal(int, int, int)  # done, failed, total
+    finished = pyqtSignal()
+
+    def __init__(self, service, model_name: str, prompt_name: str,
+                 make_prompt: Callable[[Sequence[Dict]], str],
+                 parse_response: Callable[[str, Sequence[Dict]], Dict[str, Dict]],
+                 batch_size: int = 1, concurrency: int = DEFAULT_PROVIDER_CONCURRENCY,
+                 max_retries: int = MAX_RETRIES, retry_delay_ms: int = RETRY_DELAY_MS, parent=None):
+        super().__init__(parent)
+        self.service = service
+        self.model_name = model_name
+        self.prompt_name = prompt_name
+        self.make_prompt = make_prompt
+        self.parse_response = parse_response
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.retry_delay_ms = retry_delay_ms
+
+        self.stocks: List[Dict] = []
+        self.jobs: List[List[int]] = []  # Stock indices asked by each request
+        self.attempts: List[int] = []  # Per job
+        self.retries: List[bool] = []  # Per job: asks stocks that were asked before
+        self.pending: List[int] = []  # Job ids waiting for a free slot
+        self.running: Dict[int, AnalysisWorker] = {}
+        self.waiting_retry = 0  # Jobs sleeping before their next attempt
+        self.failed: List[int] = []  # Stock indices
+        self.done = 0
+        self.requests = 0  # Requests sent, including retries
+        self.active = False  # Between start()/retry_failed() and finished
+        self.generation = 0  # Bumped by start() and cancel() to void pending retry timers
+        self.workers: List[AnalysisWorker] = []  # Keep cancelled threads alive until they exit
+
+    def start(self, stocks: List[Dict]):
+        """Analyze stocks (dicts with at least 'code' and 'name') in order of the list"""
+        self.stocks = list(stocks)
+        self.jobs = []
+        self.attempts = []
+        self.retries = []
+        self.pending = []
+        indices = list(range(len(self.stocks)))
+        for i in range(0, len(indices), self.batch_size):
+            self.add_job(indices[i:i + self.batch_size])
+        self.failed = []
+        self.done = 0
+        self.requests = 0
+        self.waiting_retry = 0
+        self.generation += 1
+        self.active = True
+        self.emit_progress()
+        self.dispatch()
+
+    def add_job(self, stock_indices: List[int], retry: bool = False):
+        self.jobs.append(stock_indices)
+        self.attempts.append(0)
+        self.retries.append(retry)
+        self.pending.append(len(self.jobs) - 1)
+
+    def total(self) -> int:
+        return len(self.stocks)
+
+    def is_running(self) -> bool:
+        return self.active
+
+    def emit_progress(self):
+        self.progress.emit(self.done, len(self.failed), self.total())
+
+    def dispatch(self):
+        """Start queued jobs while slots are free"""
+        self.workers = [w for w in self.workers if w.isRunning()]
+        while self.active and self.pending and len(self.running) < self.concurrency:
+            job_id = self.pending.pop(0)
+            self.attempts[job_id] += 1
+            self.requests += 1
+            batch = [self.stocks[i] for i in self.jobs[job_id]]
+            use_cache = not self.retries[job_id] and self.attempts[job_id] == 1
+            worker = AnalysisWorker(self.service, job_id, self.make_prompt(batch),
+                                    self.model_name, self.prompt_name, use_cache=use_cache)
+            worker.finished.connect(self.on_job_finished)
+            worker.failed.connect(self.on_job_failed)
+            self.running[job_id] = worker
+            self.workers.append(worker)
+            worker.start()
+        self.check_finished()
+
+    def check_finished(self):
+        if self.active and not (self.pending or self.running or self.waiting_retry):
+            self.active = False
+            self.finished.emit()
+
+    def on_job_finished(self, job_id: int, response: str):
+        if self.running.get(job_id) is not self.sender():
+            return  # Cancelled or superseded
+        del self.running[job_id]
+
+        indices = self.jobs[job_id]
+        batch = [self.stocks[i] for i in indices]
+        results = self.parse_response(response, batch)
+        missing = []
+        for index, stock in zip(indices, batch):
+            result = results.get(str(stock["code"]))
+            if result is None:
+                missing.append(index)
+            else:
+                self.done += 1
+                self.item_finished.emit(stock, result)
+        self.emit_progress()
+
+        if missing:
+            self.retry(job_id, missing, "Invalid or incomplete answer: " + response[:200])
+        self.dispatch()
+
+    def on_job_failed(self, job_id: int, error: str):
+        if self.running.get(job_id) is not self.sender():
+            return
+        del self.running[job_id]
+        self.retry(job_id, self.jobs[job_id], error)
+        self.dispatch()
+
+    def retry(self, job_id: int, indices: List[int], error: str):
+        """Ask stocks of a failed job again, one request per stock"""
+        if len(self.jobs[job_id]) > 1:
+            for index in indices:
+                self.add_job([index], retry=True)
+            return
+
+        attempt = self.attempts[job_id]
+        if attempt <= self.max_retries:
+            self.waiting_retry += 1
+            generation = self.generation
+            QTimer.singleShot(self.retry_delay_ms * attempt, lambda: self.requeue(job_id, generation))
+        else:
+            self.failed.extend(indices)
+            for index in indices:
+                self.item_failed.emit(self.stocks[index], error)
+            self.emit_progress()
+
+    def requeue(self, job_id: int, generation: int):
+        if generation != self.generation:
+            return  # Cancelled or restarted meanwhile
+        self.waiting_retry -= 1
+        self.pending.append(job_id)
+        self.dispatch()
+
+    def retry_failed(self) -> int:
+        """Queue every stock that exhausted its retries again; returns how many"""
+        retry = self.failed
+        if not retry:
+            return 0
+        self.failed = []
+        for index in retry:
+            self.add_job([index], retry=True)
+        self.active = True
+        self.emit_progress()
+        self.dispatch()
+        return len(retry)
+
+    def cancel(self):
+        """Drop queued jobs and ignore the requests in flight"""
+        if not self.active:
+            return
+        self.active = False
+        self.generation += 1
+        self.pending = []
+        self.waiting_retry = 0
+        for worker in self.running.values():
+            worker.cancel()
+        self.running = {}
+        self.finished.emit()
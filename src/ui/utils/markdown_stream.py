@@ -0,0 +1,172 @@
+import re
+
+from PyQt6.QtCore import QObject, QTimer
+from PyQt6.QtGui import QTextCursor
+
+# Extensions used for every chat response
+MARKDOWN_EXTENSIONS = ['tables', 'fenced_code', 'nl2br', 'sane_lists']
+
+# Document updates are coalesced to roughly one per display frame
+FRAME_INTERVAL_MS = 16
+
+_FENCE_RE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+_LIST_ITEM_RE = re.compile(r"^ {0,3}([*+-]|\d+[.)])\s")
+
+
+def stable_prefix_length(text: str, start: int = 0) -> int:
+    """
+    Length of the leading part of text that consists of completed blocks.
+
+    A block is complete once a blank line (or a closing code fence) is
+    followed by a line that cannot continue it: indented lines continue
+    the previous block, and list items continue a list. Text inside an
+    open fence and the last, unterminated line are never complete.
+
+    The scan begins at start, which must be 0 or a length this function
+    returned for a prefix of text; a block begins there, so the text
+    before it need not be scanned again.
+    """
+    stable = start
+    pos = start
+    fence = None  # Marker of the open code fence
+    boundary = None  # Candidate end of the current block
+    block_is_list = False
+
+    for line in text[start:].splitlines(keepends=True):
+        if not line.endswith("\n"):
+            # Still being written; its first character may already end the previous block
+            if (boundary is not None and fence is None and line[0] not in " \t"
+                    and not (block_is_list and line[0] in "*+-0123456789")):
+                stable = boundary
+            break
+        end = pos + len(line)
+        stripped = line.strip()
+
+        if fence is not None:
+            if stripped.startswith(fence) and stripped.strip(fence[0]) == "":
+                fence = None
+                boundary = end
+            pos = end
+            continue
+
+        if not stripped:
+            if boundary is None or boundary == pos:
+                boundary = end
+            pos = end
+            continue
+
+        if boundary is not None:
+            continues = line[0] in " \t" or (block_is_list and _LIST_ITEM_RE.match(line))
+            if not continues:
+                stable = boundary
+                block_is_list = bool(_LIST_ITEM_RE.match(line))
+            boundary = None
+        elif stable == pos:
+            block_is_list = bool(_LIST_ITEM_RE.match(line))
+
+        match = _FENCE_RE.match(line)
+        if match:
+            fence = match.group(1)
+        pos = end
+
+    return stable
+
+
+class StreamingMarkdownRenderer(QObject):
+    """
+    Renders a streamed Markdown response into a QTextEdit incrementally.
+
+    Completed blocks are converted to HTML once and left in the document;
+    only the trailing open block is re-rendered when new text arrives.
+    Chunks are buffered and the document is updated at most once per
+    frame, so the cost of a response stays linear in its length.
+    """
+
+    def __init__(self, text_edit, parent=None, interval_ms: int = FRAME_INTERVAL_MS):
+        super().__init__(parent)
+        self.text_edit = text_edit
+        self.md = None  # Created on first render; importing markdown is deferred
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.flush)
+
+        self.text = ""
+        self.frozen_length = 0  # Characters of text already rendered for good
+        self.start_position = 0  # Document position where the response starts
+        self.frozen_end = 0  # Document position where the frozen blocks end
+        self.active = False
+        self.dirty = False
+
+    def start(self):
+        """Begin a new response at the end of the document."""
+        self.timer.stop()
+        cursor = self.text_edit.textCursor()
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        self.text = ""
+        self.frozen_length = 0
+        self.start_position = cursor.position()
+        self.frozen_end = self.start_position
+        self.active = True
+        self.dirty = False
+
+    def append(self, chunk: str):
+        """Add streamed text; the document is updated on the next frame."""
+        self.text += chunk
+        self.dirty = True
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def finish(self):
+        """Render everything that is still pending, closing any open block."""
+        self.timer.stop()
+        if self.active:
+            self._render(final=True)
+            self.active = False
+
+    def flush(self):
+        if self.active and self.dirty:
+            self._render(final=False)
+
+    def _to_html(self, text: str) -> str:
+        try:
+            if self.md is None:
+                import markdown
+                self.md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+            self.md.reset()
+            return self.md.convert(text)
+        except Exception:
+            # Fallback to raw text if markdown fails
+            return text
+
+    def _insert(self, cursor, html: str):
+        # A leading paragraph would merge into the previous block; other
+        # block elements (lists, tables, code) open a new block themselves
+        if cursor.position() > self.start_position and html.startswith("<p"):
+            cursor.insertBlock()
+        cursor.insertHtml(html)
+
+    def _render(self, final: bool):
+        self.dirty = False
+        # Only the text after the frozen blocks is scanned again
+        stable = len(self.text) if final else stable_prefix_length(self.text, self.frozen_length)
+
+        # Drop the previously rendered open block
+        cursor = self.text_edit.textCursor()
+        cursor.setPosition(self.frozen_end)
+        cursor.movePosition(QTextCursor.MoveOperation.End, QTextCursor.MoveMode.KeepAnchor)
+        cursor.removeSelectedText()
+
+        if stable > self.frozen_length:
+            # Newly completed blocks are rendered once and never touched again
+            self._insert(cursor, self._to_html(self.text[self.frozen_length:stable]))
+            self.frozen_length = stable
+            self.frozen_end = cursor.position()
+
+        tail = self.text[self.frozen_length:]
+        if tail:
+            self._insert(cursor, self._to_html(tail))
+
+        scrollbar = self.text_edit.verticalScrollBar()
+        scrollbar.setValue(scrollbar.maximum())
@@ -1,32 +1,239 @@
+import contextlib
+import queue
+import threading
+import time
+
 from PyQt6.QtCore import QThread, pyqtSignal
 
+try:
+    from services.response_cache import CachedResponse
+    from core.backtest import BarPanel, run_backtest
+except ImportError:
+    # Fallback for relative imports if run as package
+    from ...services.response_cache import CachedResponse
+    from ...core.backtest import BarPanel, run_backtest
+
+
 class LLMWorker(QThread):
     """
     Worker thread to handle LLM requests asynchronously.
+
+    Streamed chunks are buffered and emitted together once flush_interval
+    seconds have passed or flush_chars characters are pending, so a fast
+    provider does not flood the UI thread with one signal per token.
+    Pending text is flushed on time even if the stream stalls, and before
+    an error is reported. Timing statistics are emitted through
+    stats_ready before finished.
     """
     finished = pyqtSignal(str)
     stream_updated = pyqtSignal(str)
+    stats_ready = pyqtSignal(dict)  # see stream_stats()
     
-    def __init__(self, service, user_input, model_name, prompt_name):
+    def __init__(self, service, user_input, model_name, prompt_name,
+                 flush_interval=0.05, flush_chars=512, context_key=None, context=None):
         super().__init__()
         self.service = service
         self.user_input = user_input
         self.model_name = model_name
         self.prompt_name = prompt_name
+        self.flush_interval = flush_interval  # Seconds between stream_updated signals
+        self.flush_chars = flush_chars  # Flush early once this many characters are pending
+        self.context_key = context_key  # Conversation to continue, e.g. a stock code
+        self.context = context  # MarketContext sent with the request
         
     def run(self):
+        start = time.perf_counter()
+        first_chunk_at = None
+        chunks = 0
+        emits = 0
+        parts = []  # Whole response
+        pending = []  # Chunks not yet sent to the UI
+        pending_chars = 0
+        last_flush = start
+        cached = False
+        model_name = self.model_name
+
+        def flush(now):
+            nonlocal emits, pending_chars, last_flush
+            if pending:
+                self.stream_updated.emit("".join(pending))
+                emits += 1
+                pending.clear()
+            pending_chars = 0
+            last_flush = now
+
         try:
-            full_response = ""
+            # Pick the model now for "auto", so the stats name the one that answered
+            resolve = getattr(self.service, "resolve_model", None)
+            if resolve is not None:
+                model_name = resolve(self.model_name)
             # Use chat_stream instead of chat
-            for chunk in self.service.chat_stream(self.user_input, self.model_name, self.prompt_name):
-                full_response += chunk
-                self.stream_updated.emit(chunk)
-                
+            kwargs = {name: value for name, value in (("context_key", self.context_key),
+                                                      ("context", self.context)) if value}
+            stream = self.service.chat_stream(self.user_input, model_name, self.prompt_name, **kwargs)
+
+            # Read the stream on a helper thread, so pending text is flushed
+            # on time even while the provider stalls between chunks
+            events = queue.Queue()
+            threading.Thread(target=_pump_stream, args=(stream, events), daemon=True).start()
+            while True:
+                timeout = None
+                if pending:
+                    timeout = max(0.0, last_flush + self.flush_interval - time.perf_counter())
+                try:
+                    kind, chunk = events.get(timeout=timeout)
+                except queue.Empty:
+                    flush(time.perf_counter())
+                    continue
+                if kind == "error":
+                    raise chunk
+                if kind == "done":
+                    break
+                if not chunk:
+                    continue
+                now = time.perf_counter()
+                if first_chunk_at is None:
+                    first_chunk_at = now
+                    last_flush = 0.0  # Show the first token right away
+                chunks += 1
+                cached = cached or isinstance(chunk, CachedResponse)
+                parts.append(chunk)
+                pending.append(chunk)
+                pending_chars += len(chunk)
+
+                if pending_chars >= self.flush_chars or now - last_flush >= self.flush_interval:
+                    flush(now)
+
+            flush(time.perf_counter())
+            full_response = "".join(parts)
+            self.stats_ready.emit(stream_stats(model_name, start, first_chunk_at,
+                                               time.perf_counter(), chunks, len(full_response), emits,
+                                               cached=cached))
             self.finished.emit(full_response)
         except Exception as e:
+            # Show what arrived before the error; finished carries the error itself
+            flush(time.perf_counter())
             self.finished.emit(f"System Error: {str(e)}")
 
 
+def _pump_stream(stream, events):
+    """Feed ("chunk", text) events of stream into events, then ("done", None) or ("error", exception)."""
+    try:
+        for chunk in stream:
+            events.put(("chunk", chunk))
+    except Exception as e:
+        events.put(("error", e))
+        return
+    events.put(("done", None))
+
+
+def stream_stats(model_name, start, first_chunk_at, end, chunks, chars, emits, cached=False):
+    """
+    Timing of one streamed LLM request.
+
+    Returns a dict with 'model', 'ttft' (seconds to the first chunk, None
+    if nothing arrived), 'duration', 'chunks', 'chars', 'emits' (signals
+    sent to the UI) and 'tokens_per_sec'. Providers stream about one token
+    per chunk, so chunks are counted as tokens; the rate is measured after
+    the first token so it reflects generation speed, not queueing.
+    'cached' is True when the response came from the response cache.
+    """
+    ttft = None if first_chunk_at is None else first_chunk_at - start
+    generation = 0.0 if first_chunk_at is None else end - first_chunk_at
+    tokens_per_sec = (chunks - 1) / generation if chunks > 1 and generation > 0 else 0.0
+    return {
+        "model": model_name,
+        "ttft": ttft,
+        "duration": end - start,
+        "chunks": chunks,
+        "chars": chars,
+        "emits": emits,
+        "tokens_per_sec": tokens_per_sec,
+        "cached": cached,
+    }
+
+
+def format_stream_stats(stats):
+    """Short one-line summary of stream_stats() for the chat window."""
+    if stats.get("cached"):
+        return f"[缓存] {stats['model']} · 本交易时段内已回答过 · 用时 {stats['duration']:.2f}s"
+    if stats.get("ttft") is None:
+        return f"{stats['model']} · 无输出 · 用时 {stats['duration']:.2f}s"
+    return (f"{stats['model']} · 首字 {stats['ttft']:.2f}s · "
+            f"{stats['tokens_per_sec']:.1f} tok/s · 用时 {stats['duration']:.2f}s")
+
+
+class AnalysisWorker(QThread):
+    """
+    Worker thread running one independent (history-free) LLM request.
+
+    Used by AnalysisPipeline, which runs several at once. The response is
+    collected rather than streamed; a cancelled request stops reading the
+    stream and emits nothing. use_cache=False asks the provider even if
+    the response cache holds an answer (and leaves the cache untouched).
+    """
+    finished = pyqtSignal(int, str)  # item id, response
+    failed = pyqtSignal(int, str)  # item id, error message
+
+    def __init__(self, service, item_id, user_input, model_name, prompt_name, use_cache=True):
+        super().__init__()
+        self.service = service
+        self.item_id = item_id
+        self.user_input = user_input
+        self.model_name = model_name
+        self.prompt_name = prompt_name
+        self.use_cache = use_cache
+        self._cancelled = False
+
+    def cancel(self):
+        """Stop reading the response; nothing will be emitted."""
+        self._cancelled = True
+
+    def run(self):
+        parts = []
+        try:
+            for chunk in self.service.chat_stream(self.user_input, self.model_name, self.prompt_name,
+                                                  use_cache=self.use_cache, history=[]):
+                if self._cancelled:
+                    return
+                parts.append(chunk)
+        except Exception as e:
+            if not self._cancelled:
+                self.failed.emit(self.item_id, f"System Error: {str(e)}")
+            return
+
+        if self._cancelled:
+            return
+        response = "".join(parts)
+        # LLMService reports configuration and provider errors in-band
+        if not response.strip() or response.startswith("Error"):
+            self.failed.emit(self.item_id, response or "Empty response")
+        else:
+            self.finished.emit(self.item_id, response)
+
+
+class MarketContextWorker(QThread):
+    """
+    Worker thread to build the LLM market context of a stock.
+    """
+    finished = pyqtSignal(str, object)  # stock_code, MarketContext or None
+
+    def __init__(self, builder, stock_code, stock_name, kline_data=None):
+        super().__init__()
+        self.builder = builder
+        self.stock_code = stock_code
+        self.stock_name = stock_name
+        self.kline_data = kline_data
+
+    def run(self):
+        try:
+            context = self.builder.build(self.stock_code, self.stock_name, self.kline_data)
+        except Exception as e:
+            print(f"Building market context for {self.stock_code} failed: {e}")
+            context = None
+        self.finished.emit(self.stock_code, context)
+
+
 class KLineWorker(QThread):
     """
     Worker thread to load K-line data asynchronously to avoid UI blocking.
@@ -59,3 +266,146 @@ class KLineWorker(QThread):
                 self.error.emit(self.stock_name, "无法获取K线数据")
         except Exception as e:
             self.error.emit(self.stock_name, f"加载K线数据失败: {str(e)}")
+
+
+class BacktestWorker(QThread):
+    """
+    Worker thread to backtest a strategy on its stock's daily bars.
+    """
+    finished = pyqtSignal(int, object)  # strategy_id, BacktestResult
+    error = pyqtSignal(int, str)  # strategy_id, error_message
+
+    def __init__(self, data_service, strategy_id, strategy, days=250):
+        super().__init__()
+        self.data_service = data_service
+        self.strategy_id = strategy_id
+        self.strategy = strategy
+        self.days = days
+
+    def run(self):
+        try:
+            kline_data = self.data_service.fetch_kline_data(self.strategy.code, days=self.days)
+            if not kline_data:
+                self.error.emit(self.strategy_id, "无法获取K线数据")
+                return
+            panel = BarPanel.from_klines({self.strategy.code: kline_data}, {self.strategy.code: self.strategy.name})
+            self.finished.emit(self.strategy_id, run_backtest(self.strategy, panel))
+        except Exception as e:
+            self.error.emit(self.strategy_id, f"回测失败: {str(e)}")
+
+
+class StockSearchWorker(QThread):
+    """
+    Worker thread to run a stock search off the UI thread.
+    A running search can be cancelled when a newer query supersedes it.
+    """
+    finished = pyqtSignal(int, list)  # request_id, matching stocks
+
+    def __init__(self, search_index, query, request_id, limit=20):
+        super().__init__()
+        self.search_index = search_index
+        self.query = query
+        self.request_id = request_id
+        self.limit = limit
+        self._cancelled = False
+
+    def cancel(self):
+        """Ask the search to stop; its results will not be emitted."""
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def run(self):
+        try:
+            matches = self.search_index.search(self.query, self.limit,
+                                               is_cancelled=self.is_cancelled)
+        except Exception as e:
+            print(f"Stock search failed for '{self.query}': {e}")
+            matches = []
+
+        if not self._cancelled:
+            self.finished.emit(self.request_id, matches)
+
+
+class ChartRenderWorker(QThread):
+    """
+    Worker thread to rasterize a chart QImage off the UI thread.
+    Painting on a QImage is thread-safe; the UI thread only converts the
+    finished image to a pixmap. A superseded render can be cancelled:
+    render_func is called with cancelled=is_cancelled, checks it between
+    drawing batches and returns None once it is set.
+    """
+    finished = pyqtSignal(int, object, object)  # request_id, cache key, QImage
+
+    def __init__(self, render_func, request_id, cache_key, *args):
+        super().__init__()
+        self.render_func = render_func
+        self.request_id = request_id
+        self.cache_key = cache_key
+        self.args = args
+        self._cancelled = False
+
+    def cancel(self):
+        """Ask the render to stop; its image will not be emitted."""
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def run(self):
+        if self._cancelled:
+            return
+        try:
+            image = self.render_func(*self.args, cancelled=self.is_cancelled)
+        except Exception as e:
+            print(f"Chart render failed for {self.cache_key[0]}: {e}")
+            return
+
+        if image is not None and not self._cancelled:
+            self.finished.emit(self.request_id, self.cache_key, image)
+
+
+class MarketHubLoader(QThread):
+    """
+    Worker thread that builds the shared MarketDataHub at startup.
+    Emits hub_ready once the stock universe is loaded so the tabs can be
+    built, then goes on to build the search index in the background.
+    """
+    hub_ready = pyqtSignal(object)  # MarketDataHub, or None if loading failed
+
+    def __init__(self, hub_factory, trace=None):
+        super().__init__()
+        self.hub_factory = hub_factory
+        self.trace = trace
+
+    def _phase(self, name):
+        return self.trace.phase(name) if self.trace is not None else contextlib.nullcontext()
+
+    def run(self):
+        try:
+            with self._phase("market data (bg)"):
+                hub = self.hub_factory()
+        except Exception as e:
+            print(f"Failed to load market data: {e}")
+            self.hub_ready.emit(None)
+            return
+        self.hub_ready.emit(hub)
+
+        with self._phase("search index (bg)"):
+            hub.get_search_index()
+
+
+class SearchIndexWorker(QThread):
+    """
+    Worker thread to obtain the hub's shared stock search index.
+    Waits for the index if another thread is already building it.
+    """
+    finished = pyqtSignal(object)  # StockSearchIndex
+
+    def __init__(self, hub):
+        super().__init__()
+        self.hub = hub
+
+    def run(self):
+        self.finished.emit(self.hub.get_search_index())
@@ -1,4 +1,12 @@
 """UI Widgets"""
 from .kline_chart import KLineChartWidget
 
-__all__ = ['KLineChartWidget']
+__all__ = ['KLineChartWidget', 'InteractiveKLineWidget', 'KLineChartDialog']
+
+
+def __getattr__(name):
+    # The interactive chart pulls in pyqtgraph; load it only when asked for
+    if name in ('InteractiveKLineWidget', 'KLineChartDialog'):
+        from . import kline_interactive
+        return getattr(kline_interactive, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,50 +1,234 @@
 """
 K-line chart widget using pyqtgraph
 """
+from collections import OrderedDict
+
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel
-from PyQt6.QtCore import Qt, QSize
-from PyQt6.QtGui import QColor, QPixmap, QPainter, QPen, QBrush, QImage
+from PyQt6.QtCore import Qt, QSize, QLineF, QRectF, QPointF, pyqtSignal
+from PyQt6.QtGui import QColor, QPixmap, QPainter, QPen, QBrush, QImage, QPolygonF
 import numpy as np
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
+
+try:
+    from ui.utils.worker import ChartRenderWorker
+except ImportError:
+    # Fallback for relative imports if run as package
+    from ..utils.worker import ChartRenderWorker
+
+# Bars shown in the compact chart
+COMPACT_BARS = 30
+CHART_HEIGHT = 180
+DEFAULT_WIDTH = 400
+PADDING = 10
+
+UP_COLOR = QColor(255, 50, 50)  # Red for up, green for down in China
+DOWN_COLOR = QColor(0, 200, 0)
+UP_VOLUME_COLOR = QColor(255, 50, 50, 180)
+DOWN_VOLUME_COLOR = QColor(0, 200, 0, 180)
+GRID_COLOR = QColor(40, 40, 40)  # Very dark gray for grid lines
+MA_STYLES = ((5, QColor(255, 200, 0)), (10, QColor(0, 200, 255)))  # MA5 yellow, MA10 cyan
+
+# Rendered charts keyed by (code, last bar, bar count, size), least recently used first
+PIXMAP_CACHE_SIZE = 64
+_pixmap_cache: "OrderedDict[tuple, QPixmap]" = OrderedDict()
+
+
+def moving_average(values: np.ndarray, period: int) -> np.ndarray:
+    """Simple moving average via a cumulative sum; the first period-1 values are NaN."""
+    ma = np.full(len(values), np.nan)
+    if period <= 0 or len(values) < period:
+        return ma
+    csum = np.cumsum(np.insert(values.astype(np.float64), 0, 0.0))
+    ma[period - 1:] = (csum[period:] - csum[:-period]) / period
+    return ma
+
+
+def chart_cache_key(stock_code: str, kline_data: List[Dict], width: int, height: int) -> tuple:
+    """Identify a rendered chart by symbol, the latest bar and the image size."""
+    last = kline_data[-1]
+    last_bar = (last.get('date'), last.get('open'), last.get('close'),
+                last.get('high'), last.get('low'), last.get('volume'))
+    return (stock_code, last_bar, len(kline_data), width, height)
+
+
+def render_kline_image(kline_data: List[Dict], width: int, height: int = CHART_HEIGHT,
+                       cancelled: Optional[Callable[[], bool]] = None) -> Optional[QImage]:
+    """
+    Render a compact K-line chart with MA5/MA10 and volume bars.
+
+    Coordinates for every bar are computed as arrays and each layer is
+    drawn with a single batched QPainter call.
+
+    Args:
+        kline_data: Bars with keys open, close, high, low and optionally volume
+        width: Image width in pixels
+        height: Image height in pixels
+        cancelled: Checked between drawing batches; once it returns True
+            the render stops
+
+    Returns:
+        The rendered image, or None if the render was cancelled
+    """
+    def stop():
+        return cancelled is not None and cancelled()
+
+    image = QImage(width, height, QImage.Format.Format_RGB32)
+    image.fill(Qt.GlobalColor.black)
+
+    # Limit to the most recent bars for compact view
+    bars = kline_data[-COMPACT_BARS:]
+    n = len(bars)
+    if n == 0:
+        return image
+
+    ohlcv = np.array([(d['open'], d['close'], d['high'], d['low'], d.get('volume', 0))
+                      for d in bars], dtype=np.float64)
+    opens, closes, highs, lows, volumes = ohlcv.T
+
+    # Calculate price range
+    max_price = highs.max()
+    min_price = lows.min()
+    price_range = max_price - min_price
+    if price_range == 0:
+        price_range = max_price * 0.1 if max_price > 0 else 1
+    max_volume = volumes.max() or 1
+
+    chart_width = width - 2 * PADDING
+    # Divide height: 70% for K-line, 30% for volume
+    kline_height = int((height - 3 * PADDING) * 0.7)
+    volume_height = int((height - 3 * PADDING) * 0.3)
+    volume_top = PADDING + kline_height + PADDING
+
+    def price_y(prices):
+        return PADDING + kline_height - (prices - min_price) / price_range * kline_height
+
+    spacing = chart_width / n
+    bar_width = max(2, chart_width // (n * 2))
+    x = PADDING + np.arange(n) * spacing + spacing / 2
+    left = x - bar_width / 2
+    y_high = price_y(highs)
+    y_low = price_y(lows)
+    body_top = price_y(np.maximum(opens, closes))
+    body_height = np.maximum(price_y(np.minimum(opens, closes)) - body_top, 1)
+    volume_bar_height = volumes / max_volume * volume_height
+    is_up = closes >= opens
+
+    if stop():
+        return None
+    painter = QPainter(image)
+    try:
+        # Price grid lines (horizontal)
+        painter.setPen(QPen(GRID_COLOR, 1))
+        painter.drawLines([QLineF(PADDING, y, width - PADDING, y)
+                           for y in (PADDING + kline_height * np.arange(5) / 4).tolist()])
+
+        # Candles and volume bars, one batch per color
+        for mask, color, volume_color in ((is_up, UP_COLOR, UP_VOLUME_COLOR),
+                                          (~is_up, DOWN_COLOR, DOWN_VOLUME_COLOR)):
+            if stop():
+                return None
+            if not mask.any():
+                continue
+            xs = x[mask].tolist()
+            lefts = left[mask].tolist()
+
+            painter.setPen(QPen(color, 1))
+            painter.setBrush(QBrush(color))
+            painter.drawLines([QLineF(px, top, px, bottom)
+                               for px, top, bottom in zip(xs, y_high[mask].tolist(), y_low[mask].tolist())])
+            painter.drawRects([QRectF(px, top, bar_width, h)
+                               for px, top, h in zip(lefts, body_top[mask].tolist(), body_height[mask].tolist())])
+
+            painter.setPen(QPen(volume_color, 1))
+            painter.setBrush(QBrush(volume_color))
+            painter.drawRects([QRectF(px, volume_top + volume_height - h, bar_width, h)
+                               for px, h in zip(lefts, volume_bar_height[mask].tolist())])
+
+        # Moving average lines
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        for period, color in MA_STYLES:
+            if stop():
+                return None
+            ma = moving_average(closes, period)
+            valid = ~np.isnan(ma)
+            if valid.sum() < 2:
+                continue
+            painter.setPen(QPen(color, 1.5))
+            painter.drawPolyline(QPolygonF([QPointF(px, py) for px, py in
+                                            zip(x[valid].tolist(), price_y(ma[valid]).tolist())]))
+    finally:
+        painter.end()
+    return image
+
+
+def lookup_cached_pixmap(key: tuple) -> Optional[QPixmap]:
+    """Pixmap rendered earlier for a cache key, or None."""
+    pixmap = _pixmap_cache.get(key)
+    if pixmap is not None:
+        _pixmap_cache.move_to_end(key)
+    return pixmap
+
+
+def store_cached_pixmap(key: tuple, pixmap: QPixmap):
+    _pixmap_cache[key] = pixmap
+    if len(_pixmap_cache) > PIXMAP_CACHE_SIZE:
+        _pixmap_cache.popitem(last=False)
+
+
+def cached_kline_pixmap(stock_code: str, kline_data: List[Dict], width: int,
+                        height: int = CHART_HEIGHT) -> QPixmap:
+    """Rendered chart for a symbol, reusing the pixmap while its data and size are unchanged."""
+    key = chart_cache_key(stock_code, kline_data, width, height)
+    pixmap = lookup_cached_pixmap(key)
+    if pixmap is None:
+        pixmap = QPixmap.fromImage(render_kline_image(kline_data, width, height))
+        store_cached_pixmap(key, pixmap)
+    return pixmap
+
 
 class KLineChartWidget(QWidget):
     """Compact K-line chart widget with thumbnail preview"""
-    
+
+    expand_requested = pyqtSignal()  # Double-click asks for the interactive chart
+
     def __init__(self, parent=None, compact_mode=True):
         super().__init__(parent)
         self.kline_data = []
         self.stock_code = ""
         self.stock_name = ""
         self.compact_mode = compact_mode
+        self.rendered_key = None  # Cache key of the pixmap on screen
+        self.pending_key = None  # Cache key of the render in flight
+        self.render_request_id = 0
+        self.render_workers = []  # Keep running render threads alive
         self.init_ui()
-    
+
     def init_ui(self):
         layout = QVBoxLayout(self)
         layout.setContentsMargins(5, 5, 5, 5)
         layout.setSpacing(0)
-        
+
         # Image label for static preview
         self.chart_label = QLabel()
         self.chart_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.chart_label.setMinimumHeight(180)
-        self.chart_label.setMaximumHeight(180)
+        self.chart_label.setMinimumHeight(CHART_HEIGHT)
+        self.chart_label.setMaximumHeight(CHART_HEIGHT)
         self.chart_label.setStyleSheet("background-color: black; border: 1px solid #333;")
         self.chart_label.setText("未加载数据")
-        
+        self.chart_label.setToolTip("双击打开可缩放的K线图")
+
         layout.addWidget(self.chart_label)
-        
+
     def calculate_ma(self, close_prices: np.ndarray, period: int) -> np.ndarray:
         """Calculate moving average"""
-        ma = np.full(len(close_prices), np.nan)
-        for i in range(period - 1, len(close_prices)):
-            ma[i] = np.mean(close_prices[i - period + 1:i + 1])
-        return ma
-    
+        return moving_average(close_prices, period)
+
     def update_chart(self, stock_code: str, stock_name: str, kline_data: List[Dict]):
         """
         Update chart with new K-line data
-        
+
         Args:
             stock_code: Stock code
             stock_name: Stock name
@@ -54,162 +238,84 @@ class KLineChartWidget(QWidget):
         self.stock_code = stock_code
         self.stock_name = stock_name
         self.kline_data = kline_data
-        
+
         if not kline_data:
             self.clear_chart()
             return
-        
+
         # Keep title as "K线预览" - don't show stock name
         # self.title_label.setText(f"{stock_name}({stock_code})")
-        
+
         # Generate static chart image
         self.render_compact_chart(kline_data)
-    
+
+    def chart_width(self) -> int:
+        return self.width() if self.width() > 100 else DEFAULT_WIDTH
+
     def render_compact_chart(self, kline_data: List[Dict]):
         """Render a compact static K-line chart image with volume"""
-        # Prepare data
-        n = len(kline_data)
-        if n == 0:
+        if not kline_data:
             return
-        
-        # Limit to last 30 days for compact view
-        if n > 30:
-            kline_data = kline_data[-30:]
-            n = 30
-        
-        opens = np.array([d['open'] for d in kline_data])
-        closes = np.array([d['close'] for d in kline_data])
-        highs = np.array([d['high'] for d in kline_data])
-        lows = np.array([d['low'] for d in kline_data])
-        volumes = np.array([d.get('volume', 0) for d in kline_data])
-        
-        # Calculate price range
-        max_price = np.max(highs)
-        min_price = np.min(lows)
-        price_range = max_price - min_price
-        if price_range == 0:
-            price_range = max_price * 0.1 if max_price > 0 else 1
-        
-        # Calculate volume range
-        max_volume = np.max(volumes) if len(volumes) > 0 else 1
-        if max_volume == 0:
-            max_volume = 1
-        
-        # Calculate moving averages
-        ma5 = self.calculate_ma(closes, 5)
-        ma10 = self.calculate_ma(closes, 10)
-        
-        # Create image
-        img_width = self.width() if self.width() > 100 else 400
-        img_height = 180
-        padding = 10
-        chart_width = img_width - 2 * padding
-        
-        # Divide height: 70% for K-line, 30% for volume
-        kline_height = int((img_height - 3 * padding) * 0.7)
-        volume_height = int((img_height - 3 * padding) * 0.3)
-        
-        image = QImage(img_width, img_height, QImage.Format.Format_RGB32)
-        image.fill(Qt.GlobalColor.black)
-        
-        painter = QPainter(image)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        
-        # Draw price grid lines (horizontal)
-        grid_color = QColor(40, 40, 40)  # Very dark gray for grid lines
-        painter.setPen(QPen(grid_color, 1))
-        
-        # Draw 5 horizontal grid lines
-        for i in range(5):
-            y = padding + (kline_height * i / 4)
-            painter.drawLine(padding, int(y), img_width - padding, int(y))
-        
-        # Calculate bar width
-        bar_width = max(2, chart_width // (n * 2))
-        spacing = chart_width / n
-        
-        # Draw K-line candles
-        for i in range(n):
-            open_price = opens[i]
-            close_price = closes[i]
-            high_price = highs[i]
-            low_price = lows[i]
-            
-            # Calculate positions
-            x = padding + i * spacing + spacing / 2
-            y_high = padding + kline_height - ((high_price - min_price) / price_range * kline_height)
-            y_low = padding + kline_height - ((low_price - min_price) / price_range * kline_height)
-            y_open = padding + kline_height - ((open_price - min_price) / price_range * kline_height)
-            y_close = padding + kline_height - ((close_price - min_price) / price_range * kline_height)
-            
-            # Determine color (red for up, green for down in China)
-            is_up = close_price >= open_price
-            color = QColor(255, 50, 50) if is_up else QColor(0, 200, 0)
-            
-            # Draw high-low line
-            painter.setPen(QPen(color, 1))
-            painter.drawLine(int(x), int(y_high), int(x), int(y_low))
-            
-            # Draw open-close box
-            box_height = abs(y_close - y_open)
-            if box_height < 1:
-                box_height = 1
-            box_y = min(y_open, y_close)
-            
-            painter.setBrush(QBrush(color))
-            painter.drawRect(int(x - bar_width/2), int(box_y), int(bar_width), int(box_height))
-        
-        # Draw moving average lines
-        # MA5 - Yellow
-        if not np.all(np.isnan(ma5)):
-            painter.setPen(QPen(QColor(255, 200, 0), 1.5))
-            for i in range(1, n):
-                if not np.isnan(ma5[i-1]) and not np.isnan(ma5[i]):
-                    x1 = padding + (i-1) * spacing + spacing / 2
-                    y1 = padding + kline_height - ((ma5[i-1] - min_price) / price_range * kline_height)
-                    x2 = padding + i * spacing + spacing / 2
-                    y2 = padding + kline_height - ((ma5[i] - min_price) / price_range * kline_height)
-                    painter.drawLine(int(x1), int(y1), int(x2), int(y2))
-        
-        # MA10 - Cyan
-        if not np.all(np.isnan(ma10)):
-            painter.setPen(QPen(QColor(0, 200, 255), 1.5))
-            for i in range(1, n):
-                if not np.isnan(ma10[i-1]) and not np.isnan(ma10[i]):
-                    x1 = padding + (i-1) * spacing + spacing / 2
-                    y1 = padding + kline_height - ((ma10[i-1] - min_price) / price_range * kline_height)
-                    x2 = padding + i * spacing + spacing / 2
-                    y2 = padding + kline_height - ((ma10[i] - min_price) / price_range * kline_height)
-                    painter.drawLine(int(x1), int(y1), int(x2), int(y2))
-        
-        # Draw volume bars
-        volume_top = padding + kline_height + padding
-        for i in range(n):
-            volume = volumes[i]
-            x = padding + i * spacing + spacing / 2
-            
-            # Calculate bar height
-            bar_height = (volume / max_volume) * volume_height
-            bar_y = volume_top + volume_height - bar_height
-            
-            # Color based on price movement
-            is_up = closes[i] >= opens[i]
-            volume_color = QColor(255, 50, 50, 180) if is_up else QColor(0, 200, 0, 180)
-            
-            painter.setBrush(QBrush(volume_color))
-            painter.setPen(QPen(volume_color, 1))
-            painter.drawRect(int(x - bar_width/2), int(bar_y), int(bar_width), int(bar_height))
-        
-        painter.end()
-        
-        # Convert to pixmap and display
+
+        width = self.chart_width()
+        key = chart_cache_key(self.stock_code, kline_data, width, CHART_HEIGHT)
+        if key in (self.rendered_key, self.pending_key):
+            return  # Already on screen or being rendered
+
+        # A newer chart supersedes any render still in flight
+        self.cancel_render()
+
+        pixmap = lookup_cached_pixmap(key)
+        if pixmap is not None:
+            self.chart_label.setPixmap(pixmap)
+            self.rendered_key = key
+            return
+
+        # Drop references to finished workers, keep running ones alive
+        self.render_workers = [w for w in self.render_workers if w.isRunning()]
+
+        self.pending_key = key
+        worker = ChartRenderWorker(render_kline_image, self.render_request_id, key,
+                                   list(kline_data), width, CHART_HEIGHT)
+        worker.finished.connect(self.on_chart_rendered)
+        self.render_workers.append(worker)
+        worker.start()
+
+    def cancel_render(self):
+        """Ignore the render in flight, if any"""
+        self.render_request_id += 1
+        self.pending_key = None
+        for worker in self.render_workers:
+            worker.cancel()
+
+    def on_chart_rendered(self, request_id: int, key: tuple, image: QImage):
+        """Show a finished image, ignoring any superseded render"""
         pixmap = QPixmap.fromImage(image)
+        store_cached_pixmap(key, pixmap)
+        if request_id != self.render_request_id:
+            return
+
         self.chart_label.setPixmap(pixmap)
-    
+        self.rendered_key = key
+        self.pending_key = None
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # Only a width change affects the image; the height is fixed
+        if self.kline_data and event.size().width() != event.oldSize().width():
+            self.render_compact_chart(self.kline_data)
+
+    def mouseDoubleClickEvent(self, event):
+        if self.kline_data:
+            self.expand_requested.emit()
+        super().mouseDoubleClickEvent(event)
+
     def clear_chart(self):
         """Clear the chart"""
+        self.cancel_render()
         self.chart_label.clear()
         self.chart_label.setText("未加载数据")
         self.stock_code = ""
         self.stock_name = ""
         self.kline_data = []
+        self.rendered_key = None
@@ -0,0 +1,314 @@
+"""
+Interactive K-line chart using pyqtgraph
+
+The chart keeps the full bar series in NumPy arrays but only ever draws
+about one candle per few screen pixels: whenever the visible range
+changes, the bars in view are merged into buckets (first open, highest
+high, lowest low, last close, summed volume), so pan and zoom cost the
+same for a few months of bars as for decades.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+import pyqtgraph as pg
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QComboBox
+from PyQt6.QtCore import Qt, QLineF, QRectF
+from PyQt6.QtGui import QPainter, QPen, QBrush, QPicture
+
+try:
+    from ui.widgets.kline_chart import moving_average, UP_COLOR, DOWN_COLOR, MA_STYLES
+    from ui.utils.worker import KLineWorker
+except ImportError:
+    # Fallback for relative imports if run as package
+    from .kline_chart import moving_average, UP_COLOR, DOWN_COLOR, MA_STYLES
+    from ..utils.worker import KLineWorker
+
+# Screen pixels per drawn candle; fewer pixels per bar triggers bucketing
+PIXELS_PER_CANDLE = 3
+
+# Bars requested when the interactive chart opens
+HISTORY_DAYS = 2500
+
+PERIODS = [("日线", "daily"), ("周线", "weekly"), ("月线", "monthly")]
+
+
+def downsample_ohlcv(opens: np.ndarray, highs: np.ndarray, lows: np.ndarray,
+                     closes: np.ndarray, volumes: np.ndarray,
+                     start: int, stop: int, max_buckets: int) -> Dict[str, np.ndarray]:
+    """
+    Merge bars [start, stop) into at most max_buckets candles.
+
+    Each bucket keeps the first open, the highest high, the lowest low,
+    the last close and the summed volume of its bars, so every price
+    extreme in view stays visible.
+
+    Returns:
+        Dict of arrays 'x' (bucket center in bar index units), 'open',
+        'high', 'low', 'close', 'volume', plus 'width' (bars per bucket)
+    """
+    start = max(0, start)
+    stop = min(len(opens), stop)
+    if stop <= start:
+        empty = np.zeros(0)
+        return {"x": empty, "open": empty, "high": empty, "low": empty,
+                "close": empty, "volume": empty, "width": 1}
+
+    step = max(1, -(-(stop - start) // max(1, max_buckets)))  # ceil division
+    # Align buckets to multiples of step so they do not shift while panning
+    first = start - start % step
+    bounds = np.arange(first, stop, step)
+    lasts = np.minimum(bounds + step, stop) - 1
+
+    if step == 1:
+        sl = slice(first, stop)
+        return {"x": bounds.astype(np.float64), "open": opens[sl], "high": highs[sl],
+                "low": lows[sl], "close": closes[sl], "volume": volumes[sl], "width": 1}
+
+    sl = slice(first, stop)
+    offsets = bounds - first
+    return {
+        "x": (bounds + lasts) / 2.0,
+        "open": opens[bounds],
+        "high": np.maximum.reduceat(highs[sl], offsets),
+        "low": np.minimum.reduceat(lows[sl], offsets),
+        "close": closes[lasts],
+        "volume": np.add.reduceat(volumes[sl], offsets),
+        "width": step,
+    }
+
+
+class CandlestickItem(pg.GraphicsObject):
+    """Candles (or volume bars) drawn from pre-bucketed arrays in two batches per color"""
+
+    def __init__(self, volume_mode: bool = False):
+        super().__init__()
+        self.volume_mode = volume_mode
+        self.picture = QPicture()
+        self.bounds = QRectF()
+
+    def set_buckets(self, buckets: Dict[str, np.ndarray], bounds: QRectF):
+        """Re-record the drawing for the visible buckets"""
+        self.prepareGeometryChange()
+        self.bounds = bounds
+        self.picture = QPicture()
+        painter = QPainter(self.picture)
+
+        x = buckets["x"]
+        half = buckets["width"] * 0.35
+        is_up = buckets["close"] >= buckets["open"]
+        for mask, color in ((is_up, UP_COLOR), (~is_up, DOWN_COLOR)):
+            if not mask.any():
+                continue
+            pen = QPen(color)
+            pen.setCosmetic(True)  # One pixel wide at every zoom level
+            painter.setPen(pen)
+            painter.setBrush(QBrush(color))
+            xs = x[mask].tolist()
+
+            if self.volume_mode:
+                painter.drawRects([QRectF(px - half, 0.0, 2 * half, v)
+                                   for px, v in zip(xs, buckets["volume"][mask].tolist())])
+                continue
+
+            top = np.maximum(buckets["open"][mask], buckets["close"][mask])
+            bottom = np.minimum(buckets["open"][mask], buckets["close"][mask])
+            painter.drawLines([QLineF(px, lo, px, hi) for px, lo, hi in
+                               zip(xs, buckets["low"][mask].tolist(), buckets["high"][mask].tolist())])
+            painter.drawRects([QRectF(px - half, b, 2 * half, t - b) for px, b, t in
+                               zip(xs, bottom.tolist(), top.tolist())])
+        painter.end()
+        self.update()
+
+    def paint(self, painter, *args):
+        painter.drawPicture(0, 0, self.picture)
+
+    def boundingRect(self):
+        return self.bounds
+
+
+class DateAxisItem(pg.AxisItem):
+    """Bottom axis that labels bar indices with their dates"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dates: List[str] = []
+
+    def tickStrings(self, values, scale, spacing):
+        labels = []
+        for value in values:
+            index = int(round(value))
+            labels.append(self.dates[index] if 0 <= index < len(self.dates) else "")
+        return labels
+
+
+class InteractiveKLineWidget(pg.GraphicsLayoutWidget):
+    """
+    Pan/zoom candlestick chart with volume, MA lines and level-of-detail drawing.
+
+    Only the x axis is interactive; the price and volume axes follow the
+    bars in view.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setBackground("k")
+        self.arrays: Optional[Dict[str, np.ndarray]] = None
+        self.last_view = None  # (start, stop, bucket count) currently drawn
+
+        self.date_axis = DateAxisItem(orientation="bottom")
+        self.price_plot = self.addPlot(row=0, col=0)
+        self.volume_plot = self.addPlot(row=1, col=0, axisItems={"bottom": self.date_axis})
+        self.ci.layout.setRowStretchFactor(0, 3)
+        self.ci.layout.setRowStretchFactor(1, 1)
+        self.volume_plot.setXLink(self.price_plot)
+        self.price_plot.hideAxis("bottom")
+        for plot in (self.price_plot, self.volume_plot):
+            plot.setMouseEnabled(x=True, y=False)
+            plot.showGrid(x=False, y=True, alpha=0.15)
+            plot.setMenuEnabled(False)
+
+        self.candles = CandlestickItem()
+        self.volumes = CandlestickItem(volume_mode=True)
+        self.price_plot.addItem(self.candles)
+        self.volume_plot.addItem(self.volumes)
+
+        # MA lines use pyqtgraph's own peak downsampling and view clipping
+        self.ma_lines = []
+        for period, color in MA_STYLES:
+            line = self.price_plot.plot(pen=pg.mkPen(color, width=1.5))
+            line.setDownsampling(auto=True, method="peak")
+            line.setClipToView(True)
+            self.ma_lines.append((period, line))
+
+        self.price_plot.sigXRangeChanged.connect(self.on_view_changed)
+        self.price_plot.getViewBox().sigResized.connect(self.on_plot_resized)
+
+    def set_data(self, kline_data: List[Dict]):
+        """
+        Replace the series and show its most recent bars.
+
+        Args:
+            kline_data: Bars with keys date, open, close, high, low, volume
+        """
+        n = len(kline_data)
+        ohlcv = np.array([(d['open'], d['high'], d['low'], d['close'], d.get('volume', 0))
+                          for d in kline_data], dtype=np.float64).reshape(n, 5)
+        self.arrays = dict(zip(("open", "high", "low", "close", "volume"), ohlcv.T))
+        self.date_axis.dates = [str(d.get('date', ''))[:10] for d in kline_data]
+        self.last_view = None
+
+        x = np.arange(n, dtype=np.float64)
+        for period, line in self.ma_lines:
+            line.setData(x, moving_average(self.arrays["close"], period), connect="finite")
+
+        # Start on roughly the last 120 bars; the rest is a pan or zoom away
+        self.price_plot.setLimits(xMin=-1, xMax=max(n, 1), minXRange=5)
+        self.price_plot.setXRange(max(0, n - 120) - 0.5, n - 0.5, padding=0)
+        self.on_view_changed()
+
+    def on_view_changed(self, *args):
+        """Re-bucket the bars in view and fit the y axes to them"""
+        if self.arrays is None or not len(self.arrays["open"]):
+            return
+        x_min, x_max = self.price_plot.viewRange()[0]
+        start = int(np.floor(x_min))
+        stop = int(np.ceil(x_max)) + 1
+        pixels = max(1, int(self.price_plot.getViewBox().width()))
+        max_buckets = max(1, pixels // PIXELS_PER_CANDLE)
+
+        view = (start, stop, max_buckets)
+        if view == self.last_view:
+            return
+        self.last_view = view
+
+        a = self.arrays
+        buckets = downsample_ohlcv(a["open"], a["high"], a["low"], a["close"], a["volume"],
+                                   start, stop, max_buckets)
+        if not len(buckets["x"]):
+            return
+
+        low = float(buckets["low"].min())
+        high = float(buckets["high"].max())
+        top_volume = float(buckets["volume"].max()) or 1.0
+        x_left = float(buckets["x"][0]) - buckets["width"]
+        x_span = float(buckets["x"][-1] - buckets["x"][0]) + 2 * buckets["width"]
+
+        self.candles.set_buckets(buckets, QRectF(x_left, low, x_span, high - low))
+        self.volumes.set_buckets(buckets, QRectF(x_left, 0.0, x_span, top_volume))
+        margin = (high - low) * 0.05 or high * 0.01 or 1.0
+        self.price_plot.setYRange(low - margin, high + margin, padding=0)
+        self.volume_plot.setYRange(0, top_volume * 1.05, padding=0)
+
+    def on_plot_resized(self, *args):
+        self.last_view = None  # Bucket count depends on the plot width
+        self.on_view_changed()
+
+
+class KLineChartDialog(QDialog):
+    """Window with the interactive chart of one stock and its full history"""
+
+    def __init__(self, data_service, stock_code: str, stock_name: str,
+                 kline_data: Optional[List[Dict]] = None, parent=None):
+        super().__init__(parent)
+        self.data_service = data_service
+        self.stock_code = stock_code
+        self.stock_name = stock_name
+        self.kline_worker = None
+        self.kline_workers = []  # Keep running loads alive
+        self.setWindowTitle(f"{stock_name} ({stock_code}) K线")
+        self.resize(1000, 600)
+
+        layout = QVBoxLayout(self)
+        toolbar = QHBoxLayout()
+        self.period_selector = QComboBox()
+        for label, _ in PERIODS:
+            self.period_selector.addItem(label)
+        self.period_selector.currentIndexChanged.connect(self.load_history)
+        self.status_label = QLabel("")
+        self.status_label.setStyleSheet("color: #999;")
+        toolbar.addWidget(QLabel("周期:"))
+        toolbar.addWidget(self.period_selector)
+        toolbar.addWidget(self.status_label)
+        toolbar.addStretch()
+        layout.addLayout(toolbar)
+
+        self.chart = InteractiveKLineWidget()
+        layout.addWidget(self.chart)
+
+        # Show what the compact chart already has while the full history loads
+        if kline_data:
+            self.chart.set_data(kline_data)
+        self.load_history()
+
+    def load_history(self):
+        """Fetch the long history for the selected period in the background"""
+        period = PERIODS[self.period_selector.currentIndex()][1]
+        self.status_label.setText("加载历史数据...")
+        self.kline_workers = [w for w in self.kline_workers if w.isRunning()]
+        self.kline_worker = KLineWorker(self.data_service, self.stock_code, self.stock_name,
+                                        period=period, days=HISTORY_DAYS)
+        self.kline_worker.finished.connect(self.on_history_loaded)
+        self.kline_worker.error.connect(self.on_history_error)
+        self.kline_workers.append(self.kline_worker)
+        self.kline_worker.start()
+
+    def on_history_loaded(self, stock_code: str, stock_name: str, kline_data: list):
+        if self.sender() is not self.kline_worker:
+            return  # A newer period was selected
+        self.chart.set_data(kline_data)
+        self.status_label.setText(f"{len(kline_data)} 根K线")
+
+    def on_history_error(self, stock_name: str, error_message: str):
+        if self.sender() is self.kline_worker:
+            self.status_label.setText(error_message)
+
+    def closeEvent(self, event):
+        # Loads still running finish in the background, referenced by
+        # kline_workers of this (parent-owned) dialog; their results are dropped
+        self.kline_worker = None
+        for worker in self.kline_workers:
+            if worker.isRunning():
+                worker.finished.disconnect(self.on_history_loaded)
+                worker.error.disconnect(self.on_history_error)
+        self.kline_workers = [w for w in self.kline_workers if w.isRunning()]
+        super().closeEvent(event)
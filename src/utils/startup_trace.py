@@ -0,0 +1,63 @@
+"""
+Startup timing trace
+
+Phases of application startup are recorded with startup_trace.phase() and
+printed once the first tab is usable, so a slow import or data load shows
+up as soon as it is introduced.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Tuple
+
+# Startup should reach a usable first tab within this many milliseconds
+STARTUP_BUDGET_MS = 1500
+
+
+class StartupTrace:
+    """Collects (phase, start offset, duration) records from any thread."""
+
+    def __init__(self, budget_ms: float = STARTUP_BUDGET_MS):
+        self.budget_ms = budget_ms
+        self.origin = time.perf_counter()
+        self.records: List[Tuple[str, float, float]] = []  # name, start ms, duration ms
+        self.reported = False
+        self._lock = threading.Lock()
+
+    def elapsed_ms(self) -> float:
+        """Milliseconds since the trace was created (process start)."""
+        return (time.perf_counter() - self.origin) * 1000
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time the enclosed block as one startup phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.records.append((name, (start - self.origin) * 1000, (end - start) * 1000))
+
+    def summary(self) -> str:
+        """Phases in start order, then the total against the budget."""
+        with self._lock:
+            records = sorted(self.records, key=lambda record: record[1])
+        total = self.elapsed_ms()
+        lines = [f"  {name:<24} {start:8.1f} ms  +{duration:7.1f} ms"
+                 for name, start, duration in records]
+        status = "OK" if total <= self.budget_ms else "OVER BUDGET"
+        lines.append(f"  {'first tab ready':<24} {total:8.1f} ms  "
+                     f"(budget {self.budget_ms:.0f} ms, {status})")
+        return "\n".join(lines)
+
+    def report(self):
+        """Print the summary the first time startup completes."""
+        if self.reported:
+            return
+        self.reported = True
+        print("Startup trace:\n" + self.summary())
+
+
+# Process-wide trace; created when this module is first imported
+startup_trace = StartupTrace()
@@ -0,0 +1,48 @@
+"""
+Background warm-up of deferred imports
+
+Heavy dependencies are imported on first use so the window appears
+quickly. Once the first tab is ready, warm_up_imports() loads them on a
+daemon thread so the first chat or chart does not pay for the import.
+Python's import lock makes this safe: a module requested while it is
+still being warmed up is simply waited for.
+"""
+import importlib
+import threading
+from typing import Iterable
+
+# Imported after startup, in order of how soon they are likely needed
+WARMUP_MODULES = (
+    "markdown",
+    "langchain_openai",
+    "langchain_core.prompts",
+    "langchain_core.output_parsers",
+    "langchain_core.messages",
+)
+
+
+def warm_up_imports(modules: Iterable[str] = WARMUP_MODULES, trace=None) -> threading.Thread:
+    """
+    Import modules on a background daemon thread.
+
+    Args:
+        modules: Module names to import
+        trace: Optional StartupTrace that records one phase per module
+
+    Returns:
+        The started thread
+    """
+    def run():
+        for name in modules:
+            try:
+                if trace is not None:
+                    with trace.phase(f"warm-up: {name}"):
+                        importlib.import_module(name)
+                else:
+                    importlib.import_module(name)
+            except Exception as e:
+                print(f"Warm-up import of {name} failed: {e}")
+
+    thread = threading.Thread(target=run, name="import-warmup", daemon=True)
+    thread.start()
+    return thread
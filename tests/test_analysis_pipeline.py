@@ -0,0 +1,191 @@
+import sys
+import os
+import json
+import re
+import tempfile
+import threading
+import time
+import unittest
+from PyQt6.QtWidgets import QApplication
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from ui.utils.analysis_pipeline import AnalysisPipeline, provider_concurrency
+from services.batch_analysis import build_batch_prompt, parse_batch_response
+from services.llm_service import LLMService
+from services.response_cache import ResponseCache
+
+
+class FakeAnalysisService:
+    """
+    Answers batch prompts with a JSON array after a short delay.
+
+    fail_times[code] makes requests mentioning the code error out that many
+    times; skip_in_batch codes are left out of multi-stock answers.
+    """
+
+    def __init__(self, fail_times=None, skip_in_batch=(), delay=0.02):
+        self.fail_times = dict(fail_times or {})
+        self.skip_in_batch = set(skip_in_batch)
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.prompts = []
+        self.histories = []
+        self.use_cache = []
+
+    def chat_stream(self, user_input, model_name, prompt_name, use_cache=True, history=None):
+        codes = re.findall(r"^(\d{6}),", user_input, re.MULTILINE)
+        with self.lock:
+            self.prompts.append(codes)
+            self.histories.append(history)
+            self.use_cache.append(use_cache)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+            failing = [c for c in codes if self.fail_times.get(c, 0) > 0]
+            for code in failing:
+                self.fail_times[code] -= 1
+        if failing:
+            yield "Error calling LLM: timeout"
+            return
+        answered = [c for c in codes if len(codes) == 1 or c not in self.skip_in_batch]
+        yield "```json\n"
+        yield json.dumps([{"code": c, "score": 80, "reason": "趋势向上"} for c in answered],
+                         ensure_ascii=False)
+        yield "\n```"
+
+
+class FakeConfigManager:
+    def get_providers(self):
+        return {"Test": {"name": "Test", "api_key": "sk-test", "model_name": "test-model"}}
+
+    def get_prompts(self):
+        return {"默认": {"name": "默认", "content": "你是一个股票分析助手。"}}
+
+
+class ScriptedChain:
+    """Answers each request with the next of the given answers."""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.calls = 0
+
+    def stream(self, inputs):
+        self.calls += 1
+        yield self.answers.pop(0)
+
+
+class TestAnalysisPipeline(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Create QApplication if it doesn't exist
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+    def make_pipeline(self, service, **kwargs):
+        return AnalysisPipeline(service, "test-model", "默认", build_batch_prompt,
+                                parse_batch_response, **kwargs)
+
+    def run_pipeline(self, service, stocks, timeout=10, **kwargs):
+        pipeline = self.make_pipeline(service, **kwargs)
+        results = {"done": [], "failed": [], "progress": [], "finished": 0}
+        pipeline.item_finished.connect(lambda stock, result: results["done"].append(result["code"]))
+        pipeline.item_failed.connect(lambda stock, error: results["failed"].append(stock["code"]))
+        pipeline.progress.connect(lambda *p: results["progress"].append(p))
+        pipeline.finished.connect(lambda: results.__setitem__("finished", results["finished"] + 1))
+        pipeline.start(stocks)
+        self.wait(pipeline, timeout)
+        return pipeline, results
+
+    def wait(self, pipeline, timeout=10):
+        deadline = time.time() + timeout
+        while pipeline.is_running() and time.time() < deadline:
+            QApplication.processEvents()
+            time.sleep(0.002)
+
+    def stocks(self, n):
+        return [{"code": f"{i:06d}", "name": f"股票{i}", "price": 10.0 + i} for i in range(n)]
+
+    def test_runs_batches_with_bounded_concurrency(self):
+        service = FakeAnalysisService()
+        pipeline, results = self.run_pipeline(service, self.stocks(25), batch_size=5, concurrency=2)
+        self.assertEqual(results["finished"], 1)
+        self.assertEqual(sorted(results["done"]), [s["code"] for s in self.stocks(25)])
+        self.assertEqual(pipeline.requests, 5)
+        self.assertEqual(service.peak, 2)
+        self.assertEqual(results["progress"][-1], (25, 0, 25))
+        # Every request gets its own history, never the shared chat
+        self.assertTrue(all(h is not None for h in service.histories))
+
+    def test_missing_items_are_asked_individually(self):
+        service = FakeAnalysisService(skip_in_batch={"000002", "000004"})
+        pipeline, results = self.run_pipeline(service, self.stocks(6), batch_size=3)
+        self.assertEqual(sorted(results["done"]), [s["code"] for s in self.stocks(6)])
+        self.assertEqual(pipeline.requests, 4)
+        self.assertIn(["000002"], service.prompts)
+        self.assertIn(["000004"], service.prompts)
+
+    def test_retries_then_reports_failure(self):
+        # The failing batch is split; 000001 recovers on its first retry, 000002 never does
+        service = FakeAnalysisService(fail_times={"000001": 2, "000002": 10})
+        pipeline, results = self.run_pipeline(service, self.stocks(3), batch_size=3,
+                                              max_retries=1, retry_delay_ms=10)
+        self.assertEqual(sorted(results["done"]), ["000000", "000001"])
+        self.assertEqual(results["failed"], ["000002"])
+        self.assertEqual(results["progress"][-1], (2, 1, 3))
+
+        # A manual retry runs the failed stock again
+        service.fail_times["000002"] = 0
+        self.assertEqual(pipeline.retry_failed(), 1)
+        self.wait(pipeline)
+        self.assertIn("000002", results["done"])
+        self.assertEqual(pipeline.failed, [])
+        # Only first attempts of the original batches may be served from the cache
+        self.assertEqual(service.use_cache[0], True)
+        self.assertFalse(any(service.use_cache[1:]))
+
+    def test_retry_reaches_provider_despite_cached_answer(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        service = LLMService(spill_dir=os.path.join(tmp.name, "contexts"))
+        service.config_manager = FakeConfigManager()
+        service.response_cache = ResponseCache(os.path.join(tmp.name, "responses.sqlite3"))
+        valid = json.dumps([{"code": "000000", "score": 80, "reason": "趋势向上"}], ensure_ascii=False)
+        chain = ScriptedChain("{}", "{}", valid, valid)
+        service.get_chain = lambda *args: chain
+
+        pipeline, results = self.run_pipeline(service, self.stocks(1), max_retries=1, retry_delay_ms=10)
+        self.assertEqual(results["failed"], ["000000"])
+        self.assertEqual(chain.calls, 2)
+
+        # The rejected answer stays cached, but the manual retry asks the provider again
+        self.assertEqual(pipeline.retry_failed(), 1)
+        self.wait(pipeline)
+        self.assertEqual(results["done"], ["000000"])
+        self.assertEqual(chain.calls, 3)
+
+    def test_cancel_ignores_requests_in_flight(self):
+        service = FakeAnalysisService(delay=0.2)
+        pipeline = self.make_pipeline(service, batch_size=2, concurrency=2)
+        done = []
+        pipeline.item_finished.connect(lambda stock, result: done.append(stock["code"]))
+        pipeline.start(self.stocks(10))
+        pipeline.cancel()
+        self.assertFalse(pipeline.is_running())
+        for worker in pipeline.workers:
+            worker.wait()
+        QApplication.processEvents()
+        self.assertEqual(done, [])
+
+    def test_provider_concurrency(self):
+        self.assertEqual(provider_concurrency(None), 1)
+        self.assertEqual(provider_concurrency({"model_name": "m"}), 4)
+        self.assertEqual(provider_concurrency({"max_concurrency": "8"}), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import sys
+import os
+import unittest
+
+import numpy as np
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from core.backtest import BarPanel, run_backtest, target_positions, limit_pct, LOT_SIZE
+from core.strategies import (MACrossStrategy, GridStrategy, MACDDivergenceStrategy,
+                             StopLossTakeProfitStrategy)
+
+
+def klines(opens, closes=None, start=1):
+    closes = opens if closes is None else closes
+    return [{"date": f"2026-01-{start + i:02d}", "open": o, "high": max(o, c), "low": min(o, c), "close": c}
+            for i, (o, c) in enumerate(zip(opens, closes))]
+
+
+class TestBacktest(unittest.TestCase):
+    def test_limit_pct(self):
+        self.assertEqual(limit_pct("600519"), 0.1)
+        self.assertEqual(limit_pct("000001", "*ST平安"), 0.05)
+        self.assertEqual(limit_pct("300750"), 0.2)
+        self.assertEqual(limit_pct("688981"), 0.2)
+        self.assertEqual(limit_pct("830799"), 0.3)
+
+    def test_from_klines_aligns_dates(self):
+        panel = BarPanel.from_klines({"600000": klines([10, 11, 12]), "600001": klines([20, 21], start=2)})
+        self.assertEqual(panel.dates, ["2026-01-01", "2026-01-02", "2026-01-03"])
+        self.assertTrue(np.isnan(panel.close[1, 0]))
+        self.assertEqual(panel.close[1, 2], 21)
+
+    def test_stop_loss_fills_next_open_in_lots(self):
+        panel = BarPanel.from_klines({"600000": klines([10.0, 10.0, 10.1, 9.5, 9.6, 9.7])})
+        result = run_backtest(StopLossTakeProfitStrategy("600000", stop_loss_pct=3.0), panel, cash=10_000)
+        positions = result.positions[0]
+        # Decided on day 0's close, bought at day 1's open: 900 shares (1000 leave nothing for fees)
+        self.assertEqual(list(positions[:3]), [0, 900, 900])
+        self.assertEqual(positions[1] % LOT_SIZE, 0)
+        # Stop hit at day 3's close, sold at day 4's open
+        self.assertEqual(list(positions[3:]), [900, 0, 0])
+        stats = result.stats("600000")
+        self.assertEqual((stats["buys"], stats["trades"], stats["win_rate"]), (1, 1, 0.0))
+        # 900 x (9.6 - 10.0), minimum commission on both fills, stamp tax on the sell
+        self.assertAlmostEqual(stats["final_equity"], 10_000 - 360 - 5 - 5 - 900 * 9.6 * 0.0005, places=6)
+
+    def test_limit_up_delays_buy(self):
+        # The day after the buy decision opens at the limit-up price: buy on the next session
+        panel = BarPanel.from_klines({"600000": klines([10.0, 11.0, 11.2, 11.3], [10.0, 11.0, 11.3, 11.3])})
+        result = run_backtest(StopLossTakeProfitStrategy("600000", stop_loss_pct=50, take_profit_pct=50), panel)
+        self.assertEqual(list(result.positions[0, :3] > 0), [False, False, True])
+
+    def test_limit_down_delays_sell(self):
+        opens = [10.0, 10.0, 10.0, 9.0, 8.6]
+        closes = [10.0, 10.0, 10.0, 9.0, 8.6]
+        panel = BarPanel.from_klines({"600000": klines(opens, closes)})
+        result = run_backtest(StopLossTakeProfitStrategy("600000", stop_loss_pct=5.0), panel)
+        # Stop hit at day 3's close; day 4 opens 4.4% lower, inside the 10% limit, so the sell fills
+        self.assertEqual(result.positions[0, 4], 0)
+
+        opens[4] = closes[4] = 8.1  # Limit-down open: the sell waits
+        panel = BarPanel.from_klines({"600000": klines(opens + [8.2], closes + [8.2])})
+        result = run_backtest(StopLossTakeProfitStrategy("600000", stop_loss_pct=5.0), panel)
+        self.assertGreater(result.positions[0, 4], 0)
+        self.assertEqual(result.positions[0, 5], 0)
+
+    def test_one_template_over_a_universe(self):
+        rng = np.random.default_rng(1)
+        closes = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, (50, 200)), axis=1))
+        codes = [f"{600000 + i:06d}" for i in range(50)]
+        panel = BarPanel(codes, [str(i) for i in range(200)], closes, closes, closes, closes, np.full(50, 0.1))
+        for template in (MACrossStrategy("600000"), GridStrategy("600000", step_pct=2.0),
+                         MACDDivergenceStrategy("600000"), StopLossTakeProfitStrategy("600000")):
+            targets = target_positions(template, panel)
+            self.assertEqual(targets.shape, (50, 200))
+            self.assertTrue(((targets >= 0) & (targets <= 1)).all())
+            result = run_backtest(template, panel)
+            self.assertTrue((result.positions % LOT_SIZE == 0).all())
+            self.assertTrue((result.equity > 0).all())
+            self.assertEqual(result.summary()["stocks"], 50)
+            # Never a buy and a sell of one stock in the same session (T+1)
+            changes = np.diff(result.positions, axis=1)
+            self.assertEqual(result.buys.sum() + result.sells.sum(), np.count_nonzero(changes))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import sys
+import os
+import unittest
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from services.batch_analysis import build_batch_prompt, format_stock_table, parse_batch_response
+
+STOCKS = [
+    {"code": "600519", "name": "贵州茅台", "price": 1680.5, "change": 1.234, "ma_bullish": True},
+    {"code": "000001", "name": "平安银行", "price": 11.2, "change": -0.5, "ma_bullish": False},
+]
+
+
+class TestBatchAnalysis(unittest.TestCase):
+    def test_prompt_has_one_row_per_stock(self):
+        table = format_stock_table(STOCKS)
+        lines = table.splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].startswith("600519,贵州茅台,1680.50,+1.23,,,是"))
+        self.assertIn(table, build_batch_prompt(STOCKS))
+        self.assertIn("JSON", build_batch_prompt(STOCKS))
+
+    def test_parses_fenced_json(self):
+        text = ('好的，结果如下：\n```json\n[{"code": "600519", "score": 85, "reason": "趋势向上"},\n'
+                ' {"code": 1, "score": "40.4", "reason": "破位"}]\n```')
+        results = parse_batch_response(text, STOCKS)
+        self.assertEqual(results["600519"], {"code": "600519", "score": 85, "reason": "趋势向上"})
+        self.assertEqual(results["000001"]["score"], 40)
+
+    def test_invalid_items_are_dropped(self):
+        text = ('[{"code": "600519", "score": 150, "reason": "x"},'
+                ' {"code": "000001", "score": 60},'
+                ' {"code": "000001", "score": 10, "reason": "重复"},'
+                ' {"code": "300750", "score": 70, "reason": "不在本批"},'
+                ' "noise"]')
+        results = parse_batch_response(text, STOCKS)
+        self.assertEqual(list(results), ["000001"])
+        self.assertEqual(results["000001"], {"code": "000001", "score": 60, "reason": ""})
+
+    def test_unparseable_answer(self):
+        self.assertEqual(parse_batch_response("Error calling LLM: timeout", STOCKS), {})
+        self.assertEqual(parse_batch_response('[{"code": "600519", "score": 8', STOCKS), {})
+        self.assertEqual(parse_batch_response("", STOCKS), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
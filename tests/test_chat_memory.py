@@ -0,0 +1,141 @@
+import sys
+import os
+import tempfile
+import unittest
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from services import chat_memory
+from services.chat_memory import (ChatMemory, ChatMemoryStore, count_tokens, history_token_budget,
+                                  DEFAULT_HISTORY_TOKENS)
+
+
+class TestChatMemory(unittest.TestCase):
+    def make_memory(self, turns, chars=200):
+        memory = ChatMemory()
+        for i in range(turns):
+            memory.add_turn(f"问题{i} " + "问" * chars, f"回答{i} " + "答" * chars)
+        return memory
+
+    def test_count_tokens(self):
+        self.assertEqual(count_tokens(""), 0)
+        self.assertGreater(count_tokens("你好世界" * 10), count_tokens("hello world"))
+
+    def test_set_model_recounts_with_its_encoding(self):
+        memory = self.make_memory(2)
+        memory.set_summary("摘要")
+        counted = []
+        original = chat_memory.count_tokens
+        chat_memory.count_tokens = lambda text, model_name=None: counted.append(model_name) or 7
+        try:
+            memory.set_model("gpt-4o")
+            memory.set_model("gpt-4o")  # Unchanged: no recount
+        finally:
+            chat_memory.count_tokens = original
+        self.assertEqual(counted, ["gpt-4o"] * 5)
+        self.assertEqual(memory.token_count(), 35)
+        self.assertEqual(memory.model_name, "gpt-4o")
+
+    def test_within_budget_is_untouched(self):
+        memory = self.make_memory(2)
+        calls = []
+        memory.fit(100000, lambda summary, messages: calls.append(messages) or "x")
+        self.assertEqual(len(memory), 4)
+        self.assertEqual(calls, [])
+
+    def test_old_turns_are_summarized(self):
+        memory = self.make_memory(20)
+        budget = 2000
+        summarized = []
+
+        def summarize(previous, messages):
+            summarized.extend(messages)
+            return (previous + " " if previous else "") + f"{len(messages)} 条消息的摘要"
+
+        memory.fit(budget, summarize)
+        self.assertLessEqual(memory.token_count(), budget)
+        self.assertTrue(memory.summary)
+        self.assertEqual(memory.messages()[0][0], "system")
+        # The newest turn is kept verbatim, the oldest went into the summary
+        self.assertTrue(memory.entries[-1][1].startswith("回答19"))
+        self.assertTrue(summarized[0][1].startswith("问题0"))
+        self.assertEqual(len(summarized) + len(memory), 40)
+
+    def test_stays_bounded_over_a_long_session(self):
+        memory = ChatMemory()
+        budget = 1500
+        for i in range(200):
+            memory.fit(budget, lambda previous, messages: previous + "摘要" * 50)
+            self.assertLessEqual(memory.token_count(), budget)
+            memory.add_turn("问" * 100, "答" * 300)
+
+    def test_failed_summary_drops_turns(self):
+        memory = self.make_memory(20)
+
+        def broken(previous, messages):
+            raise RuntimeError("provider down")
+
+        memory.fit(1000, broken)
+        self.assertLessEqual(memory.token_count(), 1000)
+        self.assertEqual(memory.summary, "")
+
+    def test_oversized_last_turn_is_dropped(self):
+        memory = self.make_memory(1, chars=5000)
+        memory.fit(1000)
+        self.assertEqual(len(memory), 0)
+
+    def test_budget_from_provider_config(self):
+        self.assertEqual(history_token_budget(None), DEFAULT_HISTORY_TOKENS)
+        self.assertEqual(history_token_budget({"history_tokens": "8000"}), 8000)
+        self.assertEqual(history_token_budget({"history_tokens": "many"}), DEFAULT_HISTORY_TOKENS)
+
+
+class TestChatMemoryStore(unittest.TestCase):
+    def test_lru_without_spill_forgets_evicted(self):
+        store = ChatMemoryStore(max_contexts=2)
+        store.get("600519").add_turn("问", "答")
+        store.get("000001")
+        store.get("600519")  # Most recently used again
+        store.get("300750")  # Evicts 000001
+        self.assertIsNone(store.peek("000001"))
+        self.assertEqual(len(store.get("600519")), 2)
+        self.assertEqual(len(store), 2)
+
+    def test_spilled_context_is_restored(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ChatMemoryStore(max_contexts=1, spill_dir=tmp)
+            memory = store.get("600519")
+            memory.add_turn("茅台怎么样？", "估值偏高。")
+            memory.set_summary("讨论过茅台")
+            store.get("000001")  # Spills 600519
+            self.assertIsNone(store.peek("600519"))
+            self.assertEqual(len(os.listdir(tmp)), 1)
+
+            restored = store.get("600519")
+            self.assertEqual(restored.summary, "讨论过茅台")
+            self.assertEqual(restored.messages()[-1], ("ai", "估值偏高。"))
+
+            # Another store on the same directory neither reads nor deletes these files
+            store.get("000001").add_turn("q", "a")
+            store.get("600519")  # Spills 000001
+            other = ChatMemoryStore(max_contexts=1, spill_dir=tmp)
+            self.assertEqual(len(other.get("000001")), 0)
+            self.assertEqual(len(os.listdir(tmp)), 1)
+            other.close()
+            self.assertEqual(len(os.listdir(tmp)), 1)
+
+            # Closing removes the store's own files (and the directory once empty)
+            store.close()
+            self.assertFalse(os.path.exists(tmp))
+            os.makedirs(tmp)  # For TemporaryDirectory's cleanup
+
+    def test_discard(self):
+        store = ChatMemoryStore()
+        store.get("600519").add_turn("问", "答")
+        store.discard("600519")
+        self.assertEqual(len(store.get("600519")), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
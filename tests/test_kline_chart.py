@@ -0,0 +1,85 @@
+import sys
+import os
+import unittest
+import numpy as np
+from PyQt6.QtWidgets import QApplication
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from ui.widgets.kline_chart import KLineChartWidget, moving_average, cached_kline_pixmap, render_kline_image
+
+
+def make_bars(n, start=10.0):
+    bars = []
+    price = start
+    for i in range(n):
+        close = price * (1.02 if i % 3 else 0.97)
+        bars.append({"date": f"2024-01-{i + 1:02d}", "open": price, "close": close,
+                     "high": max(price, close) * 1.01, "low": min(price, close) * 0.99,
+                     "volume": 1000 + i})
+        price = close
+    return bars
+
+
+class TestKLineChart(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Create QApplication if it doesn't exist
+        if not QApplication.instance():
+            cls.app = QApplication(sys.argv)
+        else:
+            cls.app = QApplication.instance()
+
+    def test_moving_average(self):
+        values = np.arange(1, 11, dtype=float)
+        ma = moving_average(values, 5)
+        self.assertTrue(np.all(np.isnan(ma[:4])))
+        expected = [np.mean(values[i - 4:i + 1]) for i in range(4, 10)]
+        np.testing.assert_allclose(ma[4:], expected)
+        self.assertTrue(np.all(np.isnan(moving_average(values[:3], 5))))
+
+    def test_pixmap_is_cached_until_data_changes(self):
+        bars = make_bars(40)
+        first = cached_kline_pixmap("600000", bars, 400)
+        self.assertIs(cached_kline_pixmap("600000", list(bars), 400), first)
+        self.assertIsNot(cached_kline_pixmap("600000", bars, 500), first)
+
+        updated = bars[:-1] + [dict(bars[-1], close=bars[-1]["close"] + 0.01)]
+        self.assertIsNot(cached_kline_pixmap("600000", updated, 400), first)
+
+    def test_cancelled_render_stops_early(self):
+        checks = []
+
+        def cancelled():
+            checks.append(1)
+            return len(checks) > 1  # Cancel after the first drawing batch
+
+        self.assertIsNone(render_kline_image(make_bars(30), 400, cancelled=cancelled))
+        self.assertEqual(len(checks), 2)
+        self.assertIsNotNone(render_kline_image(make_bars(30), 400, cancelled=lambda: False))
+
+    def wait_for_render(self, widget):
+        for worker in widget.render_workers:
+            worker.wait()
+        QApplication.processEvents()
+
+    def test_widget_renders_and_clears(self):
+        widget = KLineChartWidget()
+        widget.update_chart("600000", "浦发银行", make_bars(3))
+        self.wait_for_render(widget)
+        self.assertFalse(widget.chart_label.pixmap().isNull())
+        widget.clear_chart()
+        self.assertEqual(widget.chart_label.text(), "未加载数据")
+
+    def test_newer_render_supersedes_older(self):
+        widget = KLineChartWidget()
+        widget.update_chart("600001", "邯郸钢铁", make_bars(30, start=5.0))
+        widget.update_chart("600004", "白云机场", make_bars(30, start=8.0))
+        self.wait_for_render(widget)
+        self.assertIsNone(widget.pending_key)
+        self.assertEqual(widget.rendered_key[0], "600004")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import sys
+import os
+import threading
+import time
+import unittest
+import numpy as np
+from PyQt6.QtWidgets import QApplication, QWidget
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from ui.widgets.kline_interactive import InteractiveKLineWidget, KLineChartDialog, downsample_ohlcv
+
+
+def random_series(n, seed=0):
+    rng = np.random.default_rng(seed)
+    closes = 10 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    opens = np.r_[closes[0], closes[:-1]]
+    highs = np.maximum(opens, closes) * 1.01
+    lows = np.minimum(opens, closes) * 0.99
+    volumes = rng.integers(1, 1000, n).astype(float)
+    return opens, highs, lows, closes, volumes
+
+
+class TestDownsample(unittest.TestCase):
+    def test_buckets_keep_extremes_and_totals(self):
+        opens, highs, lows, closes, volumes = random_series(100000)
+        buckets = downsample_ohlcv(opens, highs, lows, closes, volumes, 0, 100000, 400)
+        self.assertLessEqual(len(buckets["x"]), 400)
+        self.assertEqual(buckets["high"].max(), highs.max())
+        self.assertEqual(buckets["low"].min(), lows.min())
+        self.assertAlmostEqual(buckets["volume"].sum(), volumes.sum())
+        self.assertEqual(buckets["open"][0], opens[0])
+        self.assertEqual(buckets["close"][-1], closes[-1])
+
+    def test_small_range_is_not_bucketed(self):
+        opens, highs, lows, closes, volumes = random_series(1000)
+        buckets = downsample_ohlcv(opens, highs, lows, closes, volumes, 990, 2000, 400)
+        self.assertEqual(buckets["width"], 1)
+        np.testing.assert_array_equal(buckets["x"], np.arange(990, 1000))
+        np.testing.assert_array_equal(buckets["close"], closes[990:])
+
+    def test_buckets_are_aligned_while_panning(self):
+        opens, highs, lows, closes, volumes = random_series(10000)
+        a = downsample_ohlcv(opens, highs, lows, closes, volumes, 1000, 5000, 100)
+        b = downsample_ohlcv(opens, highs, lows, closes, volumes, 1001, 5001, 100)
+        shared = np.intersect1d(a["x"], b["x"])
+        self.assertGreater(len(shared), 90)
+
+
+class TestInteractiveKLineWidget(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Create QApplication if it doesn't exist
+        if not QApplication.instance():
+            cls.app = QApplication(sys.argv)
+        else:
+            cls.app = QApplication.instance()
+
+    def test_long_series_is_drawn_in_buckets(self):
+        opens, highs, lows, closes, volumes = random_series(20000)
+        bars = [{"date": f"d{i}", "open": o, "high": h, "low": l, "close": c, "volume": v}
+                for i, (o, h, l, c, v) in enumerate(zip(opens, highs, lows, closes, volumes))]
+        widget = InteractiveKLineWidget()
+        widget.resize(800, 400)
+        widget.set_data(bars)
+        widget.price_plot.setXRange(0, 20000, padding=0)
+        start, stop, max_buckets = widget.last_view
+        self.assertLessEqual(max_buckets, 800)
+        self.assertGreater(stop - start, 19000)
+
+    def test_close_does_not_wait_for_loads(self):
+        release = threading.Event()
+
+        class SlowDataService:
+            def fetch_kline_data(self, stock_code, period="daily", adjust="qfq", days=60):
+                release.wait(5)
+                return [{"date": "d0", "open": 1, "high": 1, "low": 1, "close": 1, "volume": 1}]
+
+        parent = QWidget()
+        dialog = KLineChartDialog(SlowDataService(), "600000", "浦发银行", parent=parent)
+        dialog.period_selector.setCurrentIndex(1)  # A second load while the first runs
+        workers = list(dialog.kline_workers)
+        status = dialog.status_label.text()
+
+        start = time.perf_counter()
+        dialog.close()
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(len(dialog.kline_workers), 2)
+
+        release.set()
+        for worker in workers:
+            worker.wait()
+        QApplication.processEvents()
+        self.assertEqual(dialog.status_label.text(), status)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import sys
+import os
+import time
+import unittest
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from services.llm_failover import hedged_stream, failover_settings
+from services.llm_telemetry import LLMTelemetry
+
+
+class ScriptedChain:
+    """Streams chunks after an initial delay, then optionally fails."""
+
+    def __init__(self, chunks=("答", "案"), delay=0.0, error=None):
+        self.chunks = chunks
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    def stream(self, inputs):
+        self.calls += 1
+        time.sleep(self.delay)
+        for chunk in self.chunks:
+            yield chunk
+        if self.error:
+            raise self.error
+
+
+class TestHedgedStream(unittest.TestCase):
+    def run_stream(self, chains, hedge_after=0.0, failover=True):
+        telemetry = LLMTelemetry()
+        text = "".join(hedged_stream(list(chains), chains.__getitem__, {}, hedge_after, failover, telemetry))
+        return text, telemetry
+
+    def test_hedge_keeps_first_answer(self):
+        chains = {"stalled": ScriptedChain(("慢",), delay=2.0), "backup": ScriptedChain(("快",))}
+        start = time.perf_counter()
+        text, telemetry = self.run_stream(chains, hedge_after=0.1)
+        self.assertEqual(text, "快")
+        self.assertLess(time.perf_counter() - start, 1.0)
+        # The outrun model counts as a failure, without a made-up latency
+        stats = telemetry.stats("stalled")
+        self.assertEqual((stats["requests"], stats["errors"]), (1, 1))
+        self.assertIsNone(stats["ttft"])
+
+    def test_no_hedge_when_answer_is_fast(self):
+        chains = {"primary": ScriptedChain(delay=0.05), "backup": ScriptedChain()}
+        text, _ = self.run_stream(chains, hedge_after=1.0)
+        self.assertEqual(text, "答案")
+        self.assertEqual(chains["backup"].calls, 0)
+
+    def test_failover_on_error(self):
+        chains = {"broken": ScriptedChain((), error=RuntimeError("502")), "backup": ScriptedChain()}
+        text, telemetry = self.run_stream(chains)
+        self.assertEqual(text, "答案")
+        self.assertEqual(telemetry.stats("broken")["errors"], 1)
+        self.assertEqual(telemetry.stats("backup")["requests"], 1)
+
+        with self.assertRaises(RuntimeError):
+            self.run_stream({"broken": ScriptedChain((), error=RuntimeError("502")),
+                             "backup": ScriptedChain()}, failover=False)
+
+    def test_error_after_first_token_is_raised(self):
+        chains = {"flaky": ScriptedChain(("半",), error=RuntimeError("reset")), "backup": ScriptedChain()}
+        chunks = []
+        with self.assertRaises(RuntimeError):
+            for chunk in hedged_stream(list(chains), chains.__getitem__, {}, 0.0, True):
+                chunks.append(chunk)
+        self.assertEqual(chunks, ["半"])
+        self.assertEqual(chains["backup"].calls, 0)
+
+    def test_settings(self):
+        self.assertEqual(failover_settings(None), (0.0, True))
+        self.assertEqual(failover_settings({"hedge_after": "3", "failover": False}), (3.0, False))
+        self.assertEqual(failover_settings({"hedge_after": "soon"})[0], 0.0)
+        self.assertEqual(failover_settings({"hedge_after": "", "failover": None}), (0.0, True))
+        self.assertEqual(failover_settings({"hedge_after": "nan", "failover": "false"}), (0.0, False))
+        self.assertEqual(failover_settings({"hedge_after": -2, "failover": " True"}), (0.0, True))
+
+
+if __name__ == '__main__':
+    unittest.main()
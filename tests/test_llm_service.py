@@ -0,0 +1,215 @@
+import sys
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from services.llm_service import LLMService, client_cache_key
+from services.llm_telemetry import LLMTelemetry, AUTO_MODEL
+from services.response_cache import (ResponseCache, CachedResponse, response_cache_key,
+                                     session_start, next_session_start)
+
+
+class FakeConfigManager:
+    def __init__(self):
+        self.providers = {
+            "Test": {"name": "Test", "api_key": "sk-test", "base_url": "http://127.0.0.1:9/v1",
+                     "model_name": "test-model"},
+        }
+        self.prompts = {"默认": {"name": "默认", "content": "你是一个股票分析助手。"}}
+
+    def get_providers(self):
+        return self.providers
+
+    def get_prompts(self):
+        return self.prompts
+
+
+class TestLLMServiceCaches(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.service = LLMService(spill_dir=self.tmp.name)
+        self.service.config_manager = FakeConfigManager()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def get_chain(self, prompt="你是一个股票分析助手。", api_key="sk-test"):
+        return self.service.get_chain("test-model", api_key, "http://127.0.0.1:9/v1", prompt)
+
+    def test_client_key_hides_api_key(self):
+        key = client_cache_key("test-model", " http://x/v1 ", "sk-secret")
+        self.assertEqual(key[:2], ("test-model", "http://x/v1"))
+        self.assertNotIn("sk-secret", repr(key))
+        self.assertNotEqual(key, client_cache_key("test-model", "http://x/v1", "sk-other"))
+
+    def test_clients_and_chains_are_reused(self):
+        chain = self.get_chain()
+        self.assertIs(self.get_chain(), chain)
+
+        # A different prompt reuses the client but compiles its own chain
+        _, llm = self.service.get_client("test-model", "sk-test", "http://127.0.0.1:9/v1")
+        other = self.get_chain(prompt="关注短期波动。")
+        self.assertIsNot(other, chain)
+        self.assertEqual(len(self.service._clients), 1)
+        self.assertIs(self.service.get_client("test-model", "sk-test", "http://127.0.0.1:9/v1")[1], llm)
+
+        # A changed key gets its own client
+        self.get_chain(api_key="sk-new")
+        self.assertEqual(len(self.service._clients), 2)
+
+    def test_invalidation(self):
+        chain = self.get_chain()
+        _, llm = self.service.get_client("test-model", "sk-test", "http://127.0.0.1:9/v1")
+
+        self.service.invalidate_prompts()
+        new_chain = self.get_chain()
+        self.assertIsNot(new_chain, chain)
+        self.assertIs(self.service.get_client("test-model", "sk-test", "http://127.0.0.1:9/v1")[1], llm)
+
+        self.service.invalidate_clients()
+        self.assertIsNot(self.get_chain(), new_chain)
+        self.assertIsNot(self.service.get_client("test-model", "sk-test", "http://127.0.0.1:9/v1")[1], llm)
+
+    def test_missing_provider(self):
+        chunks = list(self.service.chat_stream("你好", "unknown-model", "默认"))
+        self.assertEqual(len(chunks), 1)
+        self.assertIn("not found", chunks[0])
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(os.path.join(self.tmp.name, "cache", "responses.sqlite3"), max_entries=3)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_session_boundaries(self):
+        friday_close = datetime(2026, 10, 16, 15, 0)
+        self.assertEqual(next_session_start(friday_close), datetime(2026, 10, 19, 9, 30))
+        self.assertEqual(session_start(datetime(2026, 10, 18, 12, 0)), datetime(2026, 10, 16, 9, 30))
+        self.assertEqual(next_session_start(datetime(2026, 10, 19, 8, 0)), datetime(2026, 10, 19, 9, 30))
+        self.assertEqual(session_start(datetime(2026, 10, 19, 9, 30)), datetime(2026, 10, 19, 9, 30))
+
+    def test_key_normalizes_whitespace(self):
+        a = response_cache_key("m", "系统", "评估  000001\n是否买入", [("human", "你好")], "v1")
+        b = response_cache_key("m", "系统", " 评估 000001 是否买入 ", [("human", "你好 ")], "v1")
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, response_cache_key("m", "系统", "评估 000001 是否买入", [], "v1"))
+        self.assertNotEqual(a, response_cache_key("m", "系统", "评估 000001 是否买入",
+                                                  [("human", "你好")], "v2"))
+
+    def test_expiry_and_size_bound(self):
+        self.cache.put("a", "m", "答案", expires_at=200, now=100)
+        self.assertEqual(self.cache.get("a", now=150), "答案")
+        self.assertIsNone(self.cache.get("a", now=200))
+
+        for i in range(5):
+            self.cache.put(f"k{i}", "m", str(i), expires_at=1000, now=110 + i)
+        self.assertEqual(self.cache.count(), 3)
+        self.assertIsNone(self.cache.get("k0", now=120))
+        self.assertEqual(self.cache.get("k4", now=120), "4")
+
+    def test_chat_stream_serves_cached_answer(self):
+        service = LLMService(spill_dir=os.path.join(self.tmp.name, "contexts"))
+        service.config_manager = FakeConfigManager()
+        service.response_cache = self.cache
+        key = response_cache_key("test-model", "你是一个股票分析助手。", "问题", [], "v1")
+        self.cache.put(key, "test-model", "缓存的回答", expires_at=next_session_start(datetime.now()).timestamp())
+
+        chunks = list(service.chat_stream("问题", "test-model", "默认", context_version="v1"))
+        self.assertEqual(chunks, ["缓存的回答"])
+        self.assertIsInstance(chunks[0], CachedResponse)
+        self.assertEqual(len(service.chat_history), 2)
+
+        # A stock's conversation is kept apart from the shared history
+        list(service.chat_stream("问题", "test-model", "默认", context_version="v1", context_key="600519"))
+        self.assertEqual(len(service.contexts.get("600519")), 2)
+        self.assertEqual(len(service.chat_history), 2)
+
+    def test_failover_answer_is_cached_for_backup_model(self):
+        service = LLMService(spill_dir=os.path.join(self.tmp.name, "contexts"))
+        config = FakeConfigManager()
+        config.providers["Backup"] = {"name": "Backup", "api_key": "sk-backup", "model_name": "backup-model"}
+        service.config_manager = config
+        service.response_cache = self.cache
+        chains = {"test-model": FakeChain((), error=RuntimeError("502")), "backup-model": FakeChain(("备", "用"))}
+        service.get_chain = lambda name, *args: chains[name]
+
+        chunks = list(service.chat_stream("问题", "test-model", "默认", context_version="v1", history=[]))
+        self.assertEqual("".join(chunks), "备用")
+        prompt = "你是一个股票分析助手。"
+        self.assertIsNone(self.cache.get(response_cache_key("test-model", prompt, "问题", [], "v1")))
+        self.assertEqual(self.cache.get(response_cache_key("backup-model", prompt, "问题", [], "v1")), "备用")
+
+
+class FakeChain:
+    def __init__(self, chunks=("答", "案"), error=None):
+        self.chunks = chunks
+        self.error = error
+
+    def stream(self, inputs):
+        for chunk in self.chunks:
+            yield chunk
+        if self.error:
+            raise self.error
+
+
+class TestLLMTelemetry(unittest.TestCase):
+    def test_window_stats(self):
+        telemetry = LLMTelemetry(window=4)
+        for ttft in (0.5, 0.7, 0.6):
+            telemetry.record("m", ttft, 40.0)
+        telemetry.record("m", ok=False)
+        stats = telemetry.stats("m")
+        self.assertEqual((stats["requests"], stats["errors"]), (4, 1))
+        self.assertAlmostEqual(stats["ttft"], 0.6)
+        self.assertEqual(stats["error_rate"], 0.25)
+
+        telemetry.record("m", 0.9, 40.0)  # Pushes the oldest sample out
+        self.assertEqual(telemetry.stats("m")["requests"], 4)
+        self.assertIsNone(telemetry.stats("other")["ttft"])
+
+    def test_choose_fastest_healthy(self):
+        telemetry = LLMTelemetry()
+        for _ in range(5):
+            telemetry.record("slow", 2.0, 20.0)
+            telemetry.record("fast", 0.3, 60.0)
+            telemetry.record("broken", 0.1, 100.0)
+            telemetry.record("broken", ok=False)
+        self.assertEqual(telemetry.choose(["slow", "fast", "broken"]), "fast")
+        # Models not measured yet are tried first
+        self.assertEqual(telemetry.choose(["slow", "new", "fast"]), "new")
+        self.assertIsNone(telemetry.choose([]))
+
+    def test_auto_model_routing_and_recording(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        service = LLMService(spill_dir=tmp.name)
+        config = FakeConfigManager()
+        config.providers["Fast"] = {"name": "Fast", "api_key": "sk-fast", "model_name": "fast-model"}
+        config.providers["NoKey"] = {"name": "NoKey", "api_key": "", "model_name": "no-key-model"}
+        service.config_manager = config
+        for _ in range(3):
+            service.telemetry.record("test-model", 1.5, 20.0)
+            service.telemetry.record("fast-model", 0.2, 50.0)
+        self.assertEqual(service.resolve_model(AUTO_MODEL), "fast-model")
+        self.assertEqual(service.resolve_model("test-model"), "test-model")
+
+        service.get_chain = lambda *args: FakeChain()
+        chunks = list(service.chat_stream("问题", AUTO_MODEL, "默认", use_cache=False, history=[]))
+        self.assertEqual("".join(chunks), "答案")
+        self.assertEqual(service.telemetry.stats("fast-model")["requests"], 4)
+
+        service.get_chain = lambda *args: FakeChain(error=RuntimeError("502"))
+        chunks = list(service.chat_stream("问题", "fast-model", "默认", use_cache=False, history=[]))
+        self.assertIn("Error calling LLM", chunks[-1])
+        self.assertEqual(service.telemetry.stats("fast-model")["errors"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import sys
+import os
+import tempfile
+import unittest
+
+# Add src and benchmarks to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+
+from llm_stub_server import StubLLMServer, StubSettings, FILLER
+from services.llm_service import LLMService
+from services.response_cache import ResponseCache
+from services.batch_analysis import build_batch_prompt, parse_batch_response
+
+
+class StubConfigManager:
+    def __init__(self, base_url):
+        self.providers = {"Stub": {"name": "Stub", "api_key": "sk-stub", "base_url": base_url,
+                                   "model_name": "stub-model"}}
+        self.prompts = {"默认": {"name": "默认", "content": "你是一个股票分析助手。", "failover": False}}
+
+    def get_providers(self):
+        return self.providers
+
+    def get_prompts(self):
+        return self.prompts
+
+
+class TestLLMStubServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = StubLLMServer(StubSettings(ttft=0.01, jitter=0.0, tokens_per_sec=0, tokens=12)).start()
+        self.service = LLMService(spill_dir=os.path.join(self.tmp.name, "contexts"))
+        self.service.config_manager = StubConfigManager(self.server.base_url)
+        self.service.response_cache = ResponseCache(os.path.join(self.tmp.name, "responses.sqlite3"))
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def test_streams_through_llm_service(self):
+        chunks = list(self.service.chat_stream("你好", "stub-model", "默认", use_cache=False, history=[]))
+        self.assertEqual("".join(chunks), FILLER[:12])
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(self.service.telemetry.stats("stub-model")["requests"], 1)
+
+    def test_batch_prompt_gets_valid_json(self):
+        stocks = [{"code": "600519", "name": "贵州茅台"}, {"code": "000001", "name": "平安银行"}]
+        answer = "".join(self.service.chat_stream(build_batch_prompt(stocks), "stub-model", "默认",
+                                                  use_cache=False, history=[]))
+        self.assertEqual(set(parse_batch_response(answer, stocks)), {"600519", "000001"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import sys
+import os
+import time
+import unittest
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import QCoreApplication, Qt
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from ui.utils.worker import LLMWorker, format_stream_stats
+from services.response_cache import CachedResponse
+
+
+class FakeStreamService:
+    def __init__(self, chunks, error=None, stall=0.0):
+        self.chunks = chunks
+        self.error = error
+        self.stall = stall  # Seconds before the last chunk
+
+    def chat_stream(self, user_input, model_name, prompt_name):
+        for i, chunk in enumerate(self.chunks):
+            if self.stall and i == len(self.chunks) - 1:
+                time.sleep(self.stall)
+            yield chunk
+        if self.error:
+            raise self.error
+
+
+class TestLLMWorker(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Create QApplication if it doesn't exist
+        if not QApplication.instance():
+            cls.app = QApplication(sys.argv)
+        else:
+            cls.app = QApplication.instance()
+
+    def run_worker(self, service, **kwargs):
+        worker = LLMWorker(service, "问题", "test-model", "默认", **kwargs)
+        results = {"stream": [], "stats": [], "finished": []}
+        worker.stream_updated.connect(results["stream"].append)
+        worker.stats_ready.connect(results["stats"].append)
+        worker.finished.connect(results["finished"].append)
+        worker.start()
+        worker.wait()
+        QCoreApplication.processEvents()
+        return results
+
+    def test_chunks_are_coalesced(self):
+        chunks = ["字"] * 1000
+        results = self.run_worker(FakeStreamService(chunks), flush_interval=60, flush_chars=100)
+        # First chunk immediately, then one signal per 100 characters
+        self.assertLessEqual(len(results["stream"]), 12)
+        self.assertEqual("".join(results["stream"]), "".join(chunks))
+        self.assertEqual(results["finished"], ["".join(chunks)])
+
+        stats = results["stats"][0]
+        self.assertEqual(stats["chunks"], 1000)
+        self.assertEqual(stats["emits"], len(results["stream"]))
+        self.assertIsNotNone(stats["ttft"])
+        self.assertIn("tok/s", format_stream_stats(stats))
+
+    def test_cached_response_is_flagged(self):
+        results = self.run_worker(FakeStreamService([CachedResponse("缓存的回答")]))
+        stats = results["stats"][0]
+        self.assertTrue(stats["cached"])
+        self.assertTrue(format_stream_stats(stats).startswith("[缓存]"))
+
+    def test_error_is_reported(self):
+        results = self.run_worker(FakeStreamService(["a", "b"], error=RuntimeError("boom")), flush_interval=60)
+        self.assertEqual(results["stats"], [])
+        # The partial answer is shown before the error
+        self.assertEqual("".join(results["stream"]), "ab")
+        self.assertEqual(results["finished"], ["System Error: boom"])
+
+    def test_pending_text_is_flushed_during_a_stall(self):
+        worker = LLMWorker(FakeStreamService(["a", "b", "c"], stall=0.5), "问题", "test-model", "默认",
+                           flush_interval=0.05)
+        shown = []
+        # Direct connection: note when each flush is emitted on the worker thread
+        worker.stream_updated.connect(lambda text: shown.append((time.perf_counter(), text)),
+                                      Qt.ConnectionType.DirectConnection)
+        start = time.perf_counter()
+        worker.start()
+        worker.wait()
+        QCoreApplication.processEvents()
+        self.assertEqual("".join(text for _, text in shown), "abc")
+        # "b" is on screen long before the stalled "c" arrives
+        self.assertLess(next(t for t, text in shown if "b" in text) - start, 0.4)
+
+
+if __name__ == '__main__':
+    unittest.main()
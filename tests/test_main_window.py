@@ -0,0 +1,55 @@
+import sys
+import os
+import time
+import unittest
+from PyQt6.QtWidgets import QApplication
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from ui.main_window import MainWindow
+from utils.startup_trace import StartupTrace
+
+
+class TestMainWindow(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Create QApplication if it doesn't exist
+        if not QApplication.instance():
+            cls.app = QApplication(sys.argv)
+        else:
+            cls.app = QApplication.instance()
+
+    def test_tabs_are_built_on_first_activation(self):
+        window = MainWindow()
+        self.assertIsNone(window.tab_trading)
+        self.assertIsNone(window.tab_config)
+
+        deadline = time.time() + 10
+        while window.tab_trading is None and time.time() < deadline:
+            QApplication.processEvents()
+            time.sleep(0.01)
+        self.assertIsNotNone(window.tab_trading)
+        self.assertIsNone(window.tab_selection)
+        window.hub_loader.wait()
+        if window.tab_trading.search_index_worker is not None:
+            window.tab_trading.search_index_worker.wait()
+
+        window.tabs.setCurrentIndex(2)
+        self.assertIs(window.tabs.currentWidget(), window.tab_config)
+        self.assertIsNone(window.tab_selection)
+        window.close()
+
+
+class TestStartupTrace(unittest.TestCase):
+    def test_phases_are_recorded(self):
+        trace = StartupTrace(budget_ms=10000)
+        with trace.phase("load"):
+            time.sleep(0.01)
+        self.assertEqual(trace.records[0][0], "load")
+        self.assertGreaterEqual(trace.records[0][2], 10)
+        self.assertIn("OK", trace.summary())
+
+
+if __name__ == '__main__':
+    unittest.main()
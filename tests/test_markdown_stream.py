@@ -0,0 +1,105 @@
+import sys
+import os
+import unittest
+from PyQt6.QtWidgets import QApplication, QTextEdit
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from ui.utils.markdown_stream import StreamingMarkdownRenderer, stable_prefix_length
+
+
+RESPONSE = """## 结论
+
+**走势**: 均线多头排列。
+
+- 支撑位 10.2
+
+- 压力位 12.5
+
+| 指标 | 数值 |
+|---|---|
+| RSI | 65 |
+
+```python
+x = 1
+
+y = 2
+```
+
+最后一段。
+"""
+
+
+class TestStablePrefix(unittest.TestCase):
+    def test_open_block_is_not_stable(self):
+        self.assertEqual(stable_prefix_length("第一段\n\n"), 0)
+        self.assertEqual(stable_prefix_length("第一段\n\n第二"), len("第一段\n\n"))
+        # An indented line may still continue the first paragraph
+        self.assertEqual(stable_prefix_length("第一段\n\n  续"), 0)
+
+    def test_fenced_code_stays_open_until_closed(self):
+        text = "```\nx = 1\n\ny = 2\n"
+        self.assertEqual(stable_prefix_length(text), 0)
+        self.assertEqual(stable_prefix_length(text + "```\n结束\n"), len(text + "```\n"))
+
+    def test_loose_list_is_one_block(self):
+        text = "- a\n\n- b\n\n"
+        self.assertEqual(stable_prefix_length(text + "  续行\n"), 0)
+        self.assertEqual(stable_prefix_length(text + "段落\n"), len(text))
+
+
+class TestStreamingMarkdownRenderer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Create QApplication if it doesn't exist
+        if not QApplication.instance():
+            cls.app = QApplication(sys.argv)
+        else:
+            cls.app = QApplication.instance()
+
+    def render(self, chunk_size):
+        text_edit = QTextEdit()
+        text_edit.append("<b>[LLM]</b> ")
+        renderer = StreamingMarkdownRenderer(text_edit)
+        renderer.start()
+        for pos in range(0, len(RESPONSE), chunk_size):
+            renderer.append(RESPONSE[pos:pos + chunk_size])
+            renderer.flush()
+        renderer.finish()
+        return renderer, text_edit
+
+    def test_streamed_output_matches_single_render(self):
+        _, expected = self.render(len(RESPONSE))
+        for chunk_size in (1, 3, 7):
+            renderer, text_edit = self.render(chunk_size)
+            self.assertEqual(renderer.text, RESPONSE)
+            self.assertEqual(text_edit.toPlainText(), expected.toPlainText())
+
+    def test_chunked_scan_matches_single_scan(self):
+        for chunk_size in (1, 3, 7):
+            # Frozen blocks of the chunked feed, before finish() renders the rest
+            streamed = StreamingMarkdownRenderer(QTextEdit())
+            streamed.start()
+            for pos in range(0, len(RESPONSE), chunk_size):
+                streamed.append(RESPONSE[pos:pos + chunk_size])
+                streamed.flush()
+                self.assertEqual(streamed.frozen_length, stable_prefix_length(streamed.text))
+            one_go = StreamingMarkdownRenderer(QTextEdit())
+            one_go.start()
+            one_go.append(RESPONSE)
+            one_go.flush()
+            self.assertEqual(streamed.frozen_length, one_go.frozen_length)
+
+    def test_completed_blocks_are_frozen(self):
+        text_edit = QTextEdit()
+        renderer = StreamingMarkdownRenderer(text_edit)
+        renderer.start()
+        renderer.append("第一段\n\n第二段还没写完")
+        renderer.flush()
+        self.assertEqual(renderer.frozen_length, len("第一段\n\n"))
+        self.assertIn("第二段还没写完", text_edit.toPlainText())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import sys
+import os
+import unittest
+from datetime import date, timedelta
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from services.market_context import MarketContextBuilder, build_context_text, CONTEXT_BARS
+
+
+def make_bars(n, start=10.0):
+    bars = []
+    day = date(2026, 1, 5)
+    for i in range(n):
+        close = start + (i % 7) * 0.3 + i * 0.05
+        bars.append({"date": (day + timedelta(days=i)).isoformat(), "open": close - 0.1,
+                     "high": close + 0.2, "low": close - 0.3, "close": close, "volume": 120000 + i * 100})
+    return bars
+
+
+class FakeDataService:
+    def __init__(self, bars):
+        self.bars = bars
+        self.fetches = 0
+
+    def fetch_kline_data(self, stock_code, period="daily", adjust="qfq", days=60):
+        self.fetches += 1
+        return self.bars
+
+
+class TestMarketContext(unittest.TestCase):
+    def test_text_is_compact_and_complete(self):
+        text = build_context_text("600519", "贵州茅台", make_bars(60))
+        lines = text.splitlines()
+        self.assertIn("贵州茅台(600519)", lines[0])
+        self.assertTrue(lines[1].startswith("统计: 收盘"))
+        self.assertIn("MA60", lines[2])
+        self.assertIn("RSI14", lines[2])
+        self.assertIn("MACD", lines[2])
+        self.assertIn("KDJ", lines[2])
+        self.assertEqual(len(lines), 4 + CONTEXT_BARS)
+        self.assertLess(len(text), 1500)
+
+    def test_short_history(self):
+        text = build_context_text("000001", "平安银行", make_bars(3))
+        self.assertNotIn("MACD", text)
+        self.assertEqual(len(text.splitlines()), 2 + 1 + 3)
+
+    def test_cached_per_last_bar(self):
+        bars = make_bars(60)
+        service = FakeDataService(bars)
+        builder = MarketContextBuilder(service)
+
+        first = builder.build("600519", "贵州茅台")
+        self.assertEqual(service.fetches, 1)
+        # Same bars (even as a new list) give the very same context
+        self.assertIs(builder.build("600519", "贵州茅台", [dict(b) for b in bars]), first)
+
+        # An updated last bar gives a new version whose prefix is unchanged
+        updated = [dict(b) for b in bars]
+        updated[-1]["close"] += 0.5
+        second = builder.build("600519", "贵州茅台", updated)
+        self.assertNotEqual(second.version, first.version)
+        self.assertEqual(second.text.splitlines()[0], first.text.splitlines()[0])
+
+    def test_no_bars(self):
+        self.assertIsNone(MarketContextBuilder(FakeDataService(None)).build("600519", "贵州茅台"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import sys
+import os
+import threading
+import time
+import unittest
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from services.market_data_hub import MarketDataHub
+from services.stock_data_service import _RequestCoalescer
+
+
+class FakeDataService:
+    """Records the calls the hub makes to drive price polling."""
+
+    def __init__(self):
+        self.auto_update_running = False
+        self.watched = []
+
+    def update_watched_stocks(self, stock_codes):
+        pass
+
+    def add_price_listener(self, listener):
+        pass
+
+    def start_auto_update(self, stock_codes, interval=10):
+        self.auto_update_running = True
+        self.watched = list(stock_codes)
+
+    def update_watched_stocks_list(self, stock_codes):
+        self.watched = list(stock_codes)
+
+    def stop_auto_update(self):
+        self.auto_update_running = False
+        self.watched = []
+
+
+class TestMarketDataHub(unittest.TestCase):
+    def setUp(self):
+        self.data_service = FakeDataService()
+        self.hub = MarketDataHub(data_service=self.data_service, llm_service=object())
+
+    def test_reference_counted_subscriptions(self):
+        self.hub.subscribe(["000001", "600519"])
+        self.hub.subscribe(["600519"])
+        self.assertEqual(self.hub.subscriber_count("600519"), 2)
+        self.assertEqual(self.data_service.watched, ["000001", "600519"])
+
+        # One subscriber left: still polled
+        self.hub.unsubscribe(["600519"])
+        self.assertEqual(self.data_service.watched, ["000001", "600519"])
+
+        self.hub.unsubscribe(["600519", "000001"])
+        self.assertEqual(self.hub.subscribed_codes(), [])
+        self.assertFalse(self.data_service.auto_update_running)
+
+    def test_unsubscribe_unknown_code(self):
+        self.hub.unsubscribe(["300750"])
+        self.assertEqual(self.hub.subscriber_count("300750"), 0)
+
+
+class TestRequestCoalescer(unittest.TestCase):
+    def test_concurrent_identical_requests_share_one_call(self):
+        coalescer = _RequestCoalescer()
+        calls = []
+
+        def slow_fetch(code):
+            calls.append(code)
+            time.sleep(0.2)
+            return {"code": code}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(coalescer.run(("price", "000001"), slow_fetch, "000001")))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(calls, ["000001"])
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(result == {"code": "000001"} for result in results))
+        # Waiting callers get their own copy of the leader's dict
+        self.assertEqual(len({id(result) for result in results}), 5)
+        self.assertEqual(coalescer.inflight_count(), 0)
+
+    def test_errors_are_shared_and_not_cached(self):
+        coalescer = _RequestCoalescer()
+
+        def failing():
+            raise ValueError("upstream down")
+
+        with self.assertRaises(ValueError):
+            coalescer.run("key", failing)
+        self.assertEqual(coalescer.run("key", lambda: 42), 42)
+
+
+if __name__ == '__main__':
+    unittest.main()
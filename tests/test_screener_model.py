@@ -0,0 +1,58 @@
+import sys
+import os
+import unittest
+import numpy as np
+from PyQt6.QtCore import Qt
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from services.stock_data_service import StockDataService
+from ui.models.screener_model import ScreenerTableModel, COLUMNS
+
+
+class TestScreenerTableModel(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.service = StockDataService()
+
+    def setUp(self):
+        self.model = ScreenerTableModel()
+        self.model.set_result(self.service.columns, self.service.all_indices())
+
+    def column(self, field):
+        return [i for i, column in enumerate(COLUMNS) if column[0] == field][0]
+
+    def test_rows_are_paged_in(self):
+        total = len(self.service.get_all_stocks())
+        self.assertEqual(self.model.result_count(), total)
+        self.assertEqual(self.model.rowCount(), min(total, ScreenerTableModel.PAGE_SIZE))
+        while self.model.canFetchMore():
+            self.model.fetchMore()
+        self.assertEqual(self.model.rowCount(), total)
+
+    def test_sort_by_numeric_column(self):
+        col = self.column("turnover")
+        self.model.sort(col, Qt.SortOrder.DescendingOrder)
+        turnover = self.service.columns["turnover"][self.model.indices]
+        self.assertTrue(np.all(np.diff(turnover) <= 0))
+
+        self.model.sort(col, Qt.SortOrder.AscendingOrder)
+        turnover = self.service.columns["turnover"][self.model.indices]
+        self.assertTrue(np.all(np.diff(turnover) >= 0))
+
+    def test_filter_result_follows_criteria(self):
+        indices = self.service.filter_indices({"min_turnover": 2.0, "rsi_oversold": True})
+        self.model.set_result(self.service.columns, indices)
+        stocks = self.model.stocks_in_order()
+        self.assertEqual(len(stocks), len(indices))
+        for index in indices:
+            self.assertGreaterEqual(self.service.columns["turnover"][index], 2.0)
+            self.assertLess(self.service.columns["rsi"][index], 30)
+
+        row = self.model.rowCount() - 1
+        if row >= 0:
+            self.assertEqual(self.model.code_at(row), self.service.columns["code"][indices[row]])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,7 +9,7 @@ from PyQt6.QtWidgets import QApplication
 from ui.tabs.smart_selection import SmartSelectionTab
 
 def test_instantiation():
-    app = QApplication(sys.argv)
+    app = QApplication.instance() or QApplication(sys.argv)
     try:
         tab = SmartSelectionTab()
         print("SmartSelectionTab instantiated successfully")
@@ -0,0 +1,63 @@
+import sys
+import os
+import unittest
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from services.stock_search import StockSearchIndex, bounded_substring_distance
+
+STOCKS = [
+    {"code": "601985", "name": "中国核电", "pinyin_full": "zhongguohedian", "pinyin_initials": "zghd"},
+    {"code": "601398", "name": "工商银行", "pinyin_full": "gongshangyinhang", "pinyin_initials": "gsyh"},
+    {"code": "000858", "name": "五粮液", "pinyin_full": "wuliangye", "pinyin_initials": "wly"},
+    {"code": "601127", "name": "赛力斯", "pinyin_full": "sailisi", "pinyin_initials": "sls"},
+    {"code": "600519", "name": "贵州茅台", "pinyin_full": "guizhoumaotai", "pinyin_initials": "gzmt"},
+    {"code": "601318", "name": "中国平安", "pinyin_full": "zhongguopingan", "pinyin_initials": "zgpa"},
+]
+
+
+class TestStockSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = StockSearchIndex(STOCKS)
+
+    def names(self, query):
+        return [stock["name"] for stock in self.index.search(query)]
+
+    def test_code_prefix(self):
+        self.assertEqual(self.names("601985"), ["中国核电"])
+        self.assertEqual(set(self.names("6013")), {"工商银行", "中国平安"})
+
+    def test_name_and_initials(self):
+        self.assertEqual(self.names("核电"), ["中国核电"])
+        self.assertEqual(self.names("zghd"), ["中国核电"])
+
+    def test_full_pinyin(self):
+        self.assertEqual(self.names("maotai"), ["贵州茅台"])
+        self.assertEqual(set(self.names("zhongguo")), {"中国核电", "中国平安"})
+
+    def test_mistyped_pinyin(self):
+        self.assertEqual(set(self.names("zhonggou")), {"中国核电", "中国平安"})
+        self.assertEqual(self.names("wulaingye"), ["五粮液"])
+
+    def test_exact_match_ranks_above_fuzzy(self):
+        scored = self.index.search_scored("zhongguop")
+        self.assertEqual(scored[0][1]["name"], "中国平安")
+        self.assertEqual(scored[1][1]["name"], "中国核电")
+        self.assertGreater(scored[0][0], scored[1][0])
+
+    def test_no_match(self):
+        self.assertEqual(self.names("xxxxxx"), [])
+        self.assertEqual(self.names(""), [])
+
+    def test_cancelled(self):
+        self.assertEqual(self.index.search("zg", is_cancelled=lambda: True), [])
+
+    def test_bounded_substring_distance(self):
+        self.assertEqual(bounded_substring_distance("zhongguo", "xxzhongguoxx", 1), 0)
+        self.assertEqual(bounded_substring_distance("zhonggou", "zhongguo", 1), 1)
+        self.assertIsNone(bounded_substring_distance("abcdef", "uvwxyz", 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import sys
+import os
+import unittest
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from core.strategies import (MACrossStrategy, GridStrategy, MACDDivergenceStrategy,
+                             StopLossTakeProfitStrategy, strategy_from_dict, BUY, SELL)
+from core.strategy_engine import StrategyEngine, RUNNING, STOPPED, TRIGGERED
+
+TODAY = "2026-03-02"
+
+
+def tick(price, day=TODAY, second=0):
+    return {"current": price, "timestamp": f"{day}T10:00:{second:02d}"}
+
+
+def bars(closes, last_day="2026-02-27"):
+    # Dates only need to sort before TODAY
+    return [{"date": f"2026-01-{i % 28 + 1:02d}" if i < len(closes) - 1 else last_day, "close": c}
+            for i, c in enumerate(closes)]
+
+
+class TestStrategyEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = StrategyEngine()
+        self.signals = []
+        self.engine.add_listener(self.signals.append)
+
+    def run_strategy(self, strategy, history=None):
+        strategy_id = self.engine.add(strategy)
+        if history is not None:
+            self.engine.seed(strategy.code, bars(history), today=TODAY)
+        self.engine.start(strategy_id)
+        return strategy_id
+
+    def test_ma_cross(self):
+        # Falling closes: MA5 below MA20 until the price jumps
+        self.run_strategy(MACrossStrategy("000001", fast=5, slow=20), [20 - i * 0.1 for i in range(19)])
+        self.assertEqual(self.engine.on_tick("000001", tick(18.0)), [])
+        signals = self.engine.on_tick("000001", tick(40.0, second=10))
+        self.assertEqual([s.action for s in signals], [BUY])
+        self.assertIn("MA5上穿MA20", signals[0].reason)
+        self.assertEqual(self.engine.on_tick("000001", tick(41.0, second=20)), [])
+        self.assertEqual(self.signals, signals)
+
+    def test_ma_cross_needs_history(self):
+        self.run_strategy(MACrossStrategy("000001"))
+        self.assertEqual(self.engine.on_tick("000001", tick(10.0)), [])
+        self.assertEqual(self.engine.on_tick("000001", tick(50.0)), [])
+
+    def test_grid(self):
+        self.run_strategy(GridStrategy("600519", base_price=100.0, step_pct=1.0, levels=3))
+        self.assertEqual(self.engine.on_tick("600519", tick(100.2)), [])
+        self.assertEqual([s.action for s in self.engine.on_tick("600519", tick(98.9))], [BUY])
+        self.assertEqual(self.engine.on_tick("600519", tick(98.5)), [])
+        self.assertEqual([s.action for s in self.engine.on_tick("600519", tick(103.5))], [SELL])
+        self.assertEqual(self.engine.on_tick("600519", tick(110.0)), [])  # Beyond the top line
+
+    def test_macd_divergence(self):
+        strategy = MACDDivergenceStrategy("300750", lookback=10)
+        # A long slide, then a rebound: the DIF recovers while the price is still low
+        history = [100 - i for i in range(40)] + [61 + i * 0.5 for i in range(6)] + [62, 61.5]
+        self.run_strategy(strategy, history)
+        signals = self.engine.on_tick("300750", tick(60.0))
+        self.assertEqual([s.action for s in signals], [BUY])
+        self.assertIn("底背离", signals[0].reason)
+        self.assertEqual(self.engine.on_tick("300750", tick(59.0, second=5)), [])  # Once per day
+
+    def test_stop_loss_triggers_once(self):
+        strategy_id = self.run_strategy(StopLossTakeProfitStrategy("000002", entry_price=10.0))
+        self.assertEqual(self.engine.on_tick("000002", tick(9.9)), [])
+        signals = self.engine.on_tick("000002", tick(9.7))
+        self.assertEqual([s.action for s in signals], [SELL])
+        self.assertIn("止损", signals[0].reason)
+        self.assertEqual(self.engine.status(strategy_id), TRIGGERED)
+        self.assertEqual(self.engine.on_tick("000002", tick(9.0)), [])
+
+    def test_stopped_strategies_are_skipped(self):
+        strategy_id = self.run_strategy(StopLossTakeProfitStrategy("000002", entry_price=10.0))
+        self.engine.stop(strategy_id)
+        self.assertEqual(self.engine.status(strategy_id), STOPPED)
+        self.assertEqual(self.engine.on_tick("000002", tick(5.0)), [])
+        self.engine.start(strategy_id)
+        self.assertEqual(self.engine.status(strategy_id), RUNNING)
+        self.assertEqual(len(self.engine.on_tick("000002", tick(5.0))), 1)
+
+    def test_day_roll_extends_history(self):
+        self.run_strategy(MACrossStrategy("000001", fast=2, slow=3), [10.0])
+        # One completed close is not enough for MA3; the first day's last price completes it
+        self.assertEqual(self.engine.on_tick("000001", tick(10.0)), [])
+        self.engine.on_tick("000001", tick(9.0, day="2026-03-03"))
+        self.assertEqual([s.action for s in self.engine.on_tick("000001", tick(12.0, day="2026-03-03"))],
+                         [BUY])
+
+    def test_batch_matches_single_quotes(self):
+        # Same template over many stocks with mixed parameters, evaluated per batch and per quote
+        codes = [f"{600000 + i:06d}" for i in range(12)]
+        engines = [StrategyEngine(), StrategyEngine()]
+        for engine in engines:
+            for i, code in enumerate(codes):
+                engine.seed(code, bars([20 - j * 0.1 - i * 0.01 for j in range(30)]), today=TODAY)
+                engine.start(engine.add(MACrossStrategy(code, fast=3 + i % 3, slow=10 + i % 7)))
+                engine.start(engine.add(GridStrategy(code, base_price=10.0, step_pct=1.0 + i % 2)))
+        self.assertEqual(engines[0].running_count(), 24)
+
+        batched, single = [], []
+        for second, level in enumerate([10.0, 9.7, 12.5, 11.0, 8.0]):
+            quotes = {code: tick(level + i * 0.05, second=second) for i, code in enumerate(codes)}
+            batched += engines[0].on_prices(quotes)
+            for code, quote in quotes.items():
+                single += engines[1].on_tick(code, quote)
+        key = lambda s: (s.strategy_id, s.time, s.action, s.reason)
+        self.assertTrue(batched)
+        self.assertEqual(sorted(map(key, batched)), sorted(map(key, single)))
+        self.assertEqual(engines[0].latency_stats()["count"], 5)
+
+    def test_latency_stats_and_round_trip(self):
+        self.run_strategy(GridStrategy("600519", base_price=100.0))
+        for i in range(20):
+            self.engine.on_tick("600519", tick(100 + i % 3, second=i))
+        stats = self.engine.latency_stats()
+        self.assertEqual(stats["count"], 20)
+        self.assertLess(stats["max"], 50.0)
+
+        strategy = GridStrategy("600519", "贵州茅台", base_price=1500.0, step_pct=2.0)
+        self.assertEqual(strategy_from_dict(strategy.to_dict()), strategy)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import sys
+import os
+import unittest
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import Qt
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from ui.models.watchlist_model import WatchlistModel, COL_PRICE, COL_CHANGE
+
+
+class TestWatchlistModel(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Create QApplication if it doesn't exist
+        if not QApplication.instance():
+            cls.app = QApplication(sys.argv)
+        else:
+            cls.app = QApplication.instance()
+
+    def setUp(self):
+        self.model = WatchlistModel()
+        self.model.set_symbols([{"code": f"{i:06d}", "name": f"股票{i}"} for i in range(2000)])
+        self.changes = []
+        self.model.dataChanged.connect(
+            lambda top, bottom, roles: self.changes.append((top.row(), bottom.row(), top.column())))
+
+    def quotes(self, price=10.0, percent=1.0):
+        return {code: {"current": price, "percent": percent} for code in self.model.codes}
+
+    def test_placeholders_before_first_quote(self):
+        index = self.model.index(0, COL_PRICE)
+        self.assertEqual(self.model.data(index), "--")
+
+    def test_only_changed_cells_are_signalled(self):
+        self.model.update_quotes(self.quotes())
+        self.changes.clear()
+
+        quotes = self.quotes()
+        quotes["000005"] = {"current": 10.5, "percent": 1.0}      # price only
+        quotes["000006"] = {"current": 10.0, "percent": 2.0}      # percent only
+        changed = self.model.update_quotes(quotes)
+
+        self.assertEqual(changed, 2)
+        self.assertEqual(sorted(self.changes), [(5, 5, COL_PRICE), (6, 6, COL_CHANGE)])
+        self.assertEqual(self.model.data(self.model.index(5, COL_PRICE)), "10.50")
+
+    def test_unchanged_refresh_is_silent(self):
+        self.model.update_quotes(self.quotes())
+        self.changes.clear()
+        self.assertEqual(self.model.update_quotes(self.quotes()), 0)
+        self.assertEqual(self.changes, [])
+
+    def test_color_follows_sign(self):
+        self.model.update_quotes({"000001": {"current": 9.0, "percent": -1.5}})
+        color = self.model.data(self.model.index(1, COL_CHANGE), Qt.ItemDataRole.ForegroundRole)
+        self.assertEqual(color.name(), "#00ff00")
+
+    def test_set_symbols_keeps_existing_quotes(self):
+        self.model.update_quotes({"000003": {"current": 12.0, "percent": 0.5}})
+        self.model.set_symbols([{"code": "000003", "name": "股票3"}])
+        self.assertEqual(self.model.data(self.model.index(0, COL_PRICE)), "12.00")
+
+
+if __name__ == '__main__':
+    unittest.main()